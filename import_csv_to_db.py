@@ -1,73 +1,193 @@
+import argparse
 import csv
+import io
 import os
-from datetime import datetime
-from src.database import SessionLocal, engine, Base
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time as dtime
+from itertools import islice
+from typing import Callable, Iterator, List, Optional, Sequence
+from sqlalchemy import Column, DateTime, MetaData, Table, bindparam, insert, text
+from src.database import engine
+from src.migrations import check_schema, legacy_order_id
 from src.models import Trade, ScreeningLog
 
-def import_data():
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    
-    try:
-        # Import Trades
-        if os.path.exists("trades.csv"):
-            with open("trades.csv", "r") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Check if trade already exists (simplistic check)
-                    exists = db.query(Trade).filter(
-                        Trade.date == row['Date'],
-                        Trade.symbol == row['Symbol'],
-                        Trade.time == row['Time']
-                    ).first()
-                    
-                    if not exists:
-                        trade = Trade(
-                            date=row['Date'],
-                            time=row['Time'],
-                            symbol=row['Symbol'],
-                            action=row['Action'],
-                            quantity=int(row['Quantity']),
-                            price=float(row['Price']),
-                            total_cost=float(row['Total Cost'])
-                        )
-                        db.add(trade)
-            print("Trades imported successfully.")
-
-        # Import Screening Logs
-        if os.path.exists("screening_log.csv"):
-            with open("screening_log.csv", "r") as f:
-                # No header in screening_log.csv based on preview
-                # Format: Date,Time,Rank,Symbol,Price,25DMA,PercentBelow
-                reader = csv.reader(f)
-                for row in reader:
-                    if not row: continue
-                    # row: ['2026-01-19', '12:00:02', '1', 'ITC.NS', '332.65', '370.65', '-10.25%']
-                    exists = db.query(ScreeningLog).filter(
-                        ScreeningLog.date == row[0],
-                        ScreeningLog.time == row[1],
-                        ScreeningLog.symbol == row[3]
-                    ).first()
-                    
-                    if not exists:
-                        log = ScreeningLog(
-                            date=row[0],
-                            time=row[1],
-                            rank=int(row[2]),
-                            symbol=row[3],
-                            current_price=float(row[4]),
-                            dma_25=float(row[5]),
-                            percent_below_dma=row[6]
-                        )
-                        db.add(log)
-            print("Screening logs imported successfully.")
-            
-        db.commit()
-    except Exception as e:
-        print(f"Error during import: {e}")
-        db.rollback()
-    finally:
-        db.close()
+# Rows per COPY + merge; each chunk is committed on its own
+CHUNK_ROWS = 50_000
+
+
+def _trade_rows() -> Callable[[List[str]], tuple]:
+    # Date,Time,Symbol,Action,Quantity,Price,Total Cost[,Order ID]
+    seen = Counter()
+
+    def parse(row: List[str]) -> tuple:
+        day, at = date.fromisoformat(row[0]), dtime.fromisoformat(row[1])
+        values = (day, at, row[2], row[3], int(float(row[4])), float(row[5]), float(row[6]))
+        order_id = row[7] if len(row) > 7 else ""
+        if not order_id:
+            # Rows from before the Order ID column, numbered as the migration numbers them
+            key = (day, at, row[2], row[3])
+            order_id = legacy_order_id(*key, seen[key])
+            seen[key] += 1
+        return values + (order_id,)
+    return parse
+
+
+def _screening_row(row: List[str]) -> tuple:
+    # Date,Time,Rank,Symbol,Current Price,25 DMA,% Below DMA
+    return (date.fromisoformat(row[0]), dtime.fromisoformat(row[1]), int(row[2]), row[3],
+            float(row[4]), float(row[5]), float(row[6].rstrip('%')))
+
+
+@dataclass
+class ImportSpec:
+    model: type
+    csv_path: str
+    columns: Sequence[str]  # In CSV order, after parse
+    parser: Callable[[], Callable[[List[str]], tuple]]  # Makes a row parser, fresh for each file
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def unique_index(self):
+        return next(i for i in self.model.__table__.indexes if i.unique)
+
+
+@dataclass
+class ImportResult:
+    table: str
+    read: int = 0
+    inserted: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        """Rows already in the table (or repeated within the file)."""
+        return self.read - self.invalid - self.inserted
+
+    def __str__(self) -> str:
+        return (f"[IMPORT] {self.table}: {self.read} rows read, {self.inserted} inserted, "
+                f"{self.skipped} skipped as duplicates, {self.invalid} unreadable ({self.seconds:.1f}s)")
+
+
+SPECS = [
+    ImportSpec(Trade, "trades.csv",
+               ("date", "time", "symbol", "action", "quantity", "price", "total_cost", "order_id"), _trade_rows),
+    ImportSpec(ScreeningLog, "screening_log.csv",
+               ("date", "time", "rank", "symbol", "current_price", "dma_25", "percent_below_dma"),
+               lambda: _screening_row),
+]
+
+
+def _chunks(spec: ImportSpec, result: ImportResult, chunk_rows: int) -> Iterator[List[tuple]]:
+    """Parsed rows of spec's CSV, chunk_rows at a time. Header and unreadable rows are dropped."""
+    parse = spec.parser()
+    with open(spec.csv_path, 'r', newline='') as f:
+        # Older screening logs were written without a header, so it is skipped by content
+        rows = (row for row in csv.reader(f) if row and row[0] != "Date")
+        while True:
+            chunk = []
+            for row in islice(rows, chunk_rows):
+                result.read += 1
+                try:
+                    chunk.append(parse(row))
+                except (IndexError, ValueError):
+                    result.invalid += 1
+            if not chunk:
+                return
+            yield chunk
+
+
+def _staging_table(spec: ImportSpec) -> Table:
+    """A temporary table with the imported columns, typed like the target table."""
+    target = spec.model.__table__
+    return Table(f"{spec.table}_staging", MetaData(),
+                 *(Column(c, target.c[c].type) for c in spec.columns), prefixes=["TEMPORARY"])
+
+
+def _load_staging(conn, staging: Table, chunk: List[tuple]):
+    """Bulk-loads chunk into the staging table: COPY on Postgres, executemany elsewhere."""
+    columns = [c.name for c in staging.columns]
+    if conn.dialect.name == "postgresql":
+        buf = io.StringIO()
+        csv.writer(buf).writerows(chunk)
+        buf.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {staging.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+        finally:
+            cursor.close()
+    else:
+        conn.execute(insert(staging), [dict(zip(columns, row)) for row in chunk])
+
+
+def import_table(spec: ImportSpec, chunk_rows: int = CHUNK_ROWS) -> Optional[ImportResult]:
+    """
+    Streams spec's CSV into its table: each chunk goes into a temporary staging table and
+    is merged with INSERT ... ON CONFLICT DO NOTHING on the table's unique key, so rows
+    already in the table are skipped by the database instead of looked up one by one.
+    """
+    if not os.path.exists(spec.csv_path):
+        return None
+    result = ImportResult(spec.table)
+    t0 = time.perf_counter()
+    staging = _staging_table(spec)
+    cols = ", ".join(spec.columns)
+    key = ", ".join(c.name for c in spec.unique_index.columns)
+    # WHERE true: SQLite needs it to tell ON CONFLICT from a join constraint
+    merge = text(
+        f"INSERT INTO {spec.table} ({cols}, timestamp) SELECT {cols}, :now FROM {staging.name} WHERE true "
+        f"ON CONFLICT ({key}) DO NOTHING"
+    ).bindparams(bindparam("now", type_=DateTime()))
+
+    with engine.connect() as conn:
+        # A pooled connection may still have one from a failed run
+        staging.drop(conn, checkfirst=True)
+        staging.create(conn)
+        conn.commit()
+        for chunk in _chunks(spec, result, chunk_rows):
+            _load_staging(conn, staging, chunk)
+            result.inserted += conn.execute(merge, {"now": datetime.utcnow()}).rowcount
+            conn.execute(staging.delete())
+            conn.commit()
+        staging.drop(conn)
+        conn.commit()
+
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def import_data(trades_file: str = "trades.csv", screening_file: str = "screening_log.csv",
+                chunk_rows: int = CHUNK_ROWS) -> List[ImportResult]:
+    # Merging needs the current unique keys; upgrading the schema is the migration's job
+    if not check_schema(engine):
+        print("[IMPORT] Nothing imported.")
+        return []
+    results = []
+    for spec, path in zip(SPECS, (trades_file, screening_file)):
+        spec = replace(spec, csv_path=path)
+        try:
+            result = import_table(spec, chunk_rows)
+        except Exception as e:
+            # Chunks merged before the error stay; re-running skips them
+            print(f"Error importing {path}: {e}")
+            continue
+        if result is None:
+            print(f"[IMPORT] {path} not found, skipping.")
+            continue
+        print(result)
+        results.append(result)
+    return results
+
 
 if __name__ == "__main__":
-    import_data()
+    parser = argparse.ArgumentParser(description="Bulk-import trades.csv and screening_log.csv into the database")
+    parser.add_argument("--trades", default="trades.csv", help="Trades CSV (default: trades.csv)")
+    parser.add_argument("--screening", default="screening_log.csv", help="Screening log CSV (default: screening_log.csv)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS, help=f"Rows per chunk (default: {CHUNK_ROWS})")
+    args = parser.parse_args()
+    import_data(args.trades, args.screening, args.chunk_size)
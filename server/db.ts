@@ -1,4 +1,4 @@
-import { Pool } from 'pg';
+import { Pool, types } from 'pg';
 import dotenv from 'dotenv';
 import path from 'path';
 
@@ -31,6 +31,10 @@ if (!connectionString && !process.env.POSTGRES_HOST) {
     throw new Error('Missing database configuration. Provide DATABASE_URL or POSTGRES_HOST variables.');
 }
 
+// DATE columns as plain 'YYYY-MM-DD' strings, as the API has always returned them,
+// instead of JS Dates at local midnight (TIME already comes back as a string)
+types.setTypeParser(types.builtins.DATE, (value: string) => value);
+
 const pool = new Pool(poolConfig);
 
 pool.on('error', (err) => {
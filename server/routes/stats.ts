@@ -85,10 +85,10 @@ router.get('/', authenticateToken, async (req, res) => {
         }
 
         // 2. Get latest screening
-        // Find latest timestamp first
+        // Latest run first: the top of the (date, time, symbol) index
         const latestRunResult = await pool.query(
             `SELECT date, time FROM screening_logs 
-             ORDER BY timestamp DESC LIMIT 1`
+             ORDER BY date DESC, time DESC LIMIT 1`
         );
 
         let lastScreening: any[] = [];
@@ -100,7 +100,11 @@ router.get('/', authenticateToken, async (req, res) => {
                  ORDER BY rank ASC`,
                 [date, time]
             );
-            lastScreening = screeningResult.rows;
+            // Stored as a number; the dashboard shows the "-10.25%" form
+            lastScreening = screeningResult.rows.map((row: any) => ({
+                ...row,
+                percent_below_dma: row.percent_below_dma == null ? null : `${row.percent_below_dma.toFixed(2)}%`
+            }));
         }
 
         res.json({
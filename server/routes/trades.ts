@@ -10,7 +10,7 @@ router.get('/', authenticateToken, async (req, res) => {
         // The Python code had skip/limit but frontend didn't use pagination heavily yet.
         // We'll just return all for now or limit 100 default.
         const result = await pool.query(
-            'SELECT * FROM trades ORDER BY timestamp DESC LIMIT 100'
+            'SELECT * FROM trades ORDER BY date DESC, time DESC LIMIT 100'
         );
         res.json(result.rows);
     } catch (err: any) {
@@ -0,0 +1,97 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+from .interfaces import IBroker, Holding
+from .tracing import in_context
+
+# Shared by every snapshot in the process; a new pool per run would cost more than the fetches
+# it overlaps in simulations, where the broker is in memory.
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="account-snapshot")
+    return _executor
+
+
+def _copy(h: Holding, price: Optional[float] = None) -> Holding:
+    # Direct construction; dataclasses.replace is several times slower on the simulator's hot path
+    return Holding(h.symbol, h.quantity, h.average_price, h.current_price if price is None else price)
+
+
+class _Inline:
+    """Runs submitted calls immediately; stands in for the pool when concurrency isn't wanted."""
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """
+    Everything the strategy needs to know about the account, fetched once at the
+    start of a run. Immutable, so every decision in the run sees the same state.
+    """
+    holdings: Tuple[Holding, ...]
+    margin: float
+    positions: Tuple[Holding, ...]
+    quotes: Mapping[str, float] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def holding(self, symbol: str) -> Optional[Holding]:
+        return next((h for h in self.holdings if h.symbol == symbol), None)
+
+    def repriced(self, quotes: Mapping[str, float], elapsed: float = 0.0) -> "AccountSnapshot":
+        """The same account with holdings marked to quotes, e.g. fresh LTPs at trigger time."""
+        merged = dict(self.quotes)
+        merged.update(quotes)
+        return AccountSnapshot(
+            holdings=tuple(_copy(h, quotes.get(h.symbol)) for h in self.holdings),
+            margin=self.margin,
+            positions=self.positions,
+            quotes=MappingProxyType(merged),
+            elapsed=self.elapsed + elapsed
+        )
+
+    @classmethod
+    def fetch(cls, broker: IBroker, concurrent: bool = True) -> "AccountSnapshot":
+        """
+        Fetches holdings, margin and positions concurrently, so the snapshot costs one
+        round trip rather than three. Holdings come priced by the broker (ZerodhaBroker
+        quotes them as part of get_holdings), and those prices are the snapshot's quotes;
+        nothing is quoted twice. Positions are best effort: a failure there leaves them
+        empty instead of failing the run. concurrent=False fetches inline, for in-memory
+        brokers where thread hand-offs cost more than the calls.
+        """
+        t0 = time.perf_counter()
+        pool = _pool() if concurrent else _Inline()
+        holdings_f = pool.submit(in_context(broker.get_holdings))
+        margin_f = pool.submit(in_context(broker.get_available_margin))
+        positions_f = pool.submit(in_context(broker.get_positions))
+
+        holdings = holdings_f.result()
+        margin = margin_f.result()
+        try:
+            positions = positions_f.result()
+        except Exception as e:
+            print(f"Error fetching positions: {e}")
+            positions = []
+
+        # Copies, so the snapshot can't change under the strategy
+        holdings = tuple(_copy(h) for h in holdings)
+        return cls(
+            holdings=holdings,
+            margin=float(margin),
+            positions=tuple(_copy(p) for p in positions),
+            quotes=MappingProxyType({h.symbol: h.current_price for h in holdings}),
+            elapsed=time.perf_counter() - t0
+        )
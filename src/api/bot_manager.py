@@ -27,7 +27,7 @@ class BotManager:
                     self.logs.pop(0)
         pipe.close()
 
-    def start_bot(self, mode: str) -> bool:
+    def start_bot(self, mode: str, profile: bool = False) -> bool:
         if self.process and self.process.poll() is None:
             return False # Already running
             
@@ -50,6 +50,10 @@ class BotManager:
             cmd.extend(["--test-order", "ALSTONE", "--real"])
         else:
             return False
+
+        # Profiling only makes sense for strategy runs
+        if profile and mode.startswith(("run_now", "schedule")):
+            cmd.append("--profile")
             
         # Run in a new process group so we can kill it properly later
         self.process = subprocess.Popen(
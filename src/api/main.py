@@ -25,7 +25,9 @@ from ..database import engine, Base, SessionLocal
 
 @app.on_event("startup")
 def startup_event():
-    Base.metadata.create_all(bind=engine)
+    # Creates missing tables; older ones are upgraded with python -m src.migrations
+    from ..migrations import check_schema
+    check_schema(engine)
     
     # Auto-seed default user if not exists
     db = SessionLocal()
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from ..database import get_db
 from .. import models
 from . import auth, schemas
 from .bot_manager import bot_manager
-from datetime import timedelta
+from datetime import date, timedelta
+import json
+import math
 
 router = APIRouter()
 
@@ -47,15 +50,23 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+def _newest_first(query, model, start: Optional[date], end: Optional[date]):
+    # Both tables are indexed on (date, time, ...), so this is a range scan of the index
+    if start:
+        query = query.filter(model.date >= start)
+    if end:
+        query = query.filter(model.date <= end)
+    return query.order_by(model.date.desc(), model.time.desc())
+
 @router.get("/screening-logs", response_model=List[schemas.ScreeningLogResponse])
-async def read_screening_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    logs = db.query(models.ScreeningLog).offset(skip).limit(limit).all()
-    return logs
+async def read_screening_logs(skip: int = 0, limit: int = 100, start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    query = _newest_first(db.query(models.ScreeningLog), models.ScreeningLog, start, end)
+    return query.order_by(models.ScreeningLog.rank.asc()).offset(skip).limit(limit).all()
 
 @router.get("/trades", response_model=List[schemas.TradeResponse])
-async def read_trades(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    trades = db.query(models.Trade).offset(skip).limit(limit).all()
-    return trades
+async def read_trades(skip: int = 0, limit: int = 100, start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    query = _newest_first(db.query(models.Trade), models.Trade, start, end)
+    return query.offset(skip).limit(limit).all()
 
 @router.get("/stats")
 async def read_stats(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
@@ -81,14 +92,17 @@ async def read_stats(db: Session = Depends(get_db), current_user: models.User =
     total_cost = sum(h["cost"] for h in holdings_dict.values() if h["qty"] > 0)
     total_trades = len(trades)
     
-    # Correctly find the latest screening run
-    latest_run = db.query(models.ScreeningLog.date, models.ScreeningLog.time).order_by(models.ScreeningLog.timestamp.desc()).first()
+    # Latest screening run: the top of the (date, time, symbol) index
+    latest_run = db.query(models.ScreeningLog.date, models.ScreeningLog.time).order_by(
+        models.ScreeningLog.date.desc(), models.ScreeningLog.time.desc()
+    ).first()
     
     if latest_run:
         last_screening = db.query(models.ScreeningLog).filter(
             models.ScreeningLog.date == latest_run.date,
             models.ScreeningLog.time == latest_run.time
         ).order_by(models.ScreeningLog.rank.asc()).all()
+        last_screening = [schemas.ScreeningLogResponse.model_validate(log) for log in last_screening]
     else:
         last_screening = []
     
@@ -104,11 +118,11 @@ async def start_bot(data: dict, current_user: models.User = Depends(get_current_
     if not mode:
         raise HTTPException(status_code=400, detail="Mode is required")
     
-    success = bot_manager.start_bot(mode)
+    success = bot_manager.start_bot(mode, profile=bool(data.get("profile", False)))
     if not success:
         raise HTTPException(status_code=400, detail="Bot is already running or invalid mode")
     
-    return {"status": "started", "mode": mode}
+    return {"status": "started", "mode": mode, "profile": bool(data.get("profile", False))}
 
 @router.post("/bot/stop")
 async def stop_bot(current_user: models.User = Depends(get_current_user)):
@@ -136,7 +150,7 @@ async def get_bot_status(current_user: models.User = Depends(get_current_user)):
 
 @router.get("/holdings", response_model=List[schemas.HoldingResponse])
 async def read_holdings(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    from ..broker.zerodha_broker import ZerodhaBroker
+    from ..broker.zerodha_broker import get_zerodha_broker
     from ..auth import get_access_token
     from ..config import config
     
@@ -187,7 +201,8 @@ async def read_holdings(db: Session = Depends(get_db), current_user: models.User
     access_token = get_access_token()
     if access_token:
         try:
-            broker = ZerodhaBroker(api_key=config.ZERODHA_API_KEY, access_token=access_token)
+            # Shared per token, so requests reuse one Kite client and its pooled connections
+            broker = get_zerodha_broker(config.ZERODHA_API_KEY, access_token)
             ltp_map = broker.get_ltp(symbols_to_fetch)
             
             for h in bot_holdings:
@@ -198,6 +213,80 @@ async def read_holdings(db: Session = Depends(get_db), current_user: models.User
 
     return bot_holdings
 
+def _run_to_dict(run: models.StrategyRun) -> dict:
+    return {
+        "id": run.id,
+        "started_at": run.started_at,
+        "mode": run.mode,
+        "dry_run": run.dry_run or 0,
+        "total_ms": run.total_ms,
+        "stages": json.loads(run.stages or "{}"),
+        "call_counts": json.loads(run.call_counts or "{}"),
+        "decision": run.decision,
+        "error": run.error
+    }
+
+def _percentiles(values: List[float]) -> dict:
+    # Nearest-rank percentiles; run counts are small enough to sort in place
+    ordered = sorted(values)
+    def rank(p):
+        return ordered[max(0, math.ceil(p / 100.0 * len(ordered)) - 1)]
+    return {
+        "count": len(ordered),
+        "p50": rank(50),
+        "p90": rank(90),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": ordered[-1]
+    }
+
+@router.get("/runs", response_model=List[schemas.StrategyRunResponse])
+async def read_strategy_runs(skip: int = 0, limit: int = 50, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    runs = db.query(models.StrategyRun).order_by(models.StrategyRun.started_at.desc()).offset(skip).limit(limit).all()
+    return [_run_to_dict(r) for r in runs]
+
+@router.get("/runs/latency", response_model=schemas.RunLatencyResponse)
+async def read_run_latency(limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """Latency percentiles (ms) of the whole run and of every traced stage over the last `limit` runs."""
+    runs = db.query(models.StrategyRun).order_by(models.StrategyRun.started_at.desc()).limit(limit).all()
+
+    totals = [r.total_ms for r in runs if r.total_ms is not None]
+    by_stage = {}
+    for r in runs:
+        for name, ms in json.loads(r.stages or "{}").items():
+            by_stage.setdefault(name, []).append(ms)
+
+    return {
+        "runs": len(runs),
+        "total": _percentiles(totals) if totals else None,
+        "stages": {name: _percentiles(values) for name, values in by_stage.items()}
+    }
+
+@router.get("/profiles", response_model=List[schemas.ProfileResponse])
+async def read_profiles(current_user: models.User = Depends(get_current_user)):
+    from ..profiler import list_profiles
+    return list_profiles()
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str, current_user: models.User = Depends(get_current_user)):
+    import os
+    from ..config import config
+    from ..profiler import PROFILE_EXTENSION
+
+    # Only plain file names from the profile directory can be served
+    if os.path.basename(name) != name or not name.endswith(PROFILE_EXTENSION):
+        raise HTTPException(status_code=400, detail="Invalid profile name")
+    path = os.path.join(config.PROFILE_DIR, name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+@router.get("/http/stats")
+async def read_http_stats(current_user: models.User = Depends(get_current_user)):
+    """Per-endpoint request counts, latency and throttling, and per-host connection reuse of the shared HTTP pool."""
+    from ..http_pool import pool_stats
+    return pool_stats()
+
 @router.get("/bot/logs")
 async def get_bot_logs(current_user: models.User = Depends(get_current_user)):
     return {"logs": bot_manager.get_logs()}
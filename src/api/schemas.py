@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, field_validator
+from typing import Optional, List, Dict
+from datetime import date, datetime, time
 
 class UserBase(BaseModel):
     username: str
@@ -24,26 +25,33 @@ class TokenData(BaseModel):
 
 class ScreeningLogResponse(BaseModel):
     id: int
-    date: str
-    time: str
+    date: date
+    time: time
     rank: int
     symbol: str
     current_price: float
     dma_25: float
     percent_below_dma: str
 
+    # Stored as a number; clients get the "-10.25%" form the CSV log uses
+    @field_validator("percent_below_dma", mode="before")
+    @classmethod
+    def format_percent(cls, value):
+        return f"{value:.2f}%" if isinstance(value, (int, float)) else value
+
     class Config:
         from_attributes = True
 
 class TradeResponse(BaseModel):
     id: int
-    date: str
-    time: str
+    date: date
+    time: time
     symbol: str
     action: str
     quantity: int
     price: float
     total_cost: float
+    order_id: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -53,3 +61,32 @@ class HoldingResponse(BaseModel):
     quantity: int
     average_price: float
     current_price: float
+
+class StrategyRunResponse(BaseModel):
+    id: int
+    started_at: datetime
+    mode: Optional[str] = None
+    dry_run: int
+    total_ms: Optional[float] = None
+    stages: Dict[str, float]
+    call_counts: Dict[str, int]
+    decision: Optional[str] = None
+    error: Optional[str] = None
+
+class LatencyPercentiles(BaseModel):
+    count: int
+    p50: float
+    p90: float
+    p95: float
+    p99: float
+    max: float
+
+class RunLatencyResponse(BaseModel):
+    runs: int
+    total: Optional[LatencyPercentiles] = None
+    stages: Dict[str, LatencyPercentiles]
+
+class ProfileResponse(BaseModel):
+    name: str
+    size: int
+    created_at: datetime
@@ -0,0 +1,116 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from ..interfaces import IBroker, Holding, OrderResult
+
+
+class CachingBroker(IBroker):
+    """
+    Memoizes broker reads for the lifetime of one strategy run.
+
+    get_holdings, get_positions and get_available_margin are cached whole; get_ltp is cached per
+    symbol, so a later call only goes out for symbols not priced yet. Identical reads
+    issued concurrently share one in-flight call instead of each hitting the broker.
+    Placing an order (successful or not) drops holdings, positions and margin, since
+    they may have changed; quotes are left alone. Create a new instance for every run.
+    """
+
+    def __init__(self, broker: IBroker):
+        self.broker = broker
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, Any] = {}
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._ltp: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = load()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            # An order may have invalidated this key while the read was in flight;
+            # the value is still handed to waiters but not kept
+            if self._in_flight.pop(key, None) is future:
+                self._values[key] = value
+        future.set_result(value)
+        return value
+
+    def invalidate(self, *keys: Hashable):
+        with self._lock:
+            for key in keys or list(self._values):
+                self._values.pop(key, None)
+                self._in_flight.pop(key, None)
+            if not keys:
+                self._ltp.clear()
+
+    def get_holdings(self) -> List[Holding]:
+        # Copy so callers can't reorder the cached list
+        return list(self._get("holdings", self.broker.get_holdings))
+
+    def get_available_margin(self) -> float:
+        return self._get("margin", self.broker.get_available_margin)
+
+    def get_positions(self) -> List[Holding]:
+        return list(self._get("positions", self.broker.get_positions))
+
+    def get_ltp(self, symbols: List[str]) -> Dict[str, float]:
+        with self._lock:
+            missing = sorted(set(s for s in symbols if s not in self._ltp))
+            if not missing:
+                self.hits += 1
+
+        if missing:
+            fetched = self._get(("ltp", tuple(missing)), lambda: self.broker.get_ltp(missing))
+            with self._lock:
+                self._ltp.update(fetched)
+                self._values.pop(("ltp", tuple(missing)), None)
+
+        with self._lock:
+            return {s: self._ltp[s] for s in symbols if s in self._ltp}
+
+    def place_buy_order(self, symbol: str, quantity: int, price: Optional[float] = None, **kwargs) -> OrderResult:
+        try:
+            return self.broker.place_buy_order(symbol, quantity, price, **kwargs)
+        finally:
+            self.invalidate("holdings", "margin", "positions")
+
+    def place_sell_order(self, symbol: str, quantity: int, price: Optional[float] = None, **kwargs) -> OrderResult:
+        try:
+            return self.broker.place_sell_order(symbol, quantity, price, **kwargs)
+        finally:
+            self.invalidate("holdings", "margin", "positions")
+
+    def confirm_fill(self, order: OrderResult) -> Future:
+        return self.broker.confirm_fill(order)
+
+    def prepare(self, symbols: List[str]):
+        self.broker.prepare(symbols)
+
+    def __getattr__(self, name: str):
+        # Anything beyond IBroker (e.g. ZerodhaBroker.kite) goes to the wrapped broker uncached
+        if name == "broker":
+            raise AttributeError(name)
+        return getattr(self.broker, name)
+
+    def stats(self) -> str:
+        return f"[BROKER CACHE] {self.hits} hits, {self.misses} broker calls"
@@ -0,0 +1,137 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple
+from ..config import config
+from ..interfaces import OrderResult
+
+# Kite order states after which nothing changes any more
+FINAL_STATUSES = ("COMPLETE", "REJECTED", "CANCELLED")
+
+
+def completed_fill(order: OrderResult) -> Future:
+    """A future that is already resolved with order, for brokers that fill synchronously."""
+    future: Future = Future()
+    future.set_result(order)
+    return future
+
+
+class FillTracker:
+    """
+    Turns placed orders into futures of their final fill.
+
+    Order updates pushed over the websocket (see TickStream.order_update_handlers)
+    resolve orders as soon as they arrive. Polling order_history is only the fallback:
+    an order is first polled FILL_POLL_DELAY_SECONDS after it was tracked, then with
+    exponential backoff up to FILL_POLL_MAX_SECONDS. A future only ever resolves with
+    what the broker reported; nothing is guessed. Orders still open after
+    FILL_TIMEOUT_SECONDS are flagged (see unconfirmed()) for reconciliation and polled
+    on until they reach a final state. Everything runs on one background thread;
+    callers never block unless they choose to wait on a future.
+    """
+
+    def __init__(self, kite):
+        self.kite = kite
+        self._pending: Dict[str, Tuple[OrderResult, Future, float]] = {}
+        self._overdue: Set[str] = set()
+        self._schedule: List[Tuple[float, int, str, float]] = []   # (next poll, seq, order_id, backoff)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, order: OrderResult) -> Future:
+        if order.status in FINAL_STATUSES:
+            return completed_fill(order)
+        future: Future = Future()
+        now = time.monotonic()
+        with self._lock:
+            self._pending[order.order_id] = (order, future, now + config.FILL_TIMEOUT_SECONDS)
+            heapq.heappush(self._schedule, (now + config.FILL_POLL_DELAY_SECONDS, next(self._seq),
+                                            order.order_id, config.FILL_POLL_DELAY_SECONDS))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="fill-tracker", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        return future
+
+    def on_order_update(self, data: dict):
+        """Handler for Kite order update messages (websocket or postback payloads)."""
+        self._update(str(data.get("order_id")), data)
+
+    def _update(self, order_id: str, data: dict) -> bool:
+        status = data.get("status")
+        if status not in FINAL_STATUSES:
+            return False
+        with self._lock:
+            entry = self._pending.pop(order_id, None)
+            late = order_id in self._overdue
+            self._overdue.discard(order_id)
+        if entry is None:
+            return True
+        order, future, _ = entry
+        if late:
+            print(f"[FILLS] Order {order_id} ({order.symbol}) finally {status}.")
+        future.set_result(OrderResult(
+            order_id=order_id,
+            status=status,
+            average_price=float(data.get("average_price") or 0.0),
+            quantity=int(data.get("filled_quantity") or 0),
+            symbol=order.symbol
+        ))
+        return True
+
+    def _poll(self, order_id: str) -> bool:
+        try:
+            history = self.kite.order_history(order_id)
+        except Exception as e:
+            print(f"Error polling order {order_id}: {e}")
+            return False
+        return bool(history) and self._update(order_id, history[-1])
+
+    def _flag_overdue(self, order_id: str):
+        with self._lock:
+            entry = self._pending.get(order_id)
+            if entry is None or order_id in self._overdue:
+                return
+            self._overdue.add(order_id)
+        print(f"[FILLS] Order {order_id} ({entry[0].symbol}) not final after {config.FILL_TIMEOUT_SECONDS:.0f}s. "
+              f"Not recorded until the broker reports it; still polling every {config.FILL_POLL_MAX_SECONDS:g}s.")
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Drop schedule entries for orders already resolved by a push update
+                while self._schedule and self._schedule[0][2] not in self._pending:
+                    heapq.heappop(self._schedule)
+                if not self._schedule:
+                    # track() starts a new thread for the next order
+                    self._thread = None
+                    return
+                due, _, order_id, backoff = self._schedule[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    continue
+                heapq.heappop(self._schedule)
+                deadline = self._pending[order_id][2]
+
+            if self._poll(order_id):
+                continue
+            if time.monotonic() >= deadline:
+                self._flag_overdue(order_id)
+            backoff = min(backoff * 2, config.FILL_POLL_MAX_SECONDS)
+            with self._lock:
+                if order_id in self._pending:
+                    heapq.heappush(self._schedule, (time.monotonic() + backoff, next(self._seq), order_id, backoff))
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def unconfirmed(self) -> List[OrderResult]:
+        """Orders past FILL_TIMEOUT_SECONDS without a final state, as placed. None of them is recorded yet."""
+        with self._lock:
+            return [self._pending[order_id][0] for order_id in self._overdue if order_id in self._pending]
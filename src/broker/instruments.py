@@ -0,0 +1,165 @@
+import glob
+import os
+import numpy as np
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+from ..config import config
+from ..data.bar_store import IST
+
+# Yahoo-style suffixes and the exchange they stand for
+SUFFIX_EXCHANGES = {".NS": "NSE", ".BO": "BSE"}
+EXCHANGE_SUFFIXES = {exchange: suffix for suffix, exchange in SUFFIX_EXCHANGES.items()}
+
+
+def _today() -> date:
+    # Kite publishes the dump each IST morning; the host's own date may still be yesterday's
+    return datetime.now(IST).date()
+
+
+INSTRUMENT_DTYPE = np.dtype([
+    ("tradingsymbol", "U40"),
+    ("exchange", "U4"),
+    ("instrument_token", "i8"),
+    ("tick_size", "f8"),
+    ("lot_size", "i4"),
+])
+
+
+@dataclass
+class Instrument:
+    tradingsymbol: str
+    exchange: str
+    instrument_token: int
+    tick_size: float
+    lot_size: int
+
+    @property
+    def key(self) -> str:
+        """Kite quote key, e.g. NSE:INFY"""
+        return f"{self.exchange}:{self.tradingsymbol}"
+
+    def round_price(self, price: float) -> float:
+        """Rounds to the nearest valid tick for this instrument."""
+        tick = self.tick_size or 0.05
+        return round(round(price / tick) * tick, 2)
+
+
+def normalize_symbol(symbol: str) -> Tuple[str, Optional[str]]:
+    """
+    Splits any symbol spelling used in this project into (tradingsymbol, exchange hint):
+    INFY.NS -> (INFY, NSE), INFY.BO -> (INFY, BSE), NSE:INFY -> (INFY, NSE), infy -> (INFY, None).
+    """
+    symbol = symbol.strip().upper()
+    if ":" in symbol:
+        exchange, symbol = symbol.split(":", 1)
+        return symbol, exchange
+    for suffix, exchange in SUFFIX_EXCHANGES.items():
+        if symbol.endswith(suffix):
+            return symbol[:-len(suffix)], exchange
+    return symbol, None
+
+
+class InstrumentMaster:
+    """
+    Kite's instrument dump for the configured exchanges, downloaded at most once a day
+    and kept on disk as a compact NumPy file (a few fields per instrument instead of
+    the multi-megabyte CSV). Loading builds an index so resolving a symbol to its
+    token, exchange, tick size and lot size is a dict lookup.
+    """
+
+    def __init__(self, kite=None, directory: Optional[str] = None):
+        self.kite = kite
+        self.directory = directory or config.INSTRUMENTS_DIR
+        self.records = np.empty(0, dtype=INSTRUMENT_DTYPE)
+        self._by_key: Dict[Tuple[str, str], int] = {}
+        self._loaded_for: Optional[date] = None
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.directory, f"instruments_{day.isoformat()}.npy")
+
+    def _download(self) -> np.ndarray:
+        rows = []
+        for exchange in config.INSTRUMENT_EXCHANGES:
+            for i in self.kite.instruments(exchange):
+                rows.append((i["tradingsymbol"], i["exchange"], int(i["instrument_token"]),
+                             float(i.get("tick_size") or 0.05), int(i.get("lot_size") or 1)))
+        return np.array(rows, dtype=INSTRUMENT_DTYPE)
+
+    def _save(self, records: np.ndarray, day: date):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(day)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp_path, path)
+        # Older dumps are superseded
+        for old in glob.glob(os.path.join(self.directory, "instruments_*.npy")):
+            if old != path:
+                os.remove(old)
+
+    def load(self, today: Optional[date] = None) -> "InstrumentMaster":
+        """Today's dump if on disk, else a fresh download, else the newest older dump."""
+        today = today or _today()
+        path = self._path(today)
+        records = None
+
+        if os.path.exists(path):
+            records = np.load(path)
+        elif self.kite is not None:
+            try:
+                records = self._download()
+                self._save(records, today)
+                print(f"[INSTRUMENTS] Downloaded {len(records)} instruments for {', '.join(config.INSTRUMENT_EXCHANGES)}.")
+            except Exception as e:
+                print(f"Error downloading instrument dump: {e}")
+
+        if records is None:
+            older = sorted(glob.glob(os.path.join(self.directory, "instruments_*.npy")))
+            if older:
+                print(f"[INSTRUMENTS] Using stale dump {os.path.basename(older[-1])}.")
+                records = np.load(older[-1])
+
+        if records is not None:
+            self.records = records
+            self._by_key = {(s, e): i for i, (s, e) in enumerate(zip(records["tradingsymbol"].tolist(),
+                                                                         records["exchange"].tolist()))}
+        self._loaded_for = today
+        return self
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def resolve(self, symbol: str, exchange: Optional[str] = None) -> Optional[Instrument]:
+        """
+        Looks a symbol up in any spelling (INFY, INFY.NS, NSE:INFY). An explicit exchange
+        or a suffix is honoured; otherwise exchanges are tried in INSTRUMENT_EXCHANGES order.
+        Returns None if the symbol isn't listed.
+        """
+        # Long-lived brokers pick up the new dump on the first lookup of each day
+        if self._loaded_for != _today():
+            self.load()
+        tradingsymbol, hint = normalize_symbol(symbol)
+        exchanges = [exchange or hint] if (exchange or hint) else config.INSTRUMENT_EXCHANGES
+        for ex in exchanges:
+            i = self._by_key.get((tradingsymbol, ex))
+            if i is not None:
+                r = self.records[i]
+                return Instrument(
+                    tradingsymbol=tradingsymbol,
+                    exchange=ex,
+                    instrument_token=int(r["instrument_token"]),
+                    tick_size=float(r["tick_size"]),
+                    lot_size=int(r["lot_size"])
+                )
+        return None
+
+    def to_symbol(self, tradingsymbol: str, exchange: Optional[str] = None) -> str:
+        """
+        The project's symbol for a Kite tradingsymbol: INFY on NSE -> INFY.NS, on BSE ->
+        INFY.BO. Without an exchange, the one resolve() finds it on (NSE preferred);
+        NSE when the master doesn't know the symbol at all.
+        """
+        instrument = self.resolve(tradingsymbol, exchange)
+        listed = instrument.exchange if instrument else (exchange or "NSE")
+        return f"{normalize_symbol(tradingsymbol)[0]}{EXCHANGE_SUFFIXES.get(listed, '.NS')}"
@@ -17,8 +17,15 @@ class MockBroker(IBroker):
     def get_holdings(self) -> List[Holding]:
         return list(self.holdings.values())
 
+    def update_prices(self, prices: Dict[str, float]):
+        """Marks holdings to market, e.g. once per simulated day."""
+        for symbol, price in prices.items():
+            if symbol in self.holdings:
+                self.holdings[symbol].current_price = price
+
     def place_buy_order(self, symbol: str, quantity: int, price: Optional[float] = None) -> OrderResult:
         cost = quantity * price
+        self.cash_balance -= cost
         
         print(f"[MOCK BROKER] Placed BUY order for {symbol}: {quantity} qty @ {price}")
         
@@ -66,6 +73,8 @@ class MockBroker(IBroker):
         # Update mock holdings - remove or reduce quantity
         if symbol in self.holdings:
             h = self.holdings[symbol]
+            sold_qty = min(quantity, h.quantity)
+            self.cash_balance += sold_qty * (price if price else h.current_price)
             if h.quantity <= quantity:
                 # Selling entire position
                 del self.holdings[symbol]
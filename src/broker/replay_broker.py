@@ -0,0 +1,76 @@
+import copy
+from concurrent.futures import Future
+from typing import List, Optional, Dict
+from ..interfaces import IBroker, Holding, OrderResult
+from ..snapshot import Snapshot
+
+
+class ReplayBroker(IBroker):
+    """
+    Records the read calls of a live broker into a snapshot (mode="record"), or serves
+    them back with no network (mode="replay"). Reads are replayed in the order they were
+    recorded. In replay mode orders are acknowledged locally and never leave the process;
+    in record mode every call goes through to the wrapped broker.
+    """
+
+    def __init__(self, snapshot: Snapshot, mode: str = "replay", broker: Optional[IBroker] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if mode == "record" and broker is None:
+            raise ValueError("Record mode needs a live broker to wrap")
+        self.snapshot = snapshot
+        self.mode = mode
+        self.broker = broker
+        self._order_count = 0
+
+    def _read(self, method: str, *args):
+        if self.mode == "replay":
+            return copy.deepcopy(self.snapshot.replay_call(method))
+        result = getattr(self.broker, method)(*args)
+        self.snapshot.record_call(method, copy.deepcopy(result))
+        return result
+
+    def get_holdings(self) -> List[Holding]:
+        return self._read("get_holdings")
+
+    def get_available_margin(self) -> float:
+        return self._read("get_available_margin")
+
+    def get_ltp(self, symbols: List[str]) -> Dict[str, float]:
+        return self._read("get_ltp", symbols)
+
+    def get_positions(self) -> List[Holding]:
+        if self.mode == "replay" and "get_positions" not in self.snapshot.broker_calls:
+            # Recorded before positions were part of a run
+            return []
+        return self._read("get_positions")
+
+    def _replay_order(self, side: str, symbol: str, quantity: int, price: Optional[float]) -> OrderResult:
+        self._order_count += 1
+        print(f"[REPLAY BROKER] {side} {symbol}: {quantity} qty @ {price}")
+        return OrderResult(
+            order_id=f"REPLAY-{self._order_count}",
+            status="COMPLETE",
+            average_price=price if price else 0.0,
+            quantity=quantity,
+            symbol=symbol
+        )
+
+    def place_buy_order(self, symbol: str, quantity: int, price: Optional[float] = None) -> OrderResult:
+        if self.mode == "replay":
+            return self._replay_order("BUY", symbol, quantity, price)
+        return self.broker.place_buy_order(symbol, quantity, price)
+
+    def place_sell_order(self, symbol: str, quantity: int, price: Optional[float] = None) -> OrderResult:
+        if self.mode == "replay":
+            return self._replay_order("SELL", symbol, quantity, price)
+        return self.broker.place_sell_order(symbol, quantity, price)
+
+    def prepare(self, symbols: List[str]):
+        if self.mode == "record":
+            self.broker.prepare(symbols)
+
+    def confirm_fill(self, order: OrderResult) -> Future:
+        if self.mode == "replay":
+            return super().confirm_fill(order)
+        return self.broker.confirm_fill(order)
@@ -1,27 +1,87 @@
-from typing import List, Optional, Dict
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Dict, Tuple
 from ..interfaces import IBroker, Holding, OrderResult
+from ..config import config
+from ..data.quote_fetcher import QuoteFetcher
+from ..data.tick_stream import active_stream
+from ..http_pool import get_session
+from ..tracing import in_context
+from .fill_tracker import FillTracker
+from .instruments import Instrument, InstrumentMaster, normalize_symbol
 from kiteconnect import KiteConnect
 import logging
 
+def to_kite_instrument(symbol: str) -> str:
+    """INFY.NS / INFY -> NSE:INFY, INFY.BO -> BSE:INFY"""
+    tradingsymbol, exchange = normalize_symbol(symbol)
+    return f"{exchange or 'NSE'}:{tradingsymbol}"
+
 class ZerodhaBroker(IBroker):
-    def __init__(self, api_key: str, access_token: str):
-        self.kite = KiteConnect(api_key=api_key)
+    def __init__(self, api_key: str, access_token: str, quote_fetcher: Optional[QuoteFetcher] = None,
+                 market_data_source: Optional[str] = None, instruments: Optional[InstrumentMaster] = None):
+        self.kite = KiteConnect(api_key=api_key, root=config.KITE_ROOT_URL)
+        # Pooled keep-alive connections, rate limited to Kite's per-endpoint limits
+        self.kite.reqsession = get_session()
         self.kite.set_access_token(access_token)
+        self.quote_fetcher = quote_fetcher or QuoteFetcher()
+        self.market_data_source = market_data_source or config.MARKET_DATA_SOURCE
+        # Loaded on first use, at most one download per day
+        self.instruments = instruments or InstrumentMaster(self.kite)
+        self.fill_tracker = FillTracker(self.kite)
+
+    def confirm_fill(self, order: OrderResult) -> Future:
+        """Resolves with the actual fill once Kite reports the order complete, rejected or cancelled."""
+        # Websocket order updates resolve fills immediately; polling covers the rest
+        stream = active_stream()
+        if stream and self.fill_tracker.on_order_update not in stream.order_update_handlers:
+            stream.order_update_handlers.append(self.fill_tracker.on_order_update)
+        return self.fill_tracker.track(order)
+
+    def resolve_instrument(self, symbol: str, exchange: Optional[str] = None) -> Optional[Instrument]:
+        return self.instruments.resolve(symbol, exchange)
+
+    def prepare(self, symbols: List[str]):
+        """Loads today's instrument master (downloading it if needed) and checks symbols resolve."""
+        missing = [s for s in symbols if self.resolve_instrument(s) is None]
+        if missing and len(self.instruments):
+            print(f"[INSTRUMENTS] {len(missing)} symbols not listed: {', '.join(missing[:10])}")
+
+    def _order_target(self, symbol: str, price: Optional[float], exchange: Optional[str]):
+        """
+        (tradingsymbol, exchange, price) for an order. The exchange comes from the
+        instrument master (NSE preferred) and the price is rounded to its tick size.
+        Symbols missing from the master keep the old NSE / 0.05 tick defaults.
+        """
+        instrument = self.resolve_instrument(symbol, exchange)
+        if instrument is None:
+            tradingsymbol, hint = normalize_symbol(symbol)
+            if price is not None:
+                price = round(price * 20) / 20.0
+            return tradingsymbol, exchange or hint or "NSE", price
+        if price is not None:
+            price = instrument.round_price(price)
+        return instrument.tradingsymbol, instrument.exchange, price
 
     def get_holdings(self) -> List[Holding]:
         try:
             k_holdings = self.kite.holdings()
-            # Fetch accurate LTP from Yahoo Finance for all holdings
-            symbols = [h['tradingsymbol'] for h in k_holdings]
-            # Ensure .NS for LTP fetching
-            yf_symbols = [s if s.endswith(".NS") else f"{s}.NS" for s in symbols]
-            ltp_dict = self.get_ltp(yf_symbols)
+            # INFY.NS / INFY.BO, from the exchange the holding is on
+            yf_symbols = [self.instruments.to_symbol(h['tradingsymbol'], h.get('exchange')) for h in k_holdings]
+            zerodha_prices = {s: float(h['last_price']) for s, h in zip(yf_symbols, k_holdings)}
+            if self.market_data_source == "kite":
+                # Kite's holdings already carry the live last_price; only unpriced ones need a quote
+                ltp_dict = {s: p for s, p in zerodha_prices.items() if p}
+                unpriced = [s for s in yf_symbols if s not in ltp_dict]
+                if unpriced:
+                    ltp_dict.update(self.get_ltp(unpriced))
+            else:
+                # Fetch accurate LTP from Yahoo Finance for all holdings.
+                # Zerodha's own last_price is the fallback for anything Yahoo can't answer in time
+                ltp_dict = self.quote_fetcher.fetch(yf_symbols, fallback=zerodha_prices)
 
             holdings_list = []
-            for h in k_holdings:
-                orig_symbol = h['tradingsymbol']
-                symbol = orig_symbol if orig_symbol.endswith(".NS") else f"{orig_symbol}.NS"
-                
+            for symbol, h in zip(yf_symbols, k_holdings):
                 # Use YF price if available, else fallback to Zerodha
                 current_price = ltp_dict.get(symbol, float(h['last_price']))
                 
@@ -36,14 +96,28 @@ class ZerodhaBroker(IBroker):
             print(f"Error fetching holdings from Zerodha: {e}")
             return []
 
-    def place_buy_order(self, symbol: str, quantity: int, price: Optional[float] = None, exchange: str = "NSE") -> OrderResult:
+    def get_positions(self) -> List[Holding]:
         try:
-            # Round price to nearest 0.05 (tick size) if provided
-            if price is not None:
-                price = round(price * 20) / 20.0
+            positions = self.kite.positions().get('net', [])
+        except Exception as e:
+            print(f"Error fetching positions from Zerodha: {e}")
+            return []
+        result = []
+        for p in positions:
+            if not int(p.get('quantity', 0)):
+                continue
+            result.append(Holding(
+                symbol=self.instruments.to_symbol(p['tradingsymbol'], p.get('exchange')),
+                quantity=int(p['quantity']),
+                average_price=float(p.get('average_price', 0.0)),
+                current_price=float(p.get('last_price', 0.0))
+            ))
+        return result
 
-            # Cleanup symbol suffix if present, regardless of exchange
-            trading_symbol = symbol.replace(".NS", "").replace(".BO", "")
+    def place_buy_order(self, symbol: str, quantity: int, price: Optional[float] = None, exchange: Optional[str] = None) -> OrderResult:
+        try:
+            # Exchange resolved up front, price rounded to the instrument's tick size
+            trading_symbol, exchange, price = self._order_target(symbol, price, exchange)
             
             # Place Order
             # For simplicity, using MARKET order if price is None, else LIMIT
@@ -63,10 +137,11 @@ class ZerodhaBroker(IBroker):
             
             print(f"Order placed successfully. ID: {order_id}")
             
+            # Only accepted so far; confirm_fill() resolves the actual fill
             return OrderResult(
                 order_id=str(order_id),
-                status="COMPLETE", # Ideally we check status via order_history, but assume placed = complete for now or "SUBMITTED"
-                average_price=price if price else 0.0, # Approximate
+                status="OPEN",
+                average_price=price if price else 0.0, # Approximate until filled
                 quantity=quantity,
                 symbol=symbol
             )
@@ -100,54 +175,67 @@ class ZerodhaBroker(IBroker):
             print(f"Error fetching margins: {e}")
             return 0.0
 
+    def _kite_ltp_chunk(self, instruments: List[str]) -> Dict[str, float]:
+        try:
+            quotes = self.kite.ltp(instruments)
+        except Exception as e:
+            print(f"Error fetching LTP from Kite for {len(instruments)} instruments: {e}")
+            return {}
+        return {k: float(q['last_price']) for k, q in quotes.items() if q.get('last_price')}
+
+    def _kite_ltp(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Batched Kite LTP: one ltp() request per KITE_LTP_BATCH_SIZE instruments, with
+        larger lists split into chunks fetched concurrently. Keyed by the symbols as passed.
+        """
+        by_instrument = {to_kite_instrument(s): s for s in symbols}
+        instruments = list(by_instrument)
+        size = max(1, config.KITE_LTP_BATCH_SIZE)
+        chunks = [instruments[i:i + size] for i in range(0, len(instruments), size)]
+
+        if len(chunks) <= 1:
+            results = [self._kite_ltp_chunk(c) for c in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(chunks), max(1, config.KITE_LTP_WORKERS))) as executor:
+                results = list(executor.map(in_context(self._kite_ltp_chunk), chunks))
+
+        prices = {}
+        for quotes in results:
+            for instrument, price in quotes.items():
+                if instrument in by_instrument:
+                    prices[by_instrument[instrument]] = price
+        return prices
+
     def get_ltp(self, symbols: List[str]) -> Dict[str, float]:
         """
-        Fetch Last Traded Price from Yahoo Finance.
-        Zerodha API has permission restrictions for market data.
+        Fetch Last Traded Price.
+        With MARKET_DATA_SOURCE="kite" prices come from batched Kite LTP calls and Yahoo
+        Finance is only asked for what Kite couldn't price. Otherwise (the default, for
+        accounts without Kite market data permissions) everything comes from Yahoo Finance.
         """
+        symbols = list(dict.fromkeys(symbols))
+        # Streamed ticks first: no network at all for subscribed symbols
+        stream = active_stream()
+        prices = stream.latest(symbols) if stream else {}
+        missing = [s for s in symbols if s not in prices]
+        if missing and self.market_data_source == "kite":
+            prices.update(self._kite_ltp(missing))
+        missing = [s for s in symbols if s not in prices]
+        if not missing:
+            return prices
+
+        if self.market_data_source == "kite":
+            print(f"[QUOTES] {len(prices)}/{len(symbols)} priced by ticks/Kite; falling back to Yahoo Finance for {len(missing)}.")
         try:
-            import yfinance as yf
-            
-            result = {}
-            for symbol in symbols:
-                try:
-                    # Ensure symbol has .NS suffix for NSE stocks
-                    yf_symbol = symbol if symbol.endswith('.NS') else f"{symbol}.NS"
-                    ticker = yf.Ticker(yf_symbol)
-                    
-                    # Try fast_info first
-                    try:
-                        current_price = ticker.fast_info['last_price']
-                    except:
-                        # Fallback: regular info or market price
-                        info = ticker.info
-                        current_price = info.get('currentPrice') or info.get('regularMarketPrice')
-                    
-                    if not current_price:
-                        # Fallback: try to get from history
-                        hist = ticker.history(period='1d')
-                        if not hist.empty:
-                            current_price = float(hist['Close'].iloc[-1])
-                    
-                    if current_price:
-                        result[symbol] = float(current_price)
-                except Exception as e:
-                    print(f"Error fetching LTP for {symbol}: {e}")
-                    continue
-            
-            return result
+            prices.update(self.quote_fetcher.fetch(missing))
         except Exception as e:
             print(f"Error fetching LTP from Yahoo Finance: {e}")
-            return {}
+        return prices
     
-    def place_sell_order(self, symbol: str, quantity: int, price: Optional[float] = None, exchange: str = "NSE") -> OrderResult:
+    def place_sell_order(self, symbol: str, quantity: int, price: Optional[float] = None, exchange: Optional[str] = None) -> OrderResult:
         try:
-            # Round price to nearest 0.05 (tick size) if provided
-            if price is not None:
-                price = round(price * 20) / 20.0
-
-            # Cleanup symbol suffix if present
-            trading_symbol = symbol.replace(".NS", "").replace(".BO", "")
+            # Exchange resolved up front, price rounded to the instrument's tick size
+            trading_symbol, exchange, price = self._order_target(symbol, price, exchange)
             
             # Place Sell Order
             order_type = self.kite.ORDER_TYPE_MARKET if price is None else self.kite.ORDER_TYPE_LIMIT
@@ -166,9 +254,10 @@ class ZerodhaBroker(IBroker):
             
             print(f"Sell order placed successfully. ID: {order_id}")
             
+            # Only accepted so far; confirm_fill() resolves the actual fill
             return OrderResult(
                 order_id=str(order_id),
-                status="COMPLETE",
+                status="OPEN",
                 average_price=price if price else 0.0,
                 quantity=quantity,
                 symbol=symbol
@@ -177,3 +266,19 @@ class ZerodhaBroker(IBroker):
             print(f"Error placing sell order for {symbol}: {e}")
             raise e
 
+
+
+_brokers: Dict[str, Tuple[str, ZerodhaBroker]] = {}
+_brokers_lock = threading.Lock()
+
+def get_zerodha_broker(api_key: str, access_token: str) -> ZerodhaBroker:
+    """
+    One ZerodhaBroker per API key, reused for as long as the access token stays the
+    same (tokens rotate daily). Callers share its instrument master and HTTP pool
+    instead of building a new client per run or per request.
+    """
+    with _brokers_lock:
+        cached = _brokers.get(api_key)
+        if cached is None or cached[0] != access_token:
+            cached = _brokers[api_key] = (access_token, ZerodhaBroker(api_key, access_token))
+        return cached[1]
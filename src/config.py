@@ -17,6 +17,69 @@ class Config:
     SELL_PROFIT_THRESHOLD: float = 0.05  # 5% profit target for selling
     DMA_PERIOD: int = 25
     SCHEDULE_TIME: str = "15:20"  # 3:20 PM
+    WARMUP_LEAD_MINUTES: int = 5  # Scheduled runs warm up (history, DMAs, account) this long before SCHEDULE_TIME; 0 disables
+    MARKET_CLOSE_TIME: str = "15:30"  # NSE close (IST); daily bars are final after this
+    MARKET_HOLIDAYS_FILE: str = os.getenv("MARKET_HOLIDAYS_FILE")  # Extra closures, one YYYY-MM-DD per line (see src/market_calendar.py)
+
+    # Screening universe: "nifty50", an index name from src/universe.py, or a file path
+    UNIVERSE: str = os.getenv("UNIVERSE", "nifty50")
+    SCREEN_CHUNK_SIZE: int = 250  # Symbols screened per chunk; bounds memory on large universes
+    DOWNLOAD_CHUNK_SIZE: int = 50  # Tickers per yfinance download request
+    DOWNLOAD_WORKERS: int = 4  # Download requests in flight at once
+
+    # Local daily bar store (see src/data/bar_store.py)
+    BAR_STORE_DIR: str = os.getenv("BAR_STORE_DIR", "data/bars")
+    HISTORY_PERIOD: str = "3mo"  # Full download window used only on a cold cache
+    BAR_SYNC_OVERLAP_DAYS: int = 7  # Re-fetch this many calendar days to detect revisions
+
+    # Live quote fetching (see src/data/quote_fetcher.py)
+    QUOTE_MAX_WORKERS: int = 16
+    QUOTE_DEADLINE_SECONDS: float = 8.0  # Whole batch; stragglers fall back to last close
+
+    # Where ZerodhaBroker gets live prices: "yfinance", or "kite" for batched Kite LTP
+    # calls with yfinance only for the symbols Kite didn't price
+    MARKET_DATA_SOURCE: str = os.getenv("MARKET_DATA_SOURCE", "yfinance")
+    KITE_ROOT_URL: str = os.getenv("KITE_ROOT_URL")  # Overrides the Kite API host (e.g. a local fake server)
+    KITE_LTP_BATCH_SIZE: int = 1000  # Kite's instrument limit per ltp() request
+    KITE_LTP_WORKERS: int = 4  # ltp() requests in flight at once for larger lists
+
+    # Shared keep-alive HTTP pool for Kite and plain HTTP fetches (see src/http_pool.py)
+    HTTP_POOL_HOSTS: int = 10  # Hosts kept pooled
+    HTTP_POOL_SIZE: int = 16  # Connections kept alive per host
+
+    # Optional live tick stream (see src/data/tick_stream.py), used by --schedule runs
+    TICK_STREAM: bool = os.getenv("TICK_STREAM", "0") == "1"
+    TICK_STREAM_START_TIME: str = "09:15"  # IST; (re)connects daily with that day's token
+    KITE_TICKER_ROOT: str = os.getenv("KITE_TICKER_ROOT")  # Overrides the websocket host (e.g. a local fake)
+    TICK_BUFFER_SIZE: int = 256  # Ticks kept per symbol
+
+    # Intraday holdings monitor for --schedule --monitor (see src/intraday_monitor.py)
+    MONITOR_START_TIME: str = "09:20"  # IST; watches until the warm-up (or trigger) time
+    MONITOR_POLL_SECONDS: float = 15.0  # LTP poll interval when no tick stream is running
+    MONITOR_REARM_SECONDS: float = 60.0  # Wait before re-watching a holding whose trigger was declined
+
+    # Write-behind trade/screening logging (see src/csv_logger.py)
+    LOG_QUEUE_SIZE: int = 10000  # Pending records before log calls block
+    LOG_BATCH_SIZE: int = 500  # Records written per batch at most
+    LOG_BATCH_WAIT_SECONDS: float = 0.05  # How long a batch waits to fill up after its first record
+    LOG_FLUSH_TIMEOUT_SECONDS: float = 10.0  # Flush wait at the end of a run and at exit
+
+    # Daily state journal (see src/state_journal.py)
+    STATE_FSYNC_SECONDS: float = 0.5  # Appends within this window share one fsync
+    STATE_COMPACT_EVERY: int = 50  # Journal entries before compacting into strategy_state.json
+
+    # Order fill confirmation (see src/broker/fill_tracker.py)
+    FILL_POLL_DELAY_SECONDS: float = 1.0  # First order_history poll if no push update arrived
+    FILL_POLL_MAX_SECONDS: float = 8.0  # Backoff cap between polls
+    FILL_TIMEOUT_SECONDS: float = 120.0  # Then the order is flagged for reconciliation (polling goes on)
+
+    # Kite instrument master (see src/broker/instruments.py), refreshed daily
+    INSTRUMENTS_DIR: str = os.getenv("INSTRUMENTS_DIR", "data/instruments")
+    INSTRUMENT_EXCHANGES: tuple = ("NSE", "BSE")  # Also the lookup preference for bare symbols
+
+    # Sampling profiler for --profile runs (see src/profiler.py)
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_INTERVAL_MS: float = 5.0
 
 config = Config()
 
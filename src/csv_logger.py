@@ -1,14 +1,181 @@
+import atexit
 import csv
 import os
+import queue
+import threading
+import time
+from collections import defaultdict
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from .config import config
 from .database import SessionLocal
 from . import models
 
+
+def _insert(model, dialect: str):
+    """
+    INSERT for model's rows that skips any repeating the table's unique key (a record
+    logged twice) rather than failing, on the dialects with ON CONFLICT.
+    """
+    unique = next((i for i in model.__table__.indexes if i.unique), None)
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if unique is None or dialect_insert is None:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=[c.name for c in unique.columns])
+
+
+TRADES_HEADER = ["Date", "Time", "Symbol", "Action", "Quantity", "Price", "Total Cost", "Order ID"]
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of pending log writes, drained by one background worker.
+
+    The worker takes whatever has queued up (up to LOG_BATCH_SIZE records, waiting
+    at most LOG_BATCH_WAIT_SECONDS for more after the first), appends each CSV's rows
+    with a single open, and inserts each table's DB rows of a batch with one
+    executemany and commit; rows already in the table are skipped, and one table's
+    failure doesn't roll back another's. A full queue blocks the caller rather than
+    dropping records. flush() waits until everything queued before it is written; it
+    also runs at exit.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize or config.LOG_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.max_depth = 0
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_ms_total = 0.0
+        self.batch_ms_max = 0.0
+        self.lag_ms_max = 0.0
+
+    def put(self, csv_path: str, csv_rows: List[list], model, db_rows: List[Dict[str, Any]]):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((time.perf_counter(), csv_path, csv_rows, model, db_rows))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything queued so far is written. False on timeout."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _take_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + config.LOG_BATCH_WAIT_SECONDS
+        while len(batch) < config.LOG_BATCH_SIZE and not isinstance(batch[-1], threading.Event):
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            records = [item for item in batch if not isinstance(item, threading.Event)]
+            if records:
+                self._write(records)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, records: list):
+        t0 = time.perf_counter()
+        csv_rows = defaultdict(list)
+        db_rows = defaultdict(list)
+        for _, csv_path, rows, model, mappings in records:
+            csv_rows[csv_path].extend(rows)
+            db_rows[model].extend(mappings)
+
+        # CSV Logging
+        for path, rows in csv_rows.items():
+            try:
+                with open(path, 'a', newline='') as f:
+                    csv.writer(f).writerows(rows)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error appending to {path}: {e}")
+
+        # DB Logging
+        db = SessionLocal()
+        try:
+            for model, mappings in db_rows.items():
+                if not mappings:
+                    continue
+                try:
+                    db.execute(_insert(model, db.get_bind().dialect.name), mappings)
+                    db.commit()
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Error logging {len(mappings)} rows to {model.__tablename__}: {e}")
+                    db.rollback()
+        finally:
+            db.close()
+
+        now = time.perf_counter()
+        elapsed = (now - t0) * 1000.0
+        self.records += len(records)
+        self.batches += 1
+        self.batch_ms_total += elapsed
+        self.batch_ms_max = max(self.batch_ms_max, elapsed)
+        self.lag_ms_max = max(self.lag_ms_max, (now - min(r[0] for r in records)) * 1000.0)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "records": self.records,
+            "batches": self.batches,
+            "errors": self.errors,
+            "avg_batch_ms": self.batch_ms_total / self.batches if self.batches else 0.0,
+            "max_batch_ms": self.batch_ms_max,
+            "max_lag_ms": self.lag_ms_max,
+        }
+
+
+# One writer per process, shared by every CSVLogger
+_writer: Optional[WriteBehindQueue] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> WriteBehindQueue:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue()
+        return _writer
+
+
+@atexit.register
+def _flush_at_exit():
+    if _writer is not None and not _writer.flush(timeout=config.LOG_FLUSH_TIMEOUT_SECONDS):
+        print(f"WARNING: Log writes still pending at exit: {_writer.stats()}")
+
+
 class CSVLogger:
-    def __init__(self, trades_file: str = "trades.csv", screening_file: str = "screening_log.csv"):
+    """
+    Trade and screening logs, appended to CSV files and the database. Logging calls
+    only stamp and queue the rows (see WriteBehindQueue); nothing on the strategy's
+    path waits on disk or the database.
+    """
+
+    def __init__(self, trades_file: str = "trades.csv", screening_file: str = "screening_log.csv",
+                 writer: Optional[WriteBehindQueue] = None):
         self.trades_file = trades_file
         self.screening_file = screening_file
+        self.writer = writer or get_writer()
         self._ensure_files()
 
     def _ensure_files(self):
@@ -16,7 +183,9 @@ class CSVLogger:
         if not os.path.exists(self.trades_file):
             with open(self.trades_file, 'w', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow(["Date", "Time", "Symbol", "Action", "Quantity", "Price", "Total Cost"])
+                writer.writerow(TRADES_HEADER)
+        else:
+            self._upgrade_trades_file()
 
         # Create screening file with header if not exists
         if not os.path.exists(self.screening_file):
@@ -24,83 +193,82 @@ class CSVLogger:
                 writer = csv.writer(f)
                 writer.writerow(["Date", "Time", "Rank", "Symbol", "Current Price", "25 DMA", "% Below DMA"])
 
-    def log_trade(self, symbol: str, action: str, quantity: int, price: float, total_cost: float = None):
+    def _upgrade_trades_file(self):
+        """Adds the Order ID column (empty for earlier trades) to a trades file written before it existed."""
+        with open(self.trades_file, 'r', newline='') as f:
+            header = next(csv.reader(f), None)
+            if header != TRADES_HEADER[:-1]:
+                return
+        # Rows already queued for the old file must land before it is replaced
+        self.writer.flush()
+        with open(self.trades_file, 'r', newline='') as f:
+            rows = list(csv.reader(f))
+        tmp_path = f"{self.trades_file}.tmp"
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TRADES_HEADER)
+            writer.writerows(row + [""] * (len(TRADES_HEADER) - len(row)) for row in rows[1:])
+        os.replace(tmp_path, self.trades_file)
+        print(f"[LOG] Added the Order ID column to {self.trades_file} ({len(rows) - 1} earlier trades).")
+
+    def log_trade(self, symbol: str, action: str, quantity: int, price: float, total_cost: float = None,
+                  order_id: Optional[str] = None):
         now = datetime.now()
         date_str = now.strftime("%Y-%m-%d")
         time_str = now.strftime("%H:%M:%S")
         if total_cost is None:
             total_cost = quantity * price
 
-        # CSV Logging
-        with open(self.trades_file, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                date_str,
-                time_str,
-                symbol,
-                action,
-                quantity,
-                f"{price:.2f}",
-                f"{total_cost:.2f}"
-            ])
-        
-        # DB Logging
-        db = SessionLocal()
-        try:
-            db_trade = models.Trade(
-                date=date_str,
-                time=time_str,
-                symbol=symbol,
-                action=action,
-                quantity=quantity,
-                price=price,
-                total_cost=total_cost
-            )
-            db.add(db_trade)
-            db.commit()
-        except Exception as e:
-            print(f"Error logging trade to DB: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        row = [date_str, time_str, symbol, action, quantity, f"{price:.2f}", f"{total_cost:.2f}", order_id or ""]
+        self.writer.put(self.trades_file, [row], models.Trade, [{
+            "date": now.date(),
+            "time": now.time().replace(microsecond=0),
+            "symbol": symbol,
+            "action": action,
+            "quantity": int(quantity),
+            "price": float(price),
+            "total_cost": float(total_cost),
+            "order_id": order_id,
+            "timestamp": datetime.utcnow(),
+        }])
 
     def log_screening_candidates(self, candidates: List[Any]): # Expecting list of StockData
         now = datetime.now()
         date_str = now.strftime("%Y-%m-%d")
         time_str = now.strftime("%H:%M:%S")
+        if not candidates:
+            return
 
-        # CSV Logging
-        with open(self.screening_file, 'a', newline='') as f:
-            writer = csv.writer(f)
-            for i, c in enumerate(candidates, 1):
-                writer.writerow([
-                    date_str,
-                    time_str,
-                    i,
-                    c.symbol,
-                    f"{c.current_price:.2f}",
-                    f"{c.dma_25:.2f}",
-                    f"{c.percent_below_dma * 100:.2f}%"
-                ])
-        
-        # DB Logging
-        db = SessionLocal()
-        try:
-            for i, c in enumerate(candidates, 1):
-                db_log = models.ScreeningLog(
-                    date=date_str,
-                    time=time_str,
-                    rank=i,
-                    symbol=c.symbol,
-                    current_price=c.current_price,
-                    dma_25=c.dma_25,
-                    percent_below_dma=f"{c.percent_below_dma * 100:.2f}%"
-                )
-                db.add(db_log)
-            db.commit()
-        except Exception as e:
-            print(f"Error logging screening to DB: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        rows = []
+        mappings = []
+        for i, c in enumerate(candidates, 1):
+            rows.append([
+                date_str,
+                time_str,
+                i,
+                c.symbol,
+                f"{c.current_price:.2f}",
+                f"{c.dma_25:.2f}",
+                f"{c.percent_below_dma * 100:.2f}%"
+            ])
+            mappings.append({
+                "date": now.date(),
+                "time": now.time().replace(microsecond=0),
+                "rank": i,
+                "symbol": c.symbol,
+                "current_price": float(c.current_price),
+                "dma_25": float(c.dma_25),
+                "percent_below_dma": float(c.percent_below_dma * 100),
+                "timestamp": datetime.utcnow(),
+            })
+        self.writer.put(self.screening_file, rows, models.ScreeningLog, mappings)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued log write has reached the CSVs and the database."""
+        return self.writer.flush(timeout if timeout is not None else config.LOG_FLUSH_TIMEOUT_SECONDS)
 
+    def stats(self) -> str:
+        s = self.writer.stats()
+        return (f"[LOG QUEUE] {s['records']} records in {s['batches']} batches, depth {s['queue_depth']} "
+                f"(max {s['max_queue_depth']}), batch avg {s['avg_batch_ms']:.1f}ms / max {s['max_batch_ms']:.1f}ms, "
+                f"max lag {s['max_lag_ms']:.1f}ms, {s['errors']} errors")
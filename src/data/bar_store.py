@@ -0,0 +1,152 @@
+import os
+import numpy as np
+import pandas as pd
+import pytz
+from datetime import datetime
+from typing import Optional
+from ..config import config
+from ..market_calendar import nse_calendar
+
+# One record per daily bar. Kept deliberately small: the strategy only ever needs closes,
+# and float32 is ample precision for prices while halving memory on large universes.
+BAR_DTYPE = np.dtype([("date", "datetime64[D]"), ("close", "f4"), ("adj_close", "f4")])
+
+# Relative tolerance when comparing an overlapping bar against what is already stored.
+# Anything bigger than float noise means Yahoo re-adjusted the history (split/dividend).
+REVISION_TOLERANCE = 1e-4
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def empty_bars() -> np.ndarray:
+    return np.empty(0, dtype=BAR_DTYPE)
+
+
+def last_completed_session(now: Optional[datetime] = None) -> np.datetime64:
+    """
+    Date of the most recent daily bar that is final.
+    Today's bar only counts once the market has closed; weekends and NSE holidays
+    roll back to the session before.
+    """
+    now = now or datetime.now(IST)
+    h, m = map(int, config.MARKET_CLOSE_TIME.split(':'))
+    calendar = nse_calendar()
+    if (now.hour, now.minute) < (h, m):
+        return calendar.previous(now.date())
+    return calendar.previous_or_same(now.date())
+
+
+def frame_to_bars(close: pd.Series, adj_close: Optional[pd.Series] = None, drop_partial: bool = True,
+                  now: Optional[datetime] = None) -> np.ndarray:
+    """
+    Converts yfinance daily Close/Adj Close columns for a single ticker into bar records.
+    Rows without a close are dropped. When drop_partial is set, the still-forming bar for
+    today (as of `now`) is dropped so that only final bars ever reach the store.
+    """
+    if adj_close is None:
+        # yfinance with auto_adjust=True only returns an (already adjusted) Close column
+        adj_close = close
+    df = pd.DataFrame({"close": close, "adj_close": adj_close}).dropna()
+    if df.empty:
+        return empty_bars()
+
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars["date"] = pd.DatetimeIndex(df.index).tz_localize(None).values.astype("datetime64[D]")
+    bars["close"] = df["close"].values
+    bars["adj_close"] = df["adj_close"].values
+
+    if drop_partial:
+        bars = bars[bars["date"] <= last_completed_session(now)]
+    return bars
+
+
+class BarStore:
+    """
+    Persistent on-disk store of daily bars, one NumPy file per symbol.
+    Files are opened memory-mapped, so reading history for the whole universe costs
+    a handful of page-cache reads instead of a bulk download.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or config.BAR_STORE_DIR
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol}.npy")
+
+    def read(self, symbol: str) -> np.ndarray:
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return empty_bars()
+        try:
+            bars = np.load(path, mmap_mode="r")
+            if bars.dtype != BAR_DTYPE:
+                # Written by an older layout; converted in memory and rewritten on next merge
+                bars = bars.astype(BAR_DTYPE)
+            return bars
+        except Exception as e:
+            print(f"Error reading bar store for {symbol}: {e}. Treating as cold.")
+            return empty_bars()
+
+    def last_date(self, symbol: str) -> Optional[np.datetime64]:
+        bars = self.read(symbol)
+        if len(bars) == 0:
+            return None
+        return bars["date"][-1]
+
+    def write(self, symbol: str, bars: np.ndarray):
+        """Replaces the stored history for symbol. Written to a temp file first so readers never see a torn file."""
+        path = self._path(symbol)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(bars, dtype=BAR_DTYPE))
+        os.replace(tmp_path, path)
+
+    def delete(self, symbol: str):
+        path = self._path(symbol)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def merge(self, symbol: str, fetched: np.ndarray) -> str:
+        """
+        Merges an incremental fetch into the stored history.
+
+        The fetch is expected to start a few bars before the last stored date, so it
+        overlaps what we already have. Returns one of:
+          "unchanged" - nothing new
+          "appended"  - new bars were added
+          "gap"       - the fetch does not reach back to the stored history; caller must rebuild
+          "revised"   - overlapping bars changed (split/dividend re-adjustment); caller must rebuild
+        """
+        stored = self.read(symbol)
+        if len(stored) == 0:
+            if len(fetched) == 0:
+                return "unchanged"
+            self.write(symbol, fetched)
+            return "appended"
+
+        if len(fetched) == 0:
+            return "unchanged"
+
+        last_stored = stored["date"][-1]
+        if fetched["date"][0] > last_stored:
+            return "gap"
+
+        # Compare overlapping bars by date
+        overlap = fetched[fetched["date"] <= last_stored]
+        idx = np.searchsorted(stored["date"], overlap["date"])
+        idx = np.clip(idx, 0, len(stored) - 1)
+        matched = stored["date"][idx] == overlap["date"]
+        if not matched.any():
+            return "gap"
+        old = stored["adj_close"][idx[matched]]
+        new = overlap["adj_close"][matched]
+        if not np.allclose(old, new, rtol=REVISION_TOLERANCE, atol=0.0):
+            return "revised"
+
+        fresh = fetched[fetched["date"] > last_stored]
+        if len(fresh) == 0:
+            return "unchanged"
+
+        self.write(symbol, np.concatenate([np.asarray(stored), fresh]))
+        return "appended"
@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+import yfinance as yf
+from concurrent.futures import Future, wait
+from typing import List, Dict, Optional
+from ..config import config
+from ..tracing import in_context
+from .tick_stream import TickStream, active_stream
+
+
+def to_yf_symbol(symbol: str) -> str:
+    """Yahoo Finance needs an exchange suffix; bare symbols are assumed to be NSE."""
+    if symbol.endswith(".NS") or symbol.endswith(".BO"):
+        return symbol
+    return f"{symbol}.NS"
+
+
+class _DaemonPool:
+    """
+    Long-lived worker threads shared by every QuoteFetcher in the process. They are
+    daemon threads: a lookup still hanging past its deadline is abandoned at exit,
+    where a ThreadPoolExecutor would hold the interpreter until it returned.
+    """
+
+    def __init__(self):
+        self._tasks: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def _work(self):
+        while True:
+            future, fn, args = self._tasks.get()
+            # Skips tasks cancelled while queued, e.g. past their batch's deadline
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, workers: int, fn, *args) -> Future:
+        """Queues fn(*args), growing the pool to at least `workers` threads."""
+        with self._lock:
+            while len(self._workers) < workers:
+                t = threading.Thread(target=self._work, name=f"quote-{len(self._workers)}", daemon=True)
+                t.start()
+                self._workers.append(t)
+        future: Future = Future()
+        self._tasks.put((future, fn, args))
+        return future
+
+
+_pool = _DaemonPool()
+
+
+class QuoteFetcher:
+    """
+    Shared last-traded-price lookup used by the data provider, the broker and the
+    price tool. Lookups are fanned out over the shared worker pool so N symbols cost
+    roughly one round trip, and the whole batch is bounded by a hard deadline.
+    Symbols that fail or are still in flight at the deadline fall back to the
+    caller-supplied price (typically the last daily close) or are left out.
+    When a tick stream is running, symbols it covers are answered from memory.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, deadline: Optional[float] = None,
+                 tick_stream: Optional[TickStream] = None):
+        self.max_workers = max_workers or config.QUOTE_MAX_WORKERS
+        self.deadline = deadline if deadline is not None else config.QUOTE_DEADLINE_SECONDS
+        self.tick_stream = tick_stream
+
+    def _fetch_one(self, symbol: str) -> Optional[float]:
+        ticker = yf.Ticker(to_yf_symbol(symbol))
+
+        price = None
+        # fast_info is much faster and more accurate for LTP than history()
+        try:
+            price = ticker.fast_info['last_price']
+        except Exception:
+            pass
+
+        # Fallback 1: info
+        if not price:
+            try:
+                info = ticker.info
+                price = info.get('currentPrice') or info.get('regularMarketPrice')
+            except Exception:
+                pass
+
+        # Fallback 2: history
+        if not price:
+            try:
+                hist = ticker.history(period="1d")
+                if not hist.empty:
+                    price = hist['Close'].iloc[-1]
+            except Exception:
+                pass
+
+        return float(price) if price else None
+
+    def fetch(self, symbols: List[str], fallback: Optional[Dict[str, float]] = None,
+              deadline: Optional[float] = None) -> Dict[str, float]:
+        """
+        Returns symbol -> LTP, keyed by the symbols exactly as passed in.
+        """
+        fallback = fallback or {}
+        deadline = deadline if deadline is not None else self.deadline
+        symbols = list(dict.fromkeys(symbols))
+
+        stream = self.tick_stream or active_stream()
+        streamed = stream.latest(symbols) if stream else {}
+        symbols = [s for s in symbols if s not in streamed]
+        if not symbols:
+            return streamed
+
+        start = time.perf_counter()
+        workers = min(self.max_workers, len(symbols))
+        fetch_one = in_context(self._fetch_one)
+        futures = {_pool.submit(workers, fetch_one, s): s for s in symbols}
+        done, not_done = wait(futures, timeout=deadline)
+        # Don't wait for stragglers; lookups not yet started are dropped, running ones are discarded
+        for future in not_done:
+            future.cancel()
+
+        result = dict(streamed)
+        failed = []
+        for future in done:
+            symbol = futures[future]
+            try:
+                price = future.result()
+            except Exception:
+                price = None
+            if price:
+                result[symbol] = price
+            else:
+                failed.append(symbol)
+        stragglers = [futures[f] for f in not_done]
+
+        for symbol in failed + stragglers:
+            if fallback.get(symbol):
+                result[symbol] = float(fallback[symbol])
+
+        elapsed = time.perf_counter() - start
+        if failed or stragglers:
+            print(f"[QUOTES] {len(result) - len(streamed)}/{len(symbols)} quotes in {elapsed:.2f}s "
+                  f"({len(failed)} failed, {len(stragglers)} past {deadline:.1f}s deadline, fallbacks used where available)")
+        return result
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import pandas as pd
+from datetime import datetime
+from typing import List, Optional
+from ..snapshot import Snapshot
+from .bar_store import BarStore
+from .quote_fetcher import QuoteFetcher
+from .rolling_state import RollingMeanState
+from .yfinance_provider import YFinanceDataProvider
+
+
+class ReplayQuoteFetcher(QuoteFetcher):
+    """QuoteFetcher whose per-symbol lookup is recorded to, or served from, a snapshot."""
+
+    def __init__(self, snapshot: Snapshot, mode: str):
+        super().__init__()
+        self.snapshot = snapshot
+        self.mode = mode
+
+    def _fetch_one(self, symbol: str) -> Optional[float]:
+        if self.mode == "replay":
+            return self.snapshot.replay_quote(symbol)
+        price = super()._fetch_one(symbol)
+        self.snapshot.record_quote(symbol, price)
+        return price
+
+
+class ReplayDataProvider(YFinanceDataProvider):
+    """
+    YFinanceDataProvider that records the raw yfinance responses of a live run
+    (mode="record") or replays them with no network at all (mode="replay").
+
+    Both modes start from an empty, throwaway bar store and rolling state, so the
+    recorded run takes the cold-cache path and the replay reproduces it exactly,
+    screened as of the time the snapshot was recorded. That scratch directory is
+    removed by close(), or on leaving a `with` block.
+    """
+
+    def __init__(self, snapshot: Snapshot, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.snapshot = snapshot
+        self.mode = mode
+
+        self._workdir = tempfile.TemporaryDirectory(prefix=f"nifty_{mode}_")
+        workdir = self._workdir.name
+        super().__init__(
+            bar_store=BarStore(os.path.join(workdir, "bars")),
+            quote_fetcher=ReplayQuoteFetcher(snapshot, mode),
+            rolling_state=RollingMeanState(os.path.join(workdir, "rolling_state.npz"))
+        )
+
+    def close(self):
+        self._workdir.cleanup()
+
+    def __enter__(self) -> "ReplayDataProvider":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _now(self) -> datetime:
+        return self.snapshot.recorded_at
+
+    def _download(self, tickers: List[str], **kwargs) -> pd.DataFrame:
+        if self.mode == "replay":
+            # Copy so that nothing downstream can mutate the recorded frame between replays
+            return self.snapshot.replay_download(tickers, kwargs).copy()
+        data = super()._download(tickers, **kwargs)
+        self.snapshot.record_download(tickers, kwargs, data)
+        return data
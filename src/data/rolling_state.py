@@ -0,0 +1,172 @@
+import os
+import numpy as np
+from typing import Dict, List, Optional
+from ..config import config
+from .bar_store import REVISION_TOLERANCE
+
+# Lives next to strategy_state.json
+ROLLING_STATE_FILE = "rolling_state.npz"
+
+
+class RollingMeanState:
+    """
+    Rolling window of the last `period` daily closes for every symbol.
+
+    Each symbol owns one row of a ring buffer matrix plus a running sum, so rolling the
+    window forward by a bar is O(1) and the DMA base for the whole universe is a couple
+    of vectorised gathers. The state is persisted between runs; as long as it is current,
+    the daily run needs no history at all, only today's LTP.
+    """
+
+    def __init__(self, filepath: str = ROLLING_STATE_FILE, period: Optional[int] = None):
+        self.filepath = filepath
+        self.period = period or config.DMA_PERIOD
+        self.index: Dict[str, int] = {}
+        self.ring = np.zeros((0, self.period))
+        self.head = np.zeros(0, dtype=np.int64)    # Next write position (== oldest once full)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.total = np.zeros(0)
+        self.last_date = np.zeros(0, dtype="datetime64[D]")
+        self.last_close = np.zeros(0)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with np.load(self.filepath, allow_pickle=False) as data:
+                if int(data["period"]) != self.period:
+                    print(f"[ROLLING STATE] DMA period changed to {self.period}, discarding saved state.")
+                    return
+                self.index = {str(s): i for i, s in enumerate(data["symbols"])}
+                self.ring = data["ring"]
+                self.head = data["head"]
+                self.count = data["count"]
+                self.total = data["total"]
+                self.last_date = data["last_date"]
+                self.last_close = data["last_close"]
+        except Exception as e:
+            print(f"Error loading rolling state: {e}. Starting fresh.")
+
+    def save(self):
+        symbols = np.array(sorted(self.index, key=self.index.get), dtype=str)
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                period=self.period,
+                symbols=symbols,
+                ring=self.ring,
+                head=self.head,
+                count=self.count,
+                total=self.total,
+                last_date=self.last_date,
+                last_close=self.last_close
+            )
+        os.replace(tmp_path, self.filepath)
+
+    def reserve(self, symbols: List[str]):
+        """Adds rows for unseen symbols in one go, so growing a large universe isn't quadratic."""
+        new = [s for s in dict.fromkeys(symbols) if s not in self.index]
+        if not new:
+            return
+        for s in new:
+            self.index[s] = len(self.index)
+        n = len(new)
+        self.ring = np.vstack([self.ring, np.zeros((n, self.period))])
+        self.head = np.concatenate([self.head, np.zeros(n, dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(n, dtype=np.int64)])
+        self.total = np.concatenate([self.total, np.zeros(n)])
+        self.last_date = np.concatenate([self.last_date, np.full(n, np.datetime64("NaT", "D"))])
+        self.last_close = np.concatenate([self.last_close, np.full(n, np.nan)])
+
+    def _row(self, symbol: str) -> int:
+        if symbol not in self.index:
+            self.reserve([symbol])
+        return self.index[symbol]
+
+    def push(self, symbol: str, date: np.datetime64, close: float):
+        """Rolls the symbol's window forward by one bar."""
+        r = self._row(symbol)
+        h = self.head[r]
+        if self.count[r] == self.period:
+            self.total[r] -= self.ring[r, h]
+        else:
+            self.count[r] += 1
+        self.ring[r, h] = close
+        self.total[r] += close
+        self.head[r] = (h + 1) % self.period
+        self.last_date[r] = date
+        self.last_close[r] = close
+
+    def recompute(self, symbol: str, bars: np.ndarray):
+        """Rebuilds the symbol's window from scratch out of stored bars."""
+        r = self._row(symbol)
+        tail = bars[-self.period:]
+        n = len(tail)
+        self.ring[r] = 0.0
+        self.ring[r, :n] = tail["adj_close"]
+        self.head[r] = n % self.period
+        self.count[r] = n
+        self.total[r] = float(tail["adj_close"].sum())
+        self.last_date[r] = tail["date"][-1] if n else np.datetime64("NaT", "D")
+        self.last_close[r] = float(tail["adj_close"][-1]) if n else np.nan
+
+    def update(self, symbol: str, bars: np.ndarray, force: bool = False) -> str:
+        """
+        Applies any bars newer than the window's last bar.
+        If the bar we last saw no longer matches the stored history (a split or a
+        re-adjusted close), or force is set, the window is recomputed instead.
+        """
+        r = self.index.get(symbol)
+        if force or r is None or self.count[r] == 0:
+            self.recompute(symbol, bars)
+            return "recomputed"
+
+        last = self.last_date[r]
+        pos = int(np.searchsorted(bars["date"], last))
+        if (pos >= len(bars) or bars["date"][pos] != last
+                or not np.isclose(bars["adj_close"][pos], self.last_close[r], rtol=REVISION_TOLERANCE, atol=0.0)):
+            print(f"[ROLLING STATE] {symbol}: history revised, recomputing window.")
+            self.recompute(symbol, bars)
+            return "recomputed"
+
+        fresh = bars[pos + 1:]
+        for bar in fresh:
+            self.push(symbol, bar["date"], float(bar["adj_close"]))
+        return "appended" if len(fresh) else "unchanged"
+
+    def is_current(self, symbol: str, session: np.datetime64) -> bool:
+        r = self.index.get(symbol)
+        return r is not None and self.count[r] > 0 and self.last_date[r] >= session
+
+    def base_sums(self, symbols: List[str], today: np.datetime64) -> np.ndarray:
+        """
+        Sum of the period - 1 most recent closes before today, per symbol.
+        Today's live price completes the window, so DMA = (base + ltp) / period.
+        NaN where a symbol has too little history.
+        """
+        rows = np.array([self.index.get(s, -1) for s in symbols], dtype=np.int64)
+        result = np.full(len(symbols), np.nan)
+        known = rows >= 0
+        r = rows[known]
+        if len(r) == 0:
+            return result
+
+        count = self.count[r]
+        has_today = self.last_date[r] == today
+        newest = self.ring[r, (self.head[r] - 1) % self.period]
+        oldest = self.ring[r, self.head[r] % self.period]
+
+        # A window that already holds today's final bar (run after the close) drops it, the
+        # LTP replaces it; a full window without it drops its oldest bar to make room for the LTP
+        dropped = np.where(has_today, newest, np.where(count == self.period, oldest, 0.0))
+        # Closes before today left in the window; the base needs exactly period - 1 of them
+        prior = count - has_today - (~has_today & (count == self.period))
+        sums = np.where(prior == self.period - 1, self.total[r] - dropped, np.nan)
+
+        result[known] = sums
+        return result
+
+    def last_closes(self, symbols: List[str]) -> Dict[str, float]:
+        return {s: float(self.last_close[self.index[s]]) for s in symbols if s in self.index}
@@ -0,0 +1,27 @@
+import numpy as np
+from typing import List
+from ..interfaces import ScreeningResult
+
+
+def screen_universe(symbols: List[str], base_sums: np.ndarray, ltp: np.ndarray, period: int) -> ScreeningResult:
+    """
+    Computes DMA, current price and % below DMA for every symbol at once.
+
+    base_sums holds, per symbol, the sum of the last period - 1 completed daily closes;
+    today's live price is the newest bar of the window, so DMA = (base + ltp) / period.
+    Symbols without enough history (NaN base) or without a price are dropped.
+    """
+    symbols = np.asarray(symbols, dtype=object)
+    ltp = np.asarray(ltp, dtype=np.float64)
+
+    dma = (np.asarray(base_sums, dtype=np.float64) + ltp) / period
+    keep = np.isfinite(dma) & np.isfinite(ltp) & (dma != 0)
+
+    current_price = ltp[keep]
+    dma = dma[keep]
+    return ScreeningResult(
+        symbols=symbols[keep],
+        current_price=current_price,
+        dma_25=dma,
+        percent_below_dma=(current_price - dma) / dma
+    )
@@ -0,0 +1,211 @@
+import threading
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from ..config import config
+
+
+class TickRingBuffer:
+    """
+    Last `size` ticks (receive time, price) for each of a growing set of symbols,
+    stored as one row per symbol of two preallocated matrices. Writing a tick is O(1);
+    reading every symbol's latest price is a single gather.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or config.TICK_BUFFER_SIZE
+        self.index: Dict[str, int] = {}
+        self.prices = np.zeros((0, self.size))
+        self.times = np.zeros((0, self.size))
+        self.head = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def reserve(self, symbols: List[str]):
+        with self._lock:
+            new = [s for s in dict.fromkeys(symbols) if s not in self.index]
+            if not new:
+                return
+            for s in new:
+                self.index[s] = len(self.index)
+            n = len(new)
+            self.prices = np.vstack([self.prices, np.zeros((n, self.size))])
+            self.times = np.vstack([self.times, np.zeros((n, self.size))])
+            self.head = np.concatenate([self.head, np.zeros(n, dtype=np.int64)])
+            self.count = np.concatenate([self.count, np.zeros(n, dtype=np.int64)])
+
+    def push(self, symbol: str, price: float, ts: float):
+        with self._lock:
+            r = self.index.get(symbol)
+            if r is None:
+                return
+            h = self.head[r]
+            self.prices[r, h] = price
+            self.times[r, h] = ts
+            self.head[r] = (h + 1) % self.size
+            self.count[r] = min(self.count[r] + 1, self.size)
+
+    def latest(self, symbols: List[str]) -> Dict[str, float]:
+        """Most recent price per symbol, for symbols that have ticked at least once."""
+        with self._lock:
+            known = [(s, self.index[s]) for s in symbols if s in self.index]
+            if not known:
+                return {}
+            rows = np.array([r for _, r in known], dtype=np.int64)
+            has = self.count[rows] > 0
+            last = self.prices[rows, (self.head[rows] - 1) % self.size]
+        return {s: float(p) for (s, _), p, ok in zip(known, last, has) if ok}
+
+    def history(self, symbol: str) -> np.ndarray:
+        """The symbol's buffered ticks, oldest first, as an (n, 2) array of (time, price)."""
+        with self._lock:
+            r = self.index.get(symbol)
+            if r is None or self.count[r] == 0:
+                return np.zeros((0, 2))
+            order = (self.head[r] - self.count[r] + np.arange(self.count[r])) % self.size
+            return np.column_stack([self.times[r, order], self.prices[r, order]])
+
+
+class TickStream:
+    """
+    Live LTP ticks over Kite's websocket for the screening universe and the bot's
+    holdings, buffered in memory. While the socket is connected, price lookups are
+    answered from the buffers with no network call. Kite sends an initial tick on
+    subscription, so every listed symbol has a price shortly after connecting. After a
+    dropped connection the ticker reconnects by itself and everything is resubscribed.
+
+    ticker replaces the KiteTicker (tests pass a fake driving the callbacks directly).
+    """
+
+    def __init__(self, api_key: str, access_token: str, instruments, root: Optional[str] = None,
+                 buffer_size: Optional[int] = None, ticker=None):
+        self.access_token = access_token
+        self.instruments = instruments
+        self.buffers = TickRingBuffer(buffer_size)
+        if ticker is None:
+            from kiteconnect import KiteTicker
+            from twisted.internet import reactor
+
+            ticker = KiteTicker(api_key, access_token, root=root or config.KITE_TICKER_ROOT)
+            # Twisted isn't thread-safe: frames are handed to the reactor thread
+            self._on_socket_thread = reactor.callFromThread
+        else:
+            self._on_socket_thread = lambda fn: fn()
+        self.ticker = ticker
+        self.ticker.on_ticks = self._on_ticks
+        self.ticker.on_connect = self._on_connect
+        self.ticker.on_close = self._on_close
+        self.ticker.on_order_update = self._on_order_update
+        self.order_update_handlers: List[Callable[[dict], None]] = []
+        # Called with {symbol: price} for every batch of ticks, on the socket's thread
+        self.tick_handlers: List[Callable[[Dict[str, float]], None]] = []
+        self._symbols_by_token: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self.connected = threading.Event()
+        self.ticks_received = 0
+
+    def subscribe(self, symbols: List[str]) -> int:
+        """Adds symbols to the stream. Returns how many could be resolved to instrument tokens."""
+        tokens = []
+        with self._lock:
+            for symbol in symbols:
+                instrument = self.instruments.resolve(symbol)
+                if instrument is None:
+                    continue
+                listed = self._symbols_by_token.setdefault(instrument.instrument_token, [])
+                if symbol not in listed:
+                    listed.append(symbol)
+                tokens.append(instrument.instrument_token)
+        self.buffers.reserve(symbols)
+        if tokens and self.connected.is_set():
+            self._send_subscribe(tokens)
+        return len(tokens)
+
+    def _send_subscribe(self, tokens: List[int]):
+        def send():
+            self.ticker.subscribe(tokens)
+            self.ticker.set_mode(self.ticker.MODE_LTP, tokens)
+        self._on_socket_thread(send)
+
+    def _on_connect(self, ws, response):
+        self.connected.set()
+        with self._lock:
+            tokens = list(self._symbols_by_token)
+        if tokens:
+            ws.subscribe(tokens)
+            ws.set_mode(ws.MODE_LTP, tokens)
+        print(f"[TICKS] Connected, streaming {len(tokens)} instruments.")
+
+    def _on_close(self, ws, code, reason):
+        self.connected.clear()
+        print(f"[TICKS] Stream closed ({code}: {reason}). Falling back to on-demand quotes.")
+
+    def _on_ticks(self, ws, ticks):
+        now = time.time()
+        batch = {} if self.tick_handlers else None
+        for tick in ticks:
+            price = tick.get("last_price")
+            if not price:
+                continue
+            for symbol in self._symbols_by_token.get(tick.get("instrument_token"), ()):
+                self.buffers.push(symbol, float(price), now)
+                if batch is not None:
+                    batch[symbol] = float(price)
+        self.ticks_received += len(ticks)
+        for handler in list(self.tick_handlers) if batch else ():
+            try:
+                handler(batch)
+            except Exception as e:
+                print(f"Error handling ticks: {e}")
+
+    def _on_order_update(self, ws, data):
+        for handler in list(self.order_update_handlers):
+            try:
+                handler(data)
+            except Exception as e:
+                print(f"Error handling order update: {e}")
+
+    def start(self, timeout: Optional[float] = None) -> bool:
+        """Connects in the background. Waits up to timeout seconds for the socket if given."""
+        self.ticker.connect(threaded=True)
+        if timeout:
+            return self.connected.wait(timeout)
+        return self.connected.is_set()
+
+    def stop(self):
+        self.ticker.close()
+        self.connected.clear()
+
+    def latest(self, symbols: List[str]) -> Dict[str, float]:
+        """Buffered LTPs, or nothing at all while the stream is down (prices could be stale)."""
+        if not self.connected.is_set():
+            return {}
+        return self.buffers.latest(symbols)
+
+
+# The stream running in this process, if any. Quote lookups consult it first.
+_active: Optional[TickStream] = None
+
+
+def active_stream() -> Optional[TickStream]:
+    return _active
+
+
+def start_tick_stream(api_key: str, access_token: str, instruments, symbols: List[str],
+                      timeout: float = 10.0) -> TickStream:
+    """
+    Starts the shared tick stream for this process and subscribes symbols to it.
+    Calling again adds symbols; a new access token (tokens rotate daily) replaces the stream.
+    """
+    global _active
+    if _active is not None and _active.access_token != access_token:
+        _active.stop()
+        _active = None
+    if _active is None:
+        _active = TickStream(api_key, access_token, instruments)
+        _active.subscribe(symbols)
+        if not _active.start(timeout=timeout):
+            print("[TICKS] Stream not connected yet; quotes are fetched on demand until it is.")
+    else:
+        _active.subscribe(symbols)
+    return _active
@@ -1,77 +1,216 @@
 import yfinance as yf
 import pandas as pd
-from typing import List, Dict
-from ..interfaces import IDataProvider, StockData
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import List, Dict, Optional
+from ..interfaces import IDataProvider, ScreeningResult
 from ..config import config
+from ..tracing import in_context, span
+from .bar_store import BarStore, IST, frame_to_bars, last_completed_session
+from .quote_fetcher import QuoteFetcher
+from .rolling_state import RollingMeanState
+from .screening import screen_universe
 
 class YFinanceDataProvider(IDataProvider):
-    def get_nifty50_data(self, tickers: List[str]) -> Dict[str, StockData]:
-        # Download data for all tickers at once
-        # We need at least enough days to calculate 25 DMA + current day
-        # 60 days is safe to cover weekends/holidays
-        data = yf.download(tickers, period="3mo", interval="1d", progress=False)
-        
-        # 'Adj Close' is usually best for calculating DMAs to account for dividends/splits
-        # Prepare result
-        result = {}
-        
-        # Access using the MultiIndex (Price, Ticker) or (Ticker, Price) structure
-        # yfinance normally returns (Price, Ticker) as columns.
-        
+    def __init__(self, bar_store: Optional[BarStore] = None, quote_fetcher: Optional[QuoteFetcher] = None,
+                 rolling_state: Optional[RollingMeanState] = None):
+        self.bar_store = bar_store or BarStore()
+        self.quote_fetcher = quote_fetcher or QuoteFetcher()
+        self.rolling_state = rolling_state or RollingMeanState()
+
+    def _now(self) -> datetime:
+        """Wall clock (IST) the provider screens against. Overridden for replays."""
+        return datetime.now(IST)
+
+    def _download(self, tickers: List[str], **kwargs) -> pd.DataFrame:
+        return yf.download(tickers, interval="1d", progress=False, **kwargs)
+
+    def _price_frames(self, data: pd.DataFrame):
+        """
+        Splits a (Price, Ticker) MultiIndex download into its Close and Adj Close frames,
+        once per download. Everything else (Open/High/Low/Volume) is dropped straight
+        away and prices are narrowed to float32 to keep large universes in budget.
+        """
+        if data is None or data.empty:
+            return None, None
+        levels = data.columns.get_level_values(0)
+        close = data['Close'].astype(np.float32) if 'Close' in levels else None
+        adj_close = data['Adj Close'].astype(np.float32) if 'Adj Close' in levels else None
+        return close, adj_close
+
+    def _download_frames(self, tickers: List[str], **kwargs):
+        return self._price_frames(self._download(tickers, **kwargs))
+
+    def _download_chunks(self, tickers: List[str], **kwargs):
+        """
+        Downloads tickers in chunks of DOWNLOAD_CHUNK_SIZE, DOWNLOAD_WORKERS at a time,
+        yielding (chunk, frames) as each completes. At most DOWNLOAD_WORKERS chunks are
+        held in memory at once, however large the universe.
+        """
+        size = max(1, config.DOWNLOAD_CHUNK_SIZE)
+        chunks = iter([tickers[i:i + size] for i in range(0, len(tickers), size)])
+
+        with ThreadPoolExecutor(max_workers=max(1, config.DOWNLOAD_WORKERS)) as executor:
+            in_flight = {}
+
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk:
+                    in_flight[executor.submit(in_context(self._download_frames), chunk, **kwargs)] = chunk
+
+            for _ in range(max(1, config.DOWNLOAD_WORKERS)):
+                submit_next()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    try:
+                        frames = future.result()
+                    except Exception as e:
+                        print(f"Error downloading {len(chunk)} tickers: {e}")
+                        frames = (None, None)
+                    submit_next()
+                    yield chunk, frames
+
+    def _extract_bars(self, frames, ticker: str) -> np.ndarray:
+        """Pulls one ticker's bars out of the frames returned by _price_frames."""
+        close_df, adj_df = frames
+        close = close_df[ticker] if close_df is not None and ticker in close_df.columns else None
+        adj_close = adj_df[ticker] if adj_df is not None and ticker in adj_df.columns else None
+
+        if close is None:
+            if adj_close is None:
+                # Ticker likely failed download
+                return frame_to_bars(pd.Series(dtype=float))
+            close = adj_close
+        return frame_to_bars(close, adj_close, now=self._now())
+
+    def sync_history(self, tickers: List[str]) -> Dict[str, str]:
+        """
+        Brings the local bar store up to date for the given tickers.
+        Warm symbols only fetch the bars missing since their last stored date (plus a small
+        overlap used to detect gaps and re-adjusted history). Cold symbols, and any symbol
+        whose history failed those checks, get a full download of HISTORY_PERIOD.
+        Returns symbol -> sync status, mainly for logging.
+        """
+        status = {}
+        target = last_completed_session(self._now())
+
+        cold = []
+        warm = {}
         for ticker in tickers:
-            try:
-                # 1. Get Historical Data for DMA (Daily)
-                series = None
-                
-                # Try Adj Close first
-                if 'Adj Close' in data.columns.get_level_values(0):
-                    adj_df = data['Adj Close']
-                    if ticker in adj_df.columns:
-                        series = adj_df[ticker]
-                
-                # Fallback to Close if series is still None
-                if series is None and 'Close' in data.columns.get_level_values(0):
-                    close_df = data['Close']
-                    if ticker in close_df.columns:
-                        series = close_df[ticker]
-                
-                if series is None:
-                    # Ticker likely failed download
-                    continue
-
-                series = series.dropna()
-                if len(series) < config.DMA_PERIOD:
-                    print(f"Not enough data for {ticker}")
-                    continue
-                
-                # 2. Get accurate Real-Time LTP
-                ticker_obj = yf.Ticker(ticker)
-                # fast_info is much faster and more accurate for LTP than history()
-                try:
-                    current_price = ticker_obj.fast_info['last_price']
-                except:
-                    # Fallback to history 1m
-                    hist_1m = ticker_obj.history(period="1d", interval="1m")
-                    if not hist_1m.empty:
-                        current_price = hist_1m['Close'].iloc[-1]
+            last = self.bar_store.last_date(ticker)
+            if last is None:
+                cold.append(ticker)
+            elif last >= target:
+                status[ticker] = "current"
+            else:
+                warm[ticker] = last
+
+        if warm:
+            start = min(warm.values()) - np.timedelta64(config.BAR_SYNC_OVERLAP_DAYS, "D")
+            for chunk, frames in self._download_chunks(list(warm), start=str(start)):
+                for ticker in chunk:
+                    result = self.bar_store.merge(ticker, self._extract_bars(frames, ticker))
+                    if result in ("gap", "revised"):
+                        print(f"[BAR STORE] {ticker}: {result} history detected, rebuilding.")
+                        cold.append(ticker)
                     else:
-                        current_price = series.iloc[-1]
-                
-                # Calculate 25 DMA
-                dma_25 = series.rolling(window=config.DMA_PERIOD).mean().iloc[-1]
-                
-                if pd.isna(dma_25):
-                    continue
-                
-                percent_below = (current_price - dma_25) / dma_25
-                
-                result[ticker] = StockData(
-                    symbol=ticker,
-                    current_price=float(current_price),
-                    dma_25=float(dma_25),
-                    percent_below_dma=float(percent_below)
-                )
-            except Exception as e:
-                print(f"Error processing {ticker}: {e}")
-                
+                        status[ticker] = result
+
+        if cold:
+            print(f"[BAR STORE] Full download for {len(cold)} symbols.")
+            for chunk, frames in self._download_chunks(cold, period=config.HISTORY_PERIOD):
+                for ticker in chunk:
+                    bars = self._extract_bars(frames, ticker)
+                    if len(bars) == 0:
+                        status[ticker] = "missing"
+                        continue
+                    self.bar_store.write(ticker, bars)
+                    status[ticker] = "rebuilt"
+
+        return status
+
+    def rebuild_history(self, tickers: List[str]) -> Dict[str, str]:
+        """Drops the stored bars for tickers and downloads them again from scratch."""
+        for ticker in tickers:
+            self.bar_store.delete(ticker)
+        return self.sync_history(tickers)
+
+    def refresh_rolling_state(self, tickers: List[str]):
+        """
+        Rolls each symbol's DMA window forward to the last completed session.
+        Symbols whose window is already current are skipped without touching the
+        bar store or the network; only stale ones are synced and updated.
+        """
+        session = last_completed_session(self._now())
+        stale = [t for t in tickers if not self.rolling_state.is_current(t, session)]
+        if not stale:
+            return
+
+        status = self.sync_history(stale)
+        self.rolling_state.reserve(stale)
+        for ticker in stale:
+            bars = self.bar_store.read(ticker)
+            if len(bars) == 0:
+                continue
+            self.rolling_state.update(ticker, bars, force=status.get(ticker) == "rebuilt")
+        self.rolling_state.save()
+
+    def prepare(self, tickers: List[str]):
+        """
+        Syncs history and rolls the DMA windows forward for the whole universe, chunk by
+        chunk as screening does. Screening afterwards finds every window current and
+        only fetches live quotes.
+        """
+        size = max(1, config.SCREEN_CHUNK_SIZE)
+        with span("history_sync"):
+            for i in range(0, len(tickers), size):
+                self.refresh_rolling_state(tickers[i:i + size])
+
+    def _screen_chunk(self, tickers: List[str]) -> ScreeningResult:
+        # 1. DMA base from the persisted rolling windows.
+        # History is only downloaded for symbols whose window is behind.
+        with span("history_sync"):
+            self.refresh_rolling_state(tickers)
+        today = np.datetime64(self._now().date(), "D")
+        base_sums = self.rolling_state.base_sums(tickers, today)
+
+        symbols = []
+        for ticker, base in zip(tickers, base_sums):
+            if np.isnan(base):
+                print(f"Not enough data for {ticker}")
+                continue
+            symbols.append(ticker)
+        base_sums = base_sums[~np.isnan(base_sums)]
+
+        # 2. Get accurate Real-Time LTP for all tickers concurrently.
+        # Anything that misses the deadline is priced at its last daily close.
+        last_closes = self.rolling_state.last_closes(symbols)
+        with span("quotes"):
+            ltp_map = self.quote_fetcher.fetch(symbols, fallback=last_closes)
+        ltp = np.array([ltp_map.get(s, np.nan) for s in symbols], dtype=np.float64)
+
+        # 3. DMA and % below DMA for every symbol in one pass
+        with span("dma_screen"):
+            return screen_universe(symbols, base_sums, ltp, config.DMA_PERIOD)
+
+    def get_nifty50_data(self, tickers: List[str], top_k: Optional[int] = None) -> ScreeningResult:
+        """
+        Screens the universe SCREEN_CHUNK_SIZE symbols at a time. With top_k set, each
+        chunk is folded into a running top-k straight away, so memory stays flat no
+        matter how many symbols are screened.
+        """
+        size = max(1, config.SCREEN_CHUNK_SIZE)
+        result = None
+        for i in range(0, len(tickers), size):
+            chunk_result = self._screen_chunk(tickers[i:i + size])
+            result = chunk_result if result is None else ScreeningResult.concat([result, chunk_result])
+            if top_k is not None:
+                result = result.keep_top_below_dma(top_k)
+
+        if result is None:
+            return ScreeningResult.concat([])
         return result
@@ -0,0 +1,144 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from .config import config
+
+# Kite Connect per-second request limits by endpoint prefix. Anything not listed
+# falls under the general limit. Longest matching prefix wins.
+KITE_RATE_LIMITS = {
+    "/quote": 1.0,
+    "/instruments/historical": 3.0,
+    "/orders": 10.0,
+}
+DEFAULT_RATE_LIMIT = 10.0
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, up to `capacity` banked. acquire()
+    blocks until a token is available, so concurrent callers are spaced out instead of
+    all firing at once and being rejected.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes one token, sleeping if needed. Returns the seconds spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            # A negative balance is this caller's place in the queue
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    throttled_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": self.total_ms / self.requests if self.requests else 0.0,
+            "throttled_ms": self.throttled_ms,
+        }
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    Keep-alive connection pool that rate limits and accounts every request by
+    host and endpoint (the first path segment, e.g. api.kite.trade/quote).
+    """
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None, default_rate: float = DEFAULT_RATE_LIMIT, **kwargs):
+        super().__init__(**kwargs)
+        self.limits = limits or {}
+        self.default_rate = default_rate
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str, path: str) -> TokenBucket:
+        prefix = max((p for p in self.limits if path.startswith(p)), key=len, default="")
+        key = f"{host}{prefix}"
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.limits.get(prefix, self.default_rate))
+            return bucket
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        segment = "/" + url.path.strip("/").split("/", 1)[0]
+        endpoint = f"{url.netloc}{segment}"
+
+        waited = self._bucket(url.netloc, url.path).acquire()
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            response = super().send(request, **kwargs)
+            ok = response.status_code < 400
+            return response
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            with self._lock:
+                stats = self._stats.setdefault(endpoint, EndpointStats())
+                stats.requests += 1
+                stats.errors += 0 if ok else 1
+                stats.total_ms += elapsed
+                stats.throttled_ms += waited * 1000.0
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            endpoints = {k: v.to_dict() for k, v in self._stats.items()}
+        hosts = {}
+        for key, pool in list(self.poolmanager.pools._container.items()):
+            requests_made = getattr(pool, "num_requests", 0)
+            connections = getattr(pool, "num_connections", 0)
+            hosts[f"{key.key_scheme}://{key.key_host}"] = {
+                "requests": requests_made,
+                "connections_opened": connections,
+                "reused": max(0, requests_made - connections),
+            }
+        return {"endpoints": endpoints, "hosts": hosts}
+
+
+_session: Optional[requests.Session] = None
+_adapter: Optional[PooledAdapter] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session shared by every Kite client and plain HTTP fetch."""
+    global _session, _adapter
+    with _session_lock:
+        if _session is None:
+            _adapter = PooledAdapter(limits=KITE_RATE_LIMITS, pool_connections=config.HTTP_POOL_HOSTS,
+                                     pool_maxsize=config.HTTP_POOL_SIZE)
+            _session = requests.Session()
+            _session.mount("https://", _adapter)
+            _session.mount("http://", _adapter)
+        return _session
+
+
+def pool_stats() -> Dict[str, Dict]:
+    if _adapter is None:
+        return {"endpoints": {}, "hosts": {}}
+    return _adapter.stats()
@@ -1,4 +1,6 @@
+import numpy as np
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 
@@ -9,6 +11,70 @@ class StockData:
     dma_25: float
     percent_below_dma: float
 
+@dataclass
+class ScreeningResult:
+    """
+    Columnar screen of a whole universe. Entry i of every array belongs to symbols[i].
+    Kept as flat arrays so screening thousands of symbols doesn't create thousands of objects;
+    StockData is only materialised for the handful of names the strategy acts on.
+    """
+    symbols: np.ndarray
+    current_price: np.ndarray
+    dma_25: np.ndarray
+    percent_below_dma: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def stock(self, i: int) -> StockData:
+        return StockData(
+            symbol=str(self.symbols[i]),
+            current_price=float(self.current_price[i]),
+            dma_25=float(self.dma_25[i]),
+            percent_below_dma=float(self.percent_below_dma[i])
+        )
+
+    def _top_below_index(self, k: int) -> np.ndarray:
+        # Partial selection: O(n), only the k survivors (and ties with the last) are ever sorted
+        below = np.flatnonzero(self.percent_below_dma < 0)
+        if k <= 0 or len(below) == 0:
+            return below[:0]
+        if len(below) > k:
+            values = self.percent_below_dma[below]
+            # Everything up to the k-th smallest value, ties included and in universe order,
+            # so the cut below picks among ties exactly as a stable sort of all of them would
+            kth = np.partition(values, k - 1)[k - 1]
+            below = below[values <= kth]
+        return below[np.argsort(self.percent_below_dma[below], kind="stable")][:k]
+
+    def top_below_dma(self, k: int) -> List[StockData]:
+        """The k stocks that fell the hardest below their DMA, most negative first."""
+        return [self.stock(i) for i in self._top_below_index(k)]
+
+    def take(self, index: np.ndarray) -> "ScreeningResult":
+        return ScreeningResult(
+            symbols=self.symbols[index],
+            current_price=self.current_price[index],
+            dma_25=self.dma_25[index],
+            percent_below_dma=self.percent_below_dma[index]
+        )
+
+    def keep_top_below_dma(self, k: int) -> "ScreeningResult":
+        """Columnar version of top_below_dma, used to fold chunks into a running top-k."""
+        return self.take(self._top_below_index(k))
+
+    @staticmethod
+    def concat(results: List["ScreeningResult"]) -> "ScreeningResult":
+        return ScreeningResult(
+            symbols=np.concatenate([r.symbols for r in results]) if results else np.empty(0, dtype=object),
+            current_price=np.concatenate([r.current_price for r in results]) if results else np.empty(0),
+            dma_25=np.concatenate([r.dma_25 for r in results]) if results else np.empty(0),
+            percent_below_dma=np.concatenate([r.percent_below_dma for r in results]) if results else np.empty(0)
+        )
+
+    def to_dict(self) -> Dict[str, StockData]:
+        return {str(s): self.stock(i) for i, s in enumerate(self.symbols)}
+
 @dataclass
 class OrderResult:
     order_id: str
@@ -26,14 +92,23 @@ class Holding:
 
 class IDataProvider(ABC):
     @abstractmethod
-    def get_nifty50_data(self, tickers: List[str]) -> Dict[str, StockData]:
+    def get_nifty50_data(self, tickers: List[str], top_k: Optional[int] = None) -> ScreeningResult:
         """
-        Fetches data for the given tickers.
-        Returns a dictionary mapping symbol -> StockData.
+        Fetches data for the given tickers (any universe, despite the name).
+        Returns a columnar ScreeningResult over all tickers that could be priced,
+        or only the top_k that fell the hardest below their DMA if top_k is given.
         Should calculate the 25 DMA and current price.
         """
         pass
 
+    def prepare(self, tickers: List[str]):
+        """
+        Does ahead of time whatever screening tickers needs apart from live prices
+        (history, DMA bases), so a later get_nifty50_data only has to fetch quotes.
+        Optional: providers with nothing to warm up do nothing.
+        """
+        pass
+
 class IBroker(ABC):
     @abstractmethod
     def get_holdings(self) -> List[Holding]:
@@ -69,3 +144,26 @@ class IBroker(ABC):
         Places a sell order. If price is None, assumes Market Order.
         """
         pass
+
+    def get_positions(self) -> List[Holding]:
+        """
+        Returns open intraday/net positions not yet settled into holdings.
+        Brokers without such a notion return an empty list.
+        """
+        return []
+
+    def prepare(self, symbols: List[str]):
+        """
+        Loads ahead of time whatever placing orders for symbols needs (e.g. instrument
+        lookups), so the first order doesn't pay for it. Optional.
+        """
+        pass
+
+    def confirm_fill(self, order: OrderResult) -> Future:
+        """
+        Future of the order's final state (actual fill price and quantity).
+        Brokers that fill synchronously return the order as is.
+        """
+        future = Future()
+        future.set_result(order)
+        return future
@@ -0,0 +1,202 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from .account_snapshot import AccountSnapshot
+from .config import config
+from .data.bar_store import IST
+from .data.tick_stream import active_stream
+from .interfaces import Holding
+from .strategy import NiftyShopStrategy
+from .tracing import RunTrace, save_run
+
+
+class TriggerIndex:
+    """
+    Sell and averaging trigger prices for the bot's holdings, precomputed from their
+    average prices: sell at avg * (1 + SELL_PROFIT_THRESHOLD), average at
+    avg * (1 - HOLDING_DROP_THRESHOLD). A price update is one dict lookup and two
+    comparisons for its own symbol; nothing else is rescanned.
+    """
+
+    def __init__(self):
+        self._triggers: Dict[str, Tuple[float, float]] = {}
+
+    def build(self, holdings: Iterable[Holding], symbols: Iterable[str]):
+        managed = set(symbols)
+        self._triggers = {}
+        for h in holdings:
+            if h.symbol in managed:
+                self.arm(h)
+
+    def arm(self, holding: Holding) -> bool:
+        """(Re)sets the holding's triggers from its average price. False if it has none."""
+        if holding.average_price <= 0:
+            return False
+        self._triggers[holding.symbol] = (holding.average_price * (1 + config.SELL_PROFIT_THRESHOLD),
+                                          holding.average_price * (1 - config.HOLDING_DROP_THRESHOLD))
+        return True
+
+    def get(self, symbol: str) -> Optional[Tuple[float, float]]:
+        return self._triggers.get(symbol)
+
+    def crossed(self, symbol: str, price: float) -> Optional[str]:
+        """"sell" or "average" if price crosses one of symbol's triggers, else None."""
+        triggers = self._triggers.get(symbol)
+        if triggers is None:
+            return None
+        sell_at, average_at = triggers
+        if price >= sell_at:
+            return "sell"
+        if price < average_at:
+            return "average"
+        return None
+
+    def remove(self, symbol: str):
+        self._triggers.pop(symbol, None)
+
+    def symbols(self):
+        return list(self._triggers)
+
+    def __len__(self) -> int:
+        return len(self._triggers)
+
+
+class IntradayMonitor:
+    """
+    Watches the bot's holdings during the session and acts the moment one crosses its
+    sell or averaging trigger, instead of waiting for the daily run.
+
+    Prices come pushed from the live tick stream when one is running; otherwise the
+    holdings are polled every MONITOR_POLL_SECONDS. Crossings are only queued on the
+    price thread and acted on by the monitor's own thread through the strategy, which
+    applies the one-action-per-day limit. The monitor stops for the day once an action
+    has been taken, or at its end time. A crossing the strategy declines (stale trigger,
+    failed order, ...) is re-armed from the account as it is then, after
+    MONITOR_REARM_SECONDS.
+    """
+
+    def __init__(self, strategy: NiftyShopStrategy, mode: str = "intraday", poll_seconds: Optional[float] = None):
+        self.strategy = strategy
+        self.mode = mode
+        self.poll_seconds = poll_seconds or config.MONITOR_POLL_SECONDS
+        self.index = TriggerIndex()
+        self._crossings: "queue.Queue[Tuple[str, str, float, float]]" = queue.Queue()
+        # Declined symbols -> when (time.monotonic()) to re-arm them; monitor thread only
+        self._rearm_at: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stream = None
+        self.updates = 0
+
+    def rebuild(self):
+        """Recomputes the triggers from the account as it is now."""
+        account = AccountSnapshot.fetch(self.strategy.broker, concurrent=self.strategy.concurrent_prefetch)
+        self.index.build(account.holdings, self.strategy._get_bot_managed_symbols())
+        print(f"[MONITOR] Watching {len(self.index)} bot-managed holdings.")
+
+    def _rearm_due(self):
+        """Puts declined symbols whose wait is over back in the index, from fresh holdings."""
+        now = time.monotonic()
+        due = [symbol for symbol, at in self._rearm_at.items() if at <= now]
+        if not due:
+            return
+        for symbol in due:
+            del self._rearm_at[symbol]
+        invalidate = getattr(self.strategy.broker, "invalidate", None)
+        if invalidate:
+            invalidate()
+        account = AccountSnapshot.fetch(self.strategy.broker, concurrent=self.strategy.concurrent_prefetch)
+        holdings = {h.symbol: h for h in account.holdings}
+        managed = set(self.strategy._get_bot_managed_symbols())
+        for symbol in due:
+            holding = holdings.get(symbol)
+            if holding is None or symbol not in managed or not self.index.arm(holding):
+                print(f"[MONITOR] {symbol} is no longer a bot-managed holding; not re-armed.")
+                continue
+            sell_at, average_at = self.index.get(symbol)
+            print(f"[MONITOR] Re-armed {symbol}: sell at {sell_at:.2f}, average below {average_at:.2f}.")
+
+    def on_prices(self, prices: Dict[str, float]):
+        """Checks a batch of price updates. Safe to call from any thread."""
+        now = time.perf_counter()
+        self.updates += len(prices)
+        for symbol, price in prices.items():
+            kind = self.index.crossed(symbol, price)
+            if kind:
+                # Each holding fires at most once; the strategy decides what happens
+                self.index.remove(symbol)
+                self._crossings.put((kind, symbol, price, now))
+
+    def _poll(self):
+        # Per-run broker caches would otherwise serve the first prices all day
+        invalidate = getattr(self.strategy.broker, "invalidate", None)
+        if invalidate:
+            invalidate()
+        symbols = self.index.symbols()
+        if symbols:
+            self.on_prices(self.strategy.broker.get_ltp(symbols))
+
+    def _act(self, kind: str, symbol: str, price: float, triggered_at: float) -> bool:
+        """Hands one crossing to the strategy. True once today's action is taken."""
+        trace = RunTrace(mode=self.mode, dry_run=self.strategy.dry_run)
+        try:
+            self.strategy.on_trigger(kind, symbol, price, trace=trace, triggered_at=triggered_at)
+        except Exception as e:
+            print(f"[MONITOR] Error acting on {kind} trigger for {symbol}: {e}")
+        finally:
+            save_run(trace)
+        return not trace.decision.startswith(("NONE", "SKIP", "FAILED"))
+
+    def _run(self, until: datetime):
+        print(f"[MONITOR] Running until {until:%H:%M} IST "
+              f"({'tick stream' if self._stream else f'polling every {self.poll_seconds:g}s'}).")
+        while not self._stop.is_set() and datetime.now(IST) < until and (len(self.index) or self._rearm_at):
+            if self.strategy.state_manager.daily_limit_reached():
+                print("[MONITOR] Today's action is already taken. Stopping.")
+                break
+            try:
+                self._rearm_due()
+            except Exception as e:
+                print(f"[MONITOR] Error re-arming triggers: {e}")
+            try:
+                kind, symbol, price, triggered_at = self._crossings.get(timeout=self.poll_seconds)
+            except queue.Empty:
+                if self._stream is None or not self._stream.connected.is_set():
+                    try:
+                        self._poll()
+                    except Exception as e:
+                        print(f"[MONITOR] Error polling prices: {e}")
+                continue
+            if self._act(kind, symbol, price, triggered_at):
+                print("[MONITOR] Action taken (one action per day). Stopping.")
+                break
+            self._rearm_at[symbol] = time.monotonic() + config.MONITOR_REARM_SECONDS
+        self._detach()
+        print(f"[MONITOR] Stopped after {self.updates} price updates.")
+
+    def _detach(self):
+        if self._stream is not None and self.on_prices in self._stream.tick_handlers:
+            self._stream.tick_handlers.remove(self.on_prices)
+        self._stream = None
+
+    def start(self, until: datetime) -> bool:
+        """Builds the triggers and monitors in the background until `until` (IST). False if nothing to watch."""
+        self.rebuild()
+        if not len(self.index):
+            return False
+        self._stream = active_stream()
+        if self._stream is not None:
+            self._stream.subscribe(self.index.symbols())
+            self._stream.tick_handlers.append(self.on_prices)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(until,), name="intraday-monitor", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,41 +1,186 @@
 import argparse
 import time
-import schedule
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from src.config import config
 from src.data.yfinance_provider import YFinanceDataProvider
 from src.broker.mock_broker import MockBroker
+from src.broker.cached_broker import CachingBroker
 from src.state_manager import StateManager
 from src.strategy import NiftyShopStrategy
+from src.tracing import RunTrace, save_run
 
-from src.broker.zerodha_broker import ZerodhaBroker
+from src.broker.zerodha_broker import get_zerodha_broker
 from src.auth import get_access_token
+from src.migrations import check_schema
 
-def job(use_real_broker: bool = False, is_dry_run: bool = False):
-    print(f"\n[SCHEDULER] Triggering strategy at {datetime.now()} (Real Money: {use_real_broker}, Dry Run: {is_dry_run})")
-    
+def job(use_real_broker: bool = False, is_dry_run: bool = False, record_path: str = None, replay_path: str = None,
+        profile: bool = False):
+    if profile:
+        from src.profiler import SamplingProfiler
+
+        label = "replay" if replay_path else ("real" if use_real_broker else "mock")
+        with SamplingProfiler(label=label):
+            return _job(use_real_broker, is_dry_run, record_path, replay_path)
+    return _job(use_real_broker, is_dry_run, record_path, replay_path)
+
+# Strategies warmed up ahead of their scheduled trigger, keyed by (real broker, dry run)
+_prepared = {}
+
+def warm_up(use_real_broker: bool = False, is_dry_run: bool = False):
+    """
+    Builds the day's strategy and runs its warm-up phase, so the scheduled trigger
+    only has to fetch fresh prices and place the order.
+    """
+    print(f"\n[WARM-UP] Preparing strategy at {datetime.now()} (Real Money: {use_real_broker}, Dry Run: {is_dry_run})")
+    built = _build(use_real_broker, is_dry_run)
+    if built is None:
+        return
+    strategy, broker, _ = built
+    try:
+        strategy.prepare()
+    except Exception as e:
+        print(f"[WARM-UP] Failed, the trigger will start cold: {e}")
+        return
+    _prepared[(use_real_broker, is_dry_run)] = (datetime.now().date(), strategy, broker)
+
+def _build(use_real_broker: bool, is_dry_run: bool, record_path: str = None):
+    """(strategy, broker, snapshot) for a live run, or None if the broker can't be set up."""
     # dependencies
-    data_provider = YFinanceDataProvider()
     state_manager = StateManager()
-    
+    data_provider = YFinanceDataProvider()
+
     if use_real_broker:
         access_token = get_access_token()
         if not access_token:
             print("ERROR: No valid access token found. Please run with --login first.")
-            return
+            return None
         # Initialize Zerodha Broker
         # config.ZERODHA_API_KEY must be set
         if not config.ZERODHA_API_KEY:
              print("ERROR: ZERODHA_API_KEY not found in config.")
-             return
+             return None
              
-        broker = ZerodhaBroker(config.ZERODHA_API_KEY, access_token)
+        # Reused across scheduled runs for as long as the token is valid
+        broker = get_zerodha_broker(config.ZERODHA_API_KEY, access_token)
     else:
         broker = MockBroker() 
     
+    snapshot = None
+    if record_path:
+        from src.snapshot import Snapshot
+        from src.data.replay_provider import ReplayDataProvider
+        from src.broker.replay_broker import ReplayBroker
+
+        snapshot = Snapshot(record_path)
+        # Replays decide from the bot state as it was, not as it is on replay day
+        snapshot.state = state_manager.export()
+        data_provider = ReplayDataProvider(snapshot, mode="record")
+        broker = ReplayBroker(snapshot, mode="record", broker=broker)
+
+    # Broker reads are memoized for this run only; the next run starts cold
+    broker = CachingBroker(broker)
     strategy = NiftyShopStrategy(broker, data_provider, state_manager, dry_run=is_dry_run)
-    strategy.run()
+    return strategy, broker, snapshot
+
+def _job(use_real_broker: bool = False, is_dry_run: bool = False, record_path: str = None, replay_path: str = None):
+    # Trigger-to-order-ack latency is measured from here
+    triggered_at = time.perf_counter()
+    print(f"\n[SCHEDULER] Triggering strategy at {datetime.now()} (Real Money: {use_real_broker}, Dry Run: {is_dry_run})")
+    
+    if replay_path:
+        # Offline, deterministic re-run of a recorded session. Never records trades.
+        from src.snapshot import Snapshot
+        from src.data.replay_provider import ReplayDataProvider
+        from src.broker.replay_broker import ReplayBroker
+        from src.simulation import MemoryTradeLogger, SimulatedClock
+
+        snapshot = Snapshot.load(replay_path)
+        print(f"[REPLAY] Replaying snapshot recorded at {snapshot.recorded_at}")
+        if snapshot.state is None:
+            print("[REPLAY] Snapshot predates recorded bot state; replaying from an empty state.")
+        # The recorded state, in memory only: the live state, ledger and logs stay untouched
+        clock = SimulatedClock()
+        clock.current = snapshot.recorded_at
+        state_manager = StateManager.in_memory(snapshot.state, logger=MemoryTradeLogger(clock))
+        broker = CachingBroker(ReplayBroker(snapshot))
+        with ReplayDataProvider(snapshot) as data_provider:
+            NiftyShopStrategy(broker, data_provider, state_manager, dry_run=True).run()
+        return
+
+    prepared = None if record_path else _prepared.pop((use_real_broker, is_dry_run), None)
+    if prepared and prepared[0] == datetime.now().date():
+        _, strategy, broker = prepared
+        snapshot = None
+        # Quotes cached during the warm-up are stale by now
+        broker.invalidate()
+        print("[SCHEDULER] Using the warmed-up strategy.")
+    else:
+        built = _build(use_real_broker, is_dry_run, record_path)
+        if built is None:
+            return
+        strategy, broker, snapshot = built
+
+    # Orders an earlier run left open are settled as the broker reports them
+    strategy.resume_open_orders()
+    trace = RunTrace(mode="real" if use_real_broker else "mock", dry_run=is_dry_run)
+    try:
+        strategy.run(trace, triggered_at=triggered_at)
+        # Fills are recorded in the background; don't exit before they are
+        if strategy.pending_fills and not strategy.wait_for_fills(timeout=config.FILL_TIMEOUT_SECONDS + 5):
+            for order in strategy.unconfirmed_orders():
+                print(f"WARNING: {order.symbol} order {order.order_id} was not confirmed before exit. It counts "
+                      f"toward today's limits and is reconciled with the broker on the next run.")
+    finally:
+        # One strategy_runs row per live run, including failed ones
+        save_run(trace)
+        print(broker.stats())
+        # Trade and screening logs are written behind the run; make them durable now
+        if not strategy.state_manager.logger.flush():
+            print("WARNING: Some log writes were not flushed.")
+        print(strategy.state_manager.logger.stats())
+
+    if snapshot:
+        snapshot.save()
+        # The recording provider's scratch bar store
+        strategy.data_provider.close()
+
+# The running intraday monitor, if any
+_monitor = None
+
+def start_monitor(use_real_broker: bool, is_dry_run: bool, until: str):
+    """Starts the day's intraday monitor over the bot's holdings, watching until `until` (IST)."""
+    global _monitor
+    from src.data.bar_store import IST
+    from src.intraday_monitor import IntradayMonitor
+
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+    built = _build(use_real_broker, is_dry_run)
+    if built is None:
+        return
+    strategy, _, _ = built
+    h, m = map(int, until.split(':'))
+    end = datetime.now(IST).replace(hour=h, minute=m, second=0, microsecond=0)
+    monitor = IntradayMonitor(strategy, mode="intraday" if use_real_broker else "intraday-mock")
+    if monitor.start(until=end):
+        _monitor = monitor
+    else:
+        print("[MONITOR] No bot-managed holdings to watch today.")
+
+def start_streaming():
+    """(Re)starts the live tick stream for the universe plus current holdings with today's token."""
+    from src.data.tick_stream import start_tick_stream
+    from src.universe import load_universe
+
+    access_token = get_access_token()
+    if not access_token:
+        print("[TICKS] No valid access token; not streaming. Quotes will be fetched on demand.")
+        return
+    broker = get_zerodha_broker(config.ZERODHA_API_KEY, access_token)
+    symbols = load_universe() + [h.symbol for h in broker.get_holdings()]
+    start_tick_stream(config.ZERODHA_API_KEY, access_token, broker.instruments, symbols)
 
 def main():
     parser = argparse.ArgumentParser(description="Nifty Shop Strategy")
@@ -46,8 +191,24 @@ def main():
     parser.add_argument("--real", action="store_true", help="Use REAL Money/Broker (Zerodha)")
     parser.add_argument("--dry-run", action="store_true", help="Simulate execution without placing orders")
     
+    parser.add_argument("--monitor", action="store_true", help="With --schedule: watch bot holdings intraday and sell/average as soon as a trigger price is crossed")
+    parser.add_argument("--buy-once", type=str, action="append", metavar="SYMBOL", help="With --schedule: also buy 1 qty of SYMBOL once, at the next trigger time (repeatable)")
+    parser.add_argument("--rebuild-ledger", action="store_true", help="Rebuild the bot's position ledger from trades.csv (or the trades table)")
     parser.add_argument("--test-order", type=str, help="Place a test BUY order for 1 qty of this symbol (e.g. ALTSTONE)")
 
+    parser.add_argument("--record", type=str, metavar="PATH", help="Record all market data and broker reads of the run to a snapshot file")
+    parser.add_argument("--replay", type=str, metavar="PATH", help="Re-run the strategy offline from a recorded snapshot (implies --dry-run)")
+
+    parser.add_argument("--profile", action="store_true", help="Sample the run with the built-in profiler and write a flamegraph (folded stacks) file to profiles/")
+
+    parser.add_argument("--simulate", action="store_true", help="Simulate the strategy day by day over stored daily bars (MockBroker)")
+    parser.add_argument("--from", dest="sim_from", type=str, help="Simulation start date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="sim_to", type=str, help="Simulation end date (YYYY-MM-DD, default today)")
+    parser.add_argument("--verbose", action="store_true", help="Show the strategy's output for every simulated day")
+    parser.add_argument("--sweep", action="store_true", help="Simulate a grid of strategy parameters in parallel (uses --from/--to)")
+    parser.add_argument("--grid", type=str, metavar="JSON", help="Sweep grid file: {\"DMA_PERIOD\": [20, 25], ...}")
+    parser.add_argument("--workers", type=int, help="Sweep worker processes (default: CPU count)")
+
     args = parser.parse_args()
     
     if args.login:
@@ -55,6 +216,34 @@ def main():
         login_flow()
         return
 
+    if args.rebuild_ledger:
+        from src.position_ledger import PositionLedger
+        PositionLedger().rebuild()
+        return
+
+    if args.simulate or args.sweep:
+        from src.universe import load_universe
+
+        if not args.sim_from:
+            print("ERROR: --simulate/--sweep need --from YYYY-MM-DD")
+            return
+        start = datetime.strptime(args.sim_from, "%Y-%m-%d").date()
+        end = datetime.strptime(args.sim_to, "%Y-%m-%d").date() if args.sim_to else datetime.now().date()
+
+        if args.sweep:
+            import json
+            from src.sweep import run_sweep
+
+            grid = None
+            if args.grid:
+                with open(args.grid, 'r') as f:
+                    grid = json.load(f)
+            run_sweep(start, end, load_universe(), grid=grid, workers=args.workers)
+        else:
+            from src.simulation import run_simulation
+            run_simulation(start, end, load_universe(), verbose=args.verbose)
+        return
+
     if args.test_order:
         symbol = args.test_order
         print(f"\n--- TEST ORDER MODE ---")
@@ -70,73 +259,76 @@ def main():
             print("ERROR: No valid access token. Run --login first.")
             return
             
-        broker = ZerodhaBroker(config.ZERODHA_API_KEY, access_token)
-        print(f"Placing order for {symbol}...")
+        broker = get_zerodha_broker(config.ZERODHA_API_KEY, access_token)
+        # Exchange comes from the instrument master instead of a failed NSE order
+        instrument = broker.resolve_instrument(symbol)
+        if instrument is None and len(broker.instruments):
+            print(f"FAILURE: {symbol} is not listed on {', '.join(config.INSTRUMENT_EXCHANGES)}.")
+            return
+        exchange = instrument.exchange if instrument else "NSE"
+        print(f"Placing order for {symbol} on {exchange}...")
         try:
-            # Try NSE First
-            try:
-                res = broker.place_buy_order(symbol, quantity=1, price=None, exchange="NSE")
-                print(f"SUCCESS (NSE): Order placed. ID: {res.order_id}")
-            except Exception as e_nse:
-                error_msg = str(e_nse).lower()
-                if "does not exist" in error_msg or "expired" in error_msg:
-                    print(f"NSE Order failed ({e_nse}). Retrying on BSE...")
-                    res = broker.place_buy_order(symbol, quantity=1, price=None, exchange="BSE")
-                    print(f"SUCCESS (BSE): Order placed. ID: {res.order_id}")
-                else:
-                    raise e_nse
-
+            res = broker.place_buy_order(symbol, quantity=1, price=None, exchange=exchange)
+            print(f"SUCCESS ({exchange}): Order placed. ID: {res.order_id}")
         except Exception as e:
              print(f"FAILURE: {e}")
         return
 
+    if (args.run_now or args.schedule) and not check_schema():
+        # Trades would be logged against the old keys and never reach the database
+        print("ERROR: The database schema is out of date. Run python -m src.migrations first. Not trading.")
+        return
+
     # Configuration for the job
     use_real_broker = args.real
     is_dry_run = args.dry_run
 
     def scaled_job():
-        job(use_real_broker, is_dry_run)
+        job(use_real_broker, is_dry_run, profile=args.profile)
 
-    if args.run_now:
-        job(use_real_broker, is_dry_run)
+    if args.replay:
+        job(replay_path=args.replay, profile=args.profile)
+    elif args.run_now:
+        job(use_real_broker, is_dry_run, record_path=args.record, profile=args.profile)
     elif args.schedule:
-        import pytz
-        
-        # Convert Configured IST Time to Local System Time
-        ist_tz = pytz.timezone('Asia/Kolkata')
-        now_ist = datetime.now(ist_tz)
-        
-        # Parse config time (e.g. "15:20")
-        h, m = map(int, config.SCHEDULE_TIME.split(':'))
-        
-        target_ist = now_ist.replace(hour=h, minute=m, second=0, microsecond=0)
-        
-        # Convert to Local Time
-        target_local = target_ist.astimezone()
-        local_schedule_str = target_local.strftime("%H:%M")
-        
+        from src.scheduler import Scheduler
+
+        # One process, one sleep until the next deadline; non-trading days are skipped
+        scheduler = Scheduler()
+        if config.TICK_STREAM and use_real_broker:
+            # Stream from market open so the 15:20 decision reads prices from memory
+            scheduler.add("tick-stream", config.TICK_STREAM_START_TIME, start_streaming,
+                          catch_up_until=config.SCHEDULE_TIME)
+        if config.WARMUP_LEAD_MINUTES > 0:
+            # History, DMAs, instruments and the account are ready before the trigger
+            warmup_at = (datetime.strptime(config.SCHEDULE_TIME, "%H:%M")
+                         - timedelta(minutes=config.WARMUP_LEAD_MINUTES)).strftime("%H:%M")
+            scheduler.add("warm-up", warmup_at, lambda: warm_up(use_real_broker, is_dry_run),
+                          catch_up_until=config.SCHEDULE_TIME)
+        if args.monitor:
+            # Sell/average triggers are acted on as they are crossed, up to the daily run
+            monitor_until = warmup_at if config.WARMUP_LEAD_MINUTES > 0 else config.SCHEDULE_TIME
+            scheduler.add("monitor", config.MONITOR_START_TIME,
+                          lambda: start_monitor(use_real_broker, is_dry_run, monitor_until),
+                          catch_up_until=monitor_until)
+        scheduler.add("strategy", config.SCHEDULE_TIME, scaled_job)
+        for symbol in args.buy_once or []:
+            from src.buy_alstone_scheduled import execute_buy
+            scheduler.add(f"buy-{symbol}", config.SCHEDULE_TIME, lambda symbol=symbol: execute_buy(symbol), once=True)
+
         print(f"--- Scheduler Setup ---")
-        print(f"Target Time (IST): {config.SCHEDULE_TIME}")
-        print(f"System Timezone:   {target_local.tzinfo}")
-        print(f"Local Schedule:    {local_schedule_str}")
+        print(f"Trigger Time (IST): {config.SCHEDULE_TIME}, NSE trading days only")
+        print(scheduler.describe())
         print(f"-----------------------")
-        print(f"Starting Scheduler. Waiting for {local_schedule_str}...")
-        
-        schedule.every().day.at(local_schedule_str).do(scaled_job)
-        
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
-            # Optional: Print heartbeat or status if needed, but keeping it silent is standard.
-            # To avoid user confusion, we can rely on the logs.
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        print(scheduler.stats())
     else:
         print("Please specify --run-now, --schedule, or --login")
         parser.print_help()
 
-from src.database import engine, Base
-
 if __name__ == "__main__":
-    # Create tables if they don't exist
-    Base.metadata.create_all(bind=engine)
     main()
 
@@ -0,0 +1,73 @@
+import os
+import numpy as np
+from datetime import date
+from typing import Iterable, List, Optional
+from .config import config
+
+# NSE equity trading holidays (weekday closures only), from the exchange's yearly
+# circulars. Add next year's list when NSE publishes it; extra or unscheduled closures
+# can also be listed in MARKET_HOLIDAYS_FILE without a code change.
+NSE_HOLIDAYS = [
+    # 2024
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29", "2024-04-11",
+    "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17", "2024-07-17", "2024-08-15",
+    "2024-10-02", "2024-11-01", "2024-11-15", "2024-11-20", "2024-12-25",
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18",
+    "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
+    "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03",
+    "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02",
+    "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+]
+
+
+def _read_holidays_file(path: Optional[str]) -> List[str]:
+    """One YYYY-MM-DD per line; blank lines and # comments are ignored."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()]
+
+
+class MarketCalendar:
+    """
+    Trading days as a precomputed NumPy business-day calendar (Mon-Fri minus holidays),
+    so "is this a session", "previous session" and "next session" are single
+    busday lookups instead of loops over dates.
+    """
+
+    def __init__(self, holidays: Iterable[str] = ()):
+        self.holidays = np.array(sorted(set(holidays)), dtype="datetime64[D]")
+        self._cal = np.busdaycalendar(weekmask="1111100", holidays=self.holidays)
+
+    def is_trading_day(self, day) -> bool:
+        return bool(np.is_busday(np.datetime64(day, "D"), busdaycal=self._cal))
+
+    def previous_or_same(self, day) -> np.datetime64:
+        """day itself if it is a session, else the session before it."""
+        return np.busday_offset(np.datetime64(day, "D"), 0, roll="backward", busdaycal=self._cal)
+
+    def previous(self, day) -> np.datetime64:
+        """The last session strictly before day."""
+        return np.busday_offset(np.datetime64(day, "D") - 1, 0, roll="backward", busdaycal=self._cal)
+
+    def next_or_same(self, day) -> np.datetime64:
+        """day itself if it is a session, else the next one."""
+        return np.busday_offset(np.datetime64(day, "D"), 0, roll="forward", busdaycal=self._cal)
+
+
+_calendar: Optional[MarketCalendar] = None
+
+
+def nse_calendar() -> MarketCalendar:
+    """The process-wide NSE calendar, built on first use."""
+    global _calendar
+    if _calendar is None:
+        _calendar = MarketCalendar(NSE_HOLIDAYS + _read_holidays_file(config.MARKET_HOLIDAYS_FILE))
+    return _calendar
+
+
+def is_trading_day(day: date) -> bool:
+    return nse_calendar().is_trading_day(day)
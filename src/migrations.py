@@ -0,0 +1,228 @@
+import argparse
+import sys
+from collections import Counter
+from datetime import date, time
+from typing import List
+from sqlalchemy import Date, Table, bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+from .database import engine as default_engine, Base
+from . import models
+
+# Tables whose date/time (and percent_below_dma) were stored as strings before
+TYPED_TABLES = (models.Trade.__table__, models.ScreeningLog.__table__)
+
+# Indexes earlier versions created that the models no longer define
+OBSOLETE_INDEXES = {"trades": ("uq_trades_date_time_symbol_action",)}
+
+
+def legacy_order_id(day: date, at: time, symbol: str, action: str, n: int) -> str:
+    """
+    Stand-in order id for a trade logged before order ids were kept: the n-th (from 0)
+    trade of symbol and action in that second. The CSV importer numbers trades.csv rows
+    the same way, so a re-import matches the rows migrated here.
+    """
+    return f"legacy:{day.isoformat()}T{at.strftime('%H:%M:%S')}:{symbol}:{action}:{n}"
+
+
+def _missing_columns(conn: Connection, table: Table) -> List[str]:
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    return [c.name for c in table.columns if c.name not in existing]
+
+
+def _is_typed(conn: Connection, table: Table) -> bool:
+    column = next(c for c in inspect(conn).get_columns(table.name) if c["name"] == "date")
+    return isinstance(column["type"], Date)
+
+
+def _convert_postgres(conn: Connection, table: Table):
+    alters = [
+        "ALTER COLUMN date TYPE DATE USING NULLIF(date, '')::date",
+        "ALTER COLUMN time TYPE TIME USING NULLIF(time, '')::time",
+    ]
+    if "percent_below_dma" in table.c:
+        alters.append("ALTER COLUMN percent_below_dma TYPE DOUBLE PRECISION "
+                      "USING NULLIF(rtrim(percent_below_dma, '%'), '')::double precision")
+    conn.execute(text(f"ALTER TABLE {table.name} {', '.join(alters)}"))
+
+
+def _convert_sqlite(conn: Connection, table: Table):
+    """
+    SQLite can't change a column's type: copy every row into a new table of the current
+    model. Its indexes are added afterwards by _ensure_indexes, which checks for
+    duplicates first.
+    """
+    old = f"{table.name}_old"
+    missing = _missing_columns(conn, table)
+    copied = [c.name for c in table.columns if c.name not in missing]
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+    # Index names are per database, so the old table's would clash with the new ones
+    for index in inspect(conn).get_indexes(old):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    conn.execute(CreateTable(table))
+
+    # The Time type stores microseconds; "12:00:02" would not compare equal to new rows
+    converted = {
+        "time": "CASE WHEN length(time) = 8 THEN time || '.000000' ELSE time END",
+        "percent_below_dma": "CAST(NULLIF(rtrim(percent_below_dma, '%'), '') AS REAL)",
+    }
+    select_list = ", ".join(converted.get(c, c) for c in copied)
+    conn.execute(text(f"INSERT INTO {table.name} ({', '.join(copied)}) "
+                      f"SELECT {select_list} FROM {old} ORDER BY id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+
+
+def _add_columns(conn: Connection, table: Table, names: List[str]):
+    for name in names:
+        column_type = table.c[name].type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+
+
+def _backfill_order_ids(conn: Connection) -> int:
+    """Gives trades logged without an order id their legacy_order_id(), in insertion order."""
+    trades = models.Trade.__table__
+    rows = conn.execute(
+        select(trades.c.id, trades.c.date, trades.c.time, trades.c.symbol, trades.c.action)
+        .where(trades.c.order_id.is_(None), trades.c.date.isnot(None), trades.c.time.isnot(None))
+        .order_by(trades.c.id)
+    ).fetchall()
+    seen = Counter()
+    updates = []
+    for row in rows:
+        key = (row.date, row.time, row.symbol, row.action)
+        updates.append({"row_id": row.id, "order_id": legacy_order_id(*key, seen[key])})
+        seen[key] += 1
+    if updates:
+        conn.execute(update(trades).where(trades.c.id == bindparam("row_id"))
+                     .values(order_id=bindparam("order_id")), updates)
+    return len(updates)
+
+
+def _duplicate_keys(conn: Connection, table: Table, columns: List[str]) -> int:
+    """How many distinct values of columns appear on more than one row (NULLs never conflict)."""
+    key = ", ".join(columns)
+    not_null = " AND ".join(f"{c} IS NOT NULL" for c in columns)
+    return conn.execute(text(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {table.name} WHERE {not_null} "
+        f"GROUP BY {key} HAVING COUNT(*) > 1) AS duplicated"
+    )).scalar()
+
+
+def _ensure_indexes(conn: Connection, table: Table, dedupe: bool = False) -> List[str]:
+    """
+    Drops obsolete indexes and creates the model's missing ones. A unique index is not
+    created while its key is duplicated in the table; with dedupe, the duplicates are
+    deleted first (the oldest row of each is kept).
+    """
+    existing = {i["name"] for i in inspect(conn).get_indexes(table.name)}
+    done = []
+    for name in OBSOLETE_INDEXES.get(table.name, ()):
+        if name in existing:
+            conn.execute(text(f"DROP INDEX {name}"))
+            done.append(f"{table.name}: dropped obsolete index {name}")
+    for index in table.indexes:
+        if index.name in existing:
+            continue
+        if index.unique:
+            columns = [c.name for c in index.columns]
+            duplicated = _duplicate_keys(conn, table, columns)
+            if duplicated and not dedupe:
+                print(f"[MIGRATE] WARNING: {table.name}: {duplicated} values of ({', '.join(columns)}) "
+                      f"appear on more than one row, so unique index {index.name} was NOT created. "
+                      f"Review them, or re-run with --dedupe to delete all but the oldest row of each.")
+                continue
+            if duplicated:
+                key = ", ".join(columns)
+                removed = conn.execute(text(
+                    f"DELETE FROM {table.name} WHERE {' AND '.join(f'{c} IS NOT NULL' for c in columns)} "
+                    f"AND id NOT IN (SELECT MIN(id) FROM {table.name} GROUP BY {key})"
+                )).rowcount
+                done.append(f"{table.name}: deleted {removed} duplicate rows of ({key}) (--dedupe)")
+        index.create(conn)
+        done.append(f"{table.name}: created index {index.name}")
+    return done
+
+
+def migrate(bind: Engine = None, dedupe: bool = False) -> List[str]:
+    """
+    Brings the database up to the current models: creates missing tables, converts
+    trades and screening_logs from the old string date/time/percent columns to typed
+    ones (existing rows included), adds missing columns (backfilling trades' order_id)
+    and reconciles indexes. Rows are only ever deleted with dedupe. Meant to be run
+    once per upgrade from the command line (python -m src.migrations); returns what
+    was done.
+    """
+    bind = bind or default_engine
+    Base.metadata.create_all(bind=bind)
+    applied = []
+    with bind.begin() as conn:
+        for table in TYPED_TABLES:
+            missing = _missing_columns(conn, table)
+            if not _is_typed(conn, table):
+                if conn.dialect.name == "postgresql":
+                    _convert_postgres(conn, table)
+                    _add_columns(conn, table, missing)
+                else:
+                    _convert_sqlite(conn, table)
+                applied.append(f"{table.name}: converted date/time columns to typed columns")
+            elif missing:
+                _add_columns(conn, table, missing)
+            if missing:
+                applied.append(f"{table.name}: added columns {', '.join(missing)}")
+            if "order_id" in missing:
+                applied.append(f"trades: gave {_backfill_order_ids(conn)} earlier trades a legacy order id")
+            applied.extend(_ensure_indexes(conn, table, dedupe))
+    for step in applied:
+        print(f"[MIGRATE] {step}")
+    return applied
+
+
+def pending(bind: Engine = None) -> List[str]:
+    """What migrate() still has to do to existing tables. Only reads the schema."""
+    bind = bind or default_engine
+    todo = []
+    with bind.connect() as conn:
+        inspector = inspect(conn)
+        for table in TYPED_TABLES:
+            if not inspector.has_table(table.name):
+                continue
+            if not _is_typed(conn, table):
+                todo.append(f"{table.name}: date/time columns are still strings")
+            missing = _missing_columns(conn, table)
+            if missing:
+                todo.append(f"{table.name}: missing columns {', '.join(missing)}")
+            existing = {i["name"] for i in inspector.get_indexes(table.name)}
+            todo.extend(f"{table.name}: missing index {i.name}" for i in table.indexes if i.name not in existing)
+            todo.extend(f"{table.name}: obsolete index {name}"
+                        for name in OBSOLETE_INDEXES.get(table.name, ()) if name in existing)
+    return todo
+
+
+def check_schema(bind: Engine = None) -> bool:
+    """
+    Creates missing tables, and reports (without changing them) existing tables that
+    need a migration. For process startup; True if the schema is current.
+    """
+    bind = bind or default_engine
+    Base.metadata.create_all(bind=bind)
+    todo = pending(bind)
+    for step in todo:
+        print(f"[MIGRATE] Pending: {step}")
+    if todo:
+        print("[MIGRATE] The database schema is out of date. Run: python -m src.migrations")
+    return not todo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database to the current schema")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Delete rows repeating a unique key (oldest kept) so its index can be created")
+    args = parser.parse_args()
+
+    if not migrate(dedupe=args.dedupe):
+        print("[MIGRATE] Nothing to do.")
+    remaining = pending()
+    if remaining:
+        print(f"[MIGRATE] Still pending: {'; '.join(remaining)}")
+        sys.exit(1)
+    print("[MIGRATE] Database is up to date.")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Time, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -16,24 +16,49 @@ class Trade(Base):
     __tablename__ = "trades"
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String) # Storing as string to match existing CSV format for now, or use Date
-    time = Column(String)
+    date = Column(Date) # Local (IST) date and time of the trade, as in trades.csv
+    time = Column(Time)
     symbol = Column(String, index=True)
     action = Column(String)
     quantity = Column(Integer)
     price = Column(Float)
     total_cost = Column(Float)
+    order_id = Column(String) # Broker order id; "legacy:..." for trades logged before it was kept
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # One row per broker order; the CSV importer merges on it. Newest-first listings and
+    # date-range filters use (date, time).
+    __table_args__ = (
+        Index("uq_trades_order_id", "order_id", unique=True),
+        Index("ix_trades_date_time", "date", "time"),
+    )
+
 class ScreeningLog(Base):
     __tablename__ = "screening_logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String)
-    time = Column(String)
+    date = Column(Date) # Local (IST) date and time of the screening run
+    time = Column(Time)
     rank = Column(Integer)
     symbol = Column(String, index=True)
     current_price = Column(Float)
     dma_25 = Column(Float)
-    percent_below_dma = Column(String) # Storing as string with % for now
+    percent_below_dma = Column(Float) # In percent, e.g. -10.25
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+    # A symbol appears once per screening run. Finding the latest run and its rows is a
+    # (date, time) lookup on this index.
+    __table_args__ = (Index("uq_screening_logs_date_time_symbol", "date", "time", "symbol", unique=True),)
+
+class StrategyRun(Base):
+    __tablename__ = "strategy_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    started_at = Column(DateTime, default=datetime.utcnow, index=True)
+    mode = Column(String)
+    dry_run = Column(Integer, default=0)
+    total_ms = Column(Float)
+    stages = Column(Text) # JSON: span name -> total milliseconds
+    call_counts = Column(Text) # JSON: span name -> number of calls
+    decision = Column(String)
+    error = Column(String, nullable=True)
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+# Lives next to strategy_state.json; orders can stay open across days and restarts
+OPEN_ORDERS_FILE = "open_orders.json"
+
+
+@dataclass
+class OpenOrder:
+    order_id: str
+    symbol: str
+    action: str  # BUY, AVERAGE or SELL
+    quantity: int  # As placed
+    price: float  # Estimated price its capital was reserved at
+    date: str  # Trading day whose limits it counts toward
+    placed_at: str  # ISO timestamp
+
+    @property
+    def reserved(self) -> float:
+        return self.quantity * self.price
+
+
+class OpenOrderBook:
+    """
+    Orders the bot placed that the broker hasn't reported final yet. An order is added
+    when placed and removed when its fill is recorded, so one still open when the
+    process exits is picked up and reconciled by the next run. Kept on disk as a small
+    JSON file, rewritten atomically on each change like the position ledger.
+    """
+
+    def __init__(self, filepath: Optional[str] = OPEN_ORDERS_FILE):
+        # filepath=None keeps the book in memory only (used by simulations)
+        self.filepath = filepath
+        self.orders: Dict[str, OpenOrder] = {}
+        self._mtime: Optional[int] = None
+        # Fills are recorded from the broker's tracking thread
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Reloads if another process (or StateManager) has written the book since."""
+        if not self.filepath or not os.path.exists(self.filepath):
+            return
+        if os.stat(self.filepath).st_mtime_ns == self._mtime:
+            return
+        try:
+            with open(self.filepath, 'r') as f:
+                data = json.load(f)
+            self.orders = {o["order_id"]: OpenOrder(**o) for o in data.get("orders", [])}
+            self._mtime = os.stat(self.filepath).st_mtime_ns
+        except Exception as e:
+            print(f"Error loading open orders: {e}. Reconcile them against the Kite order book.")
+
+    def save(self):
+        if not self.filepath:
+            return
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"orders": [asdict(o) for o in self.orders.values()]}, f, indent=4)
+        os.replace(tmp_path, self.filepath)
+        self._mtime = os.stat(self.filepath).st_mtime_ns
+
+    def add(self, order: OpenOrder):
+        with self._lock:
+            self.refresh()
+            self.orders[order.order_id] = order
+            self.save()
+
+    def pop(self, order_id: str) -> Optional[OpenOrder]:
+        """Removes and returns the order, or None if it isn't open (e.g. already settled)."""
+        with self._lock:
+            self.refresh()
+            order = self.orders.pop(order_id, None)
+            if order is not None:
+                self.save()
+            return order
+
+    def all(self) -> List[OpenOrder]:
+        with self._lock:
+            self.refresh()
+            return list(self.orders.values())
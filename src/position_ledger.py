@@ -0,0 +1,169 @@
+import csv
+import json
+import os
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+# Lives next to strategy_state.json
+LEDGER_FILE = "position_ledger.json"
+
+BUY_ACTIONS = ("BUY", "AVERAGE")
+
+
+@dataclass
+class Position:
+    symbol: str
+    quantity: int
+    cost_basis: float  # What the open quantity cost, at average price
+    first_trade: str  # Opening trade of the current position (ISO timestamp)
+    last_trade: str
+
+    @property
+    def average_price(self) -> float:
+        return self.cost_basis / self.quantity if self.quantity else 0.0
+
+
+class PositionLedger:
+    """
+    The bot's own positions, keyed by symbol and updated on every recorded trade.
+    Answers "is this a bot-managed holding" from an in-memory set instead of
+    re-reading the whole trade history. Kept on disk as a small JSON file, rewritten
+    atomically on each trade; closed positions stay in the file with quantity 0.
+    """
+
+    def __init__(self, filepath: Optional[str] = LEDGER_FILE):
+        # filepath=None keeps the ledger in memory only (used by simulations)
+        self.filepath = filepath
+        self.positions: Dict[str, Position] = {}
+        self._open: Set[str] = set()
+        self._mtime: Optional[int] = None
+
+    @classmethod
+    def open(cls, filepath: Optional[str] = LEDGER_FILE, trades_file: Optional[str] = None) -> "PositionLedger":
+        """Loads the ledger; the first time there is none, builds it from the trade history."""
+        ledger = cls(filepath)
+        if filepath and os.path.exists(filepath):
+            ledger._load()
+        elif filepath:
+            ledger.rebuild(trades_file)
+        return ledger
+
+    def _load(self):
+        try:
+            with open(self.filepath, 'r') as f:
+                data = json.load(f)
+            self.positions = {p["symbol"]: Position(**p) for p in data.get("positions", [])}
+            self._open = {s for s, p in self.positions.items() if p.quantity > 0}
+            self._mtime = os.stat(self.filepath).st_mtime_ns
+        except Exception as e:
+            print(f"Error loading position ledger: {e}. Rebuilding from trade history.")
+            self.rebuild()
+
+    def save(self):
+        if not self.filepath:
+            return
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"positions": [asdict(p) for p in self.positions.values()]}, f, indent=4)
+        os.replace(tmp_path, self.filepath)
+        self._mtime = os.stat(self.filepath).st_mtime_ns
+
+    def refresh(self):
+        """Reloads if another process (or StateManager) has written the ledger since."""
+        if not self.filepath or not os.path.exists(self.filepath):
+            return
+        if os.stat(self.filepath).st_mtime_ns != self._mtime:
+            self._load()
+
+    def apply(self, symbol: str, action: str, quantity: int, price: float, when: Optional[str] = None):
+        """Applies one trade in memory. BUY/AVERAGE add at cost; SELL reduces at average cost."""
+        when = when or datetime.now().isoformat(timespec="seconds")
+        position = self.positions.get(symbol)
+        if action in BUY_ACTIONS:
+            if position is None or position.quantity <= 0:
+                position = self.positions[symbol] = Position(symbol, 0, 0.0, when, when)
+            position.quantity += quantity
+            position.cost_basis += quantity * price
+        elif action == "SELL" and position is not None:
+            sold = min(quantity, position.quantity)
+            position.cost_basis -= position.average_price * sold
+            position.quantity -= sold
+            if position.quantity <= 0:
+                position.quantity = 0
+                position.cost_basis = 0.0
+        else:
+            return
+        position.last_trade = when
+        if position.quantity > 0:
+            self._open.add(symbol)
+        else:
+            self._open.discard(symbol)
+
+    def record(self, symbol: str, action: str, quantity: int, price: float):
+        self.refresh()
+        self.apply(symbol, action, quantity, price)
+        self.save()
+
+    def open_symbols(self) -> Set[str]:
+        """Symbols the bot currently holds a position in."""
+        self.refresh()
+        return set(self._open)
+
+    def get(self, symbol: str) -> Optional[Position]:
+        return self.positions.get(symbol)
+
+    def export(self) -> List[dict]:
+        """The open positions, as plain dicts (see restore())."""
+        self.refresh()
+        return [asdict(self.positions[s]) for s in sorted(self._open)]
+
+    def restore(self, positions: List[dict]):
+        """Replaces the in-memory positions with export()'s output. Nothing is written."""
+        self.positions = {p["symbol"]: Position(**p) for p in positions}
+        self._open = {s for s, p in self.positions.items() if p.quantity > 0}
+
+    def rebuild(self, trades_file: Optional[str] = None):
+        """
+        Rebuilds the ledger by replaying the trade history: the trades CSV if there is
+        one, else the trades table. Only needed once, when no ledger exists yet.
+        """
+        self.positions = {}
+        self._open = set()
+        trades_file = trades_file or "trades.csv"
+        if os.path.exists(trades_file):
+            source = trades_file
+            with open(trades_file, 'r', newline='') as f:
+                count = self._replay(csv.DictReader(f))
+        else:
+            source = "database"
+            count = self._replay(self._db_trades())
+        self.save()
+        print(f"[LEDGER] Rebuilt from {source}: {count} trades, {len(self._open)} open positions.")
+
+    def _replay(self, rows: Iterable[dict]) -> int:
+        count = 0
+        for row in rows:
+            try:
+                self.apply(
+                    row["Symbol"], row["Action"], int(float(row["Quantity"])), float(row["Price"]),
+                    when=f"{row['Date']}T{row['Time']}"
+                )
+                count += 1
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"[LEDGER] Skipping unreadable trade {row}: {e}")
+        return count
+
+    def _db_trades(self) -> Iterable[dict]:
+        from .database import SessionLocal
+        from . import models
+
+        db = SessionLocal()
+        try:
+            for t in db.query(models.Trade).order_by(models.Trade.id).yield_per(1000):
+                yield {"Date": t.date, "Time": t.time, "Symbol": t.symbol, "Action": t.action,
+                       "Quantity": t.quantity, "Price": t.price}
+        except Exception as e:
+            print(f"Error reading trades from DB: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,124 @@
+import os
+import sys
+import sysconfig
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+from .config import config
+
+# Profiles are written in the "folded stacks" format: one line per distinct stack,
+# frames joined by ";" root first, followed by a space and the sample count. Any
+# flamegraph tool reads it directly (flamegraph.pl, speedscope, inferno).
+PROFILE_EXTENSION = ".folded"
+
+_SITE_MARKERS = ("site-packages" + os.sep, "dist-packages" + os.sep)
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+
+def _frame_label(code) -> str:
+    """
+    Short, stable name for a code object. Library frames keep their package path
+    (e.g. pandas/core/frame.py:__getitem__) so time spent in pandas, yfinance,
+    kiteconnect or sqlalchemy is grouped by library in the flamegraph.
+    """
+    filename = code.co_filename
+    for marker in _SITE_MARKERS:
+        pos = filename.rfind(marker)
+        if pos != -1:
+            filename = filename[pos + len(marker):]
+            break
+    else:
+        for root in (_STDLIB, os.getcwd() + os.sep):
+            if filename.startswith(root):
+                filename = filename[len(root):]
+                break
+    return f"{filename}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread from a background thread at a fixed interval.
+    The profiled code is never instrumented, so overhead stays at a few percent even
+    at the default 5 ms interval. Use as a context manager around a run.
+    """
+
+    def __init__(self, label: str = "run", interval_ms: Optional[float] = None, output_dir: Optional[str] = None):
+        self.label = label
+        self.interval = (interval_ms or config.PROFILE_INTERVAL_MS) / 1000.0
+        self.output_dir = output_dir or config.PROFILE_DIR
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.path: Optional[str] = None
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Optional[str]:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.write()
+
+    def write(self) -> Optional[str]:
+        if not self.stacks:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(self.output_dir, f"{stamp}_{self.label}{PROFILE_EXTENSION}")
+        with open(self.path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"[PROFILE] {self.samples} samples every {self.interval * 1000:.0f}ms -> {self.path}")
+        return self.path
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def list_profiles(output_dir: Optional[str] = None):
+    """Profiles on disk, newest first."""
+    output_dir = output_dir or config.PROFILE_DIR
+    if not os.path.isdir(output_dir):
+        return []
+    profiles = []
+    for name in os.listdir(output_dir):
+        if not name.endswith(PROFILE_EXTENSION):
+            continue
+        stat = os.stat(os.path.join(output_dir, name))
+        profiles.append({"name": name, "size": stat.st_size, "created_at": datetime.fromtimestamp(stat.st_mtime)})
+    profiles.sort(key=lambda p: p["created_at"], reverse=True)
+    return profiles
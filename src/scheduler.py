@@ -0,0 +1,138 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, List, Optional
+from .data.bar_store import IST
+from .market_calendar import MarketCalendar, nse_calendar
+
+# Longest single sleep. Waking up this often re-reads the wall clock, so a suspended
+# machine or a clock adjustment can't push a deadline back by more than this.
+MAX_SLEEP_SECONDS = 60.0
+
+
+def _parse_time(hhmm: str) -> time:
+    h, m = map(int, hhmm.split(':'))
+    return time(h, m)
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    at: str  # IST, "HH:MM"
+    action: Callable[[], Any]
+    trading_days_only: bool = True
+    once: bool = False
+    next_run: Optional[datetime] = None
+    runs: int = 0
+    jitter_ms: List[float] = field(default_factory=list)
+
+    def jitter_summary(self) -> str:
+        if not self.jitter_ms:
+            return f"{self.name}: not fired yet"
+        avg = sum(self.jitter_ms) / len(self.jitter_ms)
+        return f"{self.name}: {self.runs} runs, jitter avg {avg:.1f}ms, max {max(self.jitter_ms):.1f}ms"
+
+
+class Scheduler:
+    """
+    Runs named jobs at fixed IST times, on NSE trading days only unless told otherwise.
+
+    Instead of polling every second, the scheduler sleeps until the earliest deadline
+    (in slices of at most MAX_SLEEP_SECONDS) and fires the job. Deadlines are computed
+    in IST for each run, so the local timezone and its DST changes don't matter. Every
+    firing is logged with its jitter: how late it fired against its target time. Jobs
+    run one after another on the scheduler's thread; jobs due at the same time run in
+    the order they were added.
+    """
+
+    def __init__(self, calendar: Optional[MarketCalendar] = None,
+                 clock: Optional[Callable[[], datetime]] = None):
+        self.calendar = calendar or nse_calendar()
+        # Returns the current time, timezone-aware; tests pass a fake one
+        self.clock = clock or (lambda: datetime.now(IST))
+        self.jobs: List[ScheduledJob] = []
+        self._stop = threading.Event()
+
+    def _now(self) -> datetime:
+        return self.clock()
+
+    def next_run_after(self, job: ScheduledJob, after: datetime) -> datetime:
+        """The first time strictly after `after` at which job is due."""
+        at = _parse_time(job.at)
+        day = after.astimezone(IST).date()
+        while True:
+            if job.trading_days_only:
+                day = self.calendar.next_or_same(day).astype(datetime)
+            deadline = IST.localize(datetime.combine(day, at))
+            if deadline > after:
+                return deadline
+            day += timedelta(days=1)
+
+    def add(self, name: str, at: str, action: Callable[[], Any], trading_days_only: bool = True,
+            once: bool = False, catch_up_until: Optional[str] = None) -> ScheduledJob:
+        """
+        Schedules action daily at `at` (IST), or just at its next occurrence with once=True.
+        With catch_up_until, a process started between `at` and that time on a due day
+        runs the job straight away instead of waiting for the next day.
+        """
+        job = ScheduledJob(name=name, at=at, action=action, trading_days_only=trading_days_only, once=once)
+        now = self._now()
+        job.next_run = self.next_run_after(job, now)
+        if catch_up_until:
+            today_at = self.next_run_after(job, now - timedelta(days=1))
+            until = IST.localize(datetime.combine(today_at.date(), _parse_time(catch_up_until)))
+            if today_at <= now < until:
+                job.next_run = now
+        self.jobs.append(job)
+        return job
+
+    def pending(self) -> List[ScheduledJob]:
+        """Jobs still to run; a once job drops out after firing."""
+        return [job for job in self.jobs if job.next_run is not None]
+
+    def describe(self) -> str:
+        lines = []
+        for job in sorted(self.pending(), key=self._key):
+            local = job.next_run.astimezone()
+            days = "trading days" if job.trading_days_only else "daily"
+            lines.append(f"  {job.name:<14} {job.at} IST ({'once' if job.once else days}), "
+                         f"next {job.next_run:%a %Y-%m-%d %H:%M} IST = {local:%H:%M} {local.tzname()}")
+        return "\n".join(lines)
+
+    def _key(self, job: ScheduledJob):
+        return job.next_run, self.jobs.index(job)
+
+    def _fire(self, job: ScheduledJob):
+        target = job.next_run
+        jitter = (self._now() - target).total_seconds() * 1000.0
+        print(f"\n[SCHEDULER] {job.name}: fired {jitter:.1f}ms after {target:%Y-%m-%d %H:%M:%S} IST")
+        job.runs += 1
+        job.jitter_ms.append(jitter)
+        try:
+            job.action()
+        except Exception as e:
+            print(f"[SCHEDULER] {job.name} failed: {e}")
+        if job.once:
+            job.next_run = None
+        else:
+            job.next_run = self.next_run_after(job, max(target, self._now()))
+            print(f"[SCHEDULER] {job.name}: next run {job.next_run:%a %Y-%m-%d %H:%M} IST")
+
+    def run(self):
+        """Fires jobs as they fall due until stop() is called or no jobs are left."""
+        while not self._stop.is_set():
+            pending = self.pending()
+            if not pending:
+                return
+            job = min(pending, key=self._key)
+            delay = (job.next_run - self._now()).total_seconds()
+            if delay > 0:
+                self._stop.wait(min(delay, MAX_SLEEP_SECONDS))
+                continue
+            self._fire(job)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> str:
+        return "[SCHEDULER] " + "; ".join(job.jitter_summary() for job in self.jobs)
@@ -0,0 +1,295 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from datetime import datetime, date, time as dtime
+from typing import Any, Dict, List, Optional
+from .config import config
+from .interfaces import IDataProvider, ScreeningResult
+from .broker.mock_broker import MockBroker
+from .csv_logger import TRADES_HEADER
+from .data.bar_store import BarStore
+from .state_manager import StateManager
+from .strategy import NiftyShopStrategy
+
+# Records how far back each symbol has already been backfilled, so symbols that simply
+# didn't trade that early (late listings) aren't re-downloaded on every simulation
+BACKFILL_INDEX = "backfill.json"
+
+
+@dataclass
+class PricePanel:
+    """Date-aligned daily closes for a universe: closes[t, j] is symbols[j] on dates[t], NaN if missing."""
+    dates: np.ndarray    # datetime64[D], ascending
+    symbols: List[str]
+    closes: np.ndarray   # (dates x symbols) float32
+
+    def column(self, symbol: str) -> int:
+        return self.symbols.index(symbol)
+
+
+def rolling_dma(closes: np.ndarray, period: int, csum: Optional[np.ndarray] = None,
+                ccount: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    period-day simple moving average for every (date, symbol) from cumulative sums.
+    A window only counts if all `period` bars in it exist. Pass precomputed csum/ccount
+    (see cumulative_sums) to derive any number of windows from one pass over the data.
+    """
+    if csum is None or ccount is None:
+        csum, ccount = cumulative_sums(closes)
+    dma = np.full(closes.shape, np.nan)
+    if period <= 0 or period > closes.shape[0]:
+        return dma
+    window_sum = csum[period:] - csum[:-period]
+    window_count = ccount[period:] - ccount[:-period]
+    dma[period - 1:] = np.where(window_count == period, window_sum / period, np.nan)
+    return dma
+
+
+def cumulative_sums(closes: np.ndarray):
+    """Zero-padded running sums of closes and of valid-bar counts, one row longer than closes."""
+    valid = ~np.isnan(closes)
+    csum = np.zeros((closes.shape[0] + 1, closes.shape[1]))
+    ccount = np.zeros((closes.shape[0] + 1, closes.shape[1]), dtype=np.int64)
+    np.cumsum(np.where(valid, closes, 0.0), axis=0, out=csum[1:])
+    np.cumsum(valid, axis=0, out=ccount[1:])
+    return csum, ccount
+
+
+def _backfill(bar_store: BarStore, tickers: List[str], start: np.datetime64):
+    """Downloads history back to start for any symbol the store doesn't already cover."""
+    index_path = os.path.join(bar_store.root, BACKFILL_INDEX)
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+
+    missing = [t for t in tickers if t not in index or np.datetime64(index[t]) > start]
+    if not missing:
+        return
+
+    # Imported here so that simulations over an already-filled store never need yfinance
+    from .data.yfinance_provider import YFinanceDataProvider
+    provider = YFinanceDataProvider(bar_store=bar_store)
+
+    print(f"[SIMULATION] Backfilling {len(missing)} symbols from {start}...")
+    for chunk, frames in provider._download_chunks(missing, start=str(start)):
+        for ticker in chunk:
+            fetched = provider._extract_bars(frames, ticker)
+            stored = np.asarray(bar_store.read(ticker))
+            if len(fetched):
+                # The fresh download wins where it overlaps: it carries the latest adjustments
+                newer = stored[stored["date"] > fetched["date"][-1]]
+                bar_store.write(ticker, np.concatenate([fetched, newer]))
+            index[ticker] = str(start)
+
+    with open(index_path, 'w') as f:
+        json.dump(index, f)
+
+
+def load_panel(tickers: List[str], start: date, end: date, bar_store: Optional[BarStore] = None,
+               warmup_bars: int = 0) -> PricePanel:
+    """
+    Builds a PricePanel from the local bar store, backfilling older history once if the
+    store doesn't reach back far enough. warmup_bars of extra history before start are
+    included so indicators are defined from the first simulated day.
+    """
+    bar_store = bar_store or BarStore()
+    # ~1.5 calendar days per trading day, plus slack for holidays
+    first = np.datetime64(start, "D") - np.timedelta64(int(warmup_bars * 1.5) + 10, "D")
+    last = np.datetime64(end, "D")
+    _backfill(bar_store, tickers, first)
+
+    series = {}
+    for ticker in tickers:
+        bars = bar_store.read(ticker)
+        bars = bars[(bars["date"] >= first) & (bars["date"] <= last)]
+        if len(bars):
+            series[ticker] = bars
+
+    symbols = list(series)
+    dates = np.unique(np.concatenate([b["date"] for b in series.values()])) if series else np.empty(0, dtype="datetime64[D]")
+    closes = np.full((len(dates), len(symbols)), np.nan, dtype=np.float32)
+    for j, ticker in enumerate(symbols):
+        bars = series[ticker]
+        closes[np.searchsorted(dates, bars["date"]), j] = bars["adj_close"]
+    return PricePanel(dates=dates, symbols=symbols, closes=closes)
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.current: Optional[datetime] = None
+
+    def set_date(self, day: np.datetime64):
+        h, m = map(int, config.SCHEDULE_TIME.split(':'))
+        self.current = datetime.combine(pd.Timestamp(day).date(), dtime(h, m))
+
+    def now(self) -> datetime:
+        return self.current
+
+
+class MemoryTradeLogger:
+    """Drop-in for CSVLogger that keeps trades in memory, stamped with the simulated clock."""
+
+    def __init__(self, clock: SimulatedClock):
+        self.clock = clock
+        self.trades: List[Dict[str, Any]] = []
+
+    def log_trade(self, symbol: str, action: str, quantity: int, price: float, total_cost: float = None,
+                  order_id: Optional[str] = None):
+        if total_cost is None:
+            total_cost = quantity * price
+        now = self.clock.now()
+        self.trades.append({
+            "Date": now.strftime("%Y-%m-%d"),
+            "Time": now.strftime("%H:%M:%S"),
+            "Symbol": symbol,
+            "Action": action,
+            "Quantity": quantity,
+            "Price": price,
+            "Total Cost": total_cost,
+            "Order ID": order_id,
+        })
+
+    def log_screening_candidates(self, candidates: List[Any]):
+        pass
+
+
+class SimulatedDataProvider(IDataProvider):
+    """
+    Serves one panel row per simulated day. The DMA for every day is computed up front,
+    so each day's screen is a single O(universe) slice.
+    """
+
+    def __init__(self, panel: PricePanel, dma: np.ndarray):
+        self.panel = panel
+        self.dma = dma
+        self.symbols = np.asarray(panel.symbols, dtype=object)
+        self.t = 0
+
+    def set_day(self, t: int):
+        self.t = t
+
+    def get_nifty50_data(self, tickers: List[str], top_k: Optional[int] = None) -> ScreeningResult:
+        price = self.panel.closes[self.t].astype(np.float64)
+        dma = self.dma[self.t]
+        keep = np.isfinite(price) & np.isfinite(dma) & (dma != 0)
+        result = ScreeningResult(
+            symbols=self.symbols[keep],
+            current_price=price[keep],
+            dma_25=dma[keep],
+            percent_below_dma=(price[keep] - dma[keep]) / dma[keep]
+        )
+        if top_k is not None:
+            result = result.keep_top_below_dma(top_k)
+        return result
+
+
+@dataclass
+class SimulationResult:
+    equity: pd.DataFrame
+    trades: pd.DataFrame
+    elapsed: float
+    days: int
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        equity = self.equity["equity"].values
+        if len(equity) == 0:
+            return {"days": 0, "trades": 0}
+        peak = np.maximum.accumulate(equity)
+        years = max(self.days / 252.0, 1e-9)
+        start_value = equity[0]
+        return {
+            **self.params,
+            "days": self.days,
+            "trades": len(self.trades),
+            "final_equity": float(equity[-1]),
+            "total_return": float(equity[-1] / start_value - 1) if start_value else 0.0,
+            "cagr": float((equity[-1] / start_value) ** (1 / years) - 1) if start_value and equity[-1] > 0 else -1.0,
+            "max_drawdown": float(((equity - peak) / peak).min()) if (peak > 0).all() else -1.0,
+            "max_invested": float(self.equity["invested"].max()),
+        }
+
+
+class Simulator:
+    """
+    Drives the real NiftyShopStrategy day by day over a PricePanel, with MockBroker,
+    an in-memory StateManager and a simulated clock. The strategy's own rules (sell at
+    the profit target first, one action per day, averaging, capital limits) apply
+    unchanged. Nothing touches disk or the database until results are written out.
+    """
+
+    def __init__(self, panel: PricePanel, dma: Optional[np.ndarray] = None, verbose: bool = False):
+        self.panel = panel
+        self.dma = dma if dma is not None else rolling_dma(panel.closes, config.DMA_PERIOD)
+        self.verbose = verbose
+
+    def run(self, start: date, end: date, params: Optional[Dict[str, Any]] = None) -> SimulationResult:
+        t0 = time.perf_counter()
+        panel = self.panel
+        first = int(np.searchsorted(panel.dates, np.datetime64(start, "D")))
+        last = int(np.searchsorted(panel.dates, np.datetime64(end, "D"), side="right"))
+
+        clock = SimulatedClock()
+        logger = MemoryTradeLogger(clock)
+        broker = MockBroker()
+        state_manager = StateManager(filepath=None, logger=logger)
+        provider = SimulatedDataProvider(panel, self.dma)
+        # MockBroker answers from memory, so the account snapshot is fetched inline
+        strategy = NiftyShopStrategy(broker, provider, state_manager, universe=panel.symbols, concurrent_prefetch=False)
+        col = {s: j for j, s in enumerate(panel.symbols)}
+
+        rows = []
+        sink = sys.stdout if self.verbose else open(os.devnull, 'w')
+        try:
+            with redirect_stdout(sink):
+                for t in range(first, last):
+                    day = panel.dates[t]
+                    clock.set_date(day)
+                    state_manager.start_day(str(day))
+                    provider.set_day(t)
+
+                    # Mark existing holdings to today's close (suspended symbols keep their last price)
+                    prices = panel.closes[t]
+                    broker.update_prices({
+                        s: float(prices[col[s]]) for s in broker.holdings if not np.isnan(prices[col[s]])
+                    })
+
+                    strategy.run()
+
+                    holdings_value = sum(h.quantity * h.current_price for h in broker.holdings.values())
+                    invested = sum(h.quantity * h.average_price for h in broker.holdings.values())
+                    rows.append((day, broker.cash_balance + holdings_value, broker.cash_balance, holdings_value, invested))
+        finally:
+            if sink is not sys.stdout:
+                sink.close()
+
+        equity = pd.DataFrame(rows, columns=["date", "equity", "cash", "holdings_value", "invested"])
+        trades = pd.DataFrame(logger.trades, columns=TRADES_HEADER)
+        return SimulationResult(equity=equity, trades=trades, elapsed=time.perf_counter() - t0,
+                                days=last - first, params=params or {})
+
+
+def run_simulation(start: date, end: date, tickers: List[str], output_prefix: str = "simulation", verbose: bool = False) -> SimulationResult:
+    print(f"--- Simulation {start} -> {end} over {len(tickers)} symbols ---")
+    panel = load_panel(tickers, start, end, warmup_bars=config.DMA_PERIOD)
+    print(f"Loaded {len(panel.dates)} days x {len(panel.symbols)} symbols from the bar store.")
+
+    result = Simulator(panel, verbose=verbose).run(start, end)
+
+    equity_file = f"{output_prefix}_equity.csv"
+    trades_file = f"{output_prefix}_trades.csv"
+    result.equity.to_csv(equity_file, index=False)
+    result.trades.to_csv(trades_file, index=False)
+
+    summary = result.summary()
+    print(f"Simulated {result.days} days in {result.elapsed:.2f}s")
+    print(f"Trades: {summary.get('trades', 0)}, Final equity: {summary.get('final_equity', 0.0):.2f}, "
+          f"Return: {summary.get('total_return', 0.0) * 100:.2f}%, Max drawdown: {summary.get('max_drawdown', 0.0) * 100:.2f}%")
+    print(f"Equity curve -> {equity_file}, trade list -> {trades_file}")
+    return result
@@ -0,0 +1,95 @@
+import gzip
+import os
+import pickle
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def _download_key(tickers: List[str], kwargs: Dict[str, Any]) -> Tuple:
+    # Chunks download concurrently, so calls are matched by content rather than order
+    return tuple(sorted(tickers)), tuple(sorted((k, str(v)) for k, v in kwargs.items()))
+
+
+class Snapshot:
+    """
+    Everything a strategy run read from the outside world: the raw yfinance downloads,
+    the LTP lookups and the broker read calls, plus the wall-clock time of the run and
+    the bot's own state at its start (today's action count and capital use, and the
+    open positions of the ledger; see StateManager.export()). Saved as a gzipped
+    pickle so a run can be replayed offline, byte for byte.
+    """
+
+    def __init__(self, path: str, recorded_at: Optional[datetime] = None):
+        self.path = path
+        self.recorded_at = recorded_at or datetime.now(IST)
+        self.downloads: Dict[Tuple, Any] = {}
+        self.quotes: Dict[str, Optional[float]] = {}
+        self.broker_calls: Dict[str, List[Any]] = {}
+        self.state: Optional[Dict[str, Any]] = None
+        self._replay_pos: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Snapshot":
+        with gzip.open(path, 'rb') as f:
+            data = pickle.load(f)
+        snapshot = cls(path, recorded_at=data["recorded_at"])
+        snapshot.downloads = data["downloads"]
+        snapshot.quotes = data["quotes"]
+        snapshot.broker_calls = data["broker_calls"]
+        snapshot.state = data.get("state")
+        return snapshot
+
+    def save(self):
+        data = {
+            "recorded_at": self.recorded_at,
+            "downloads": self.downloads,
+            "quotes": self.quotes,
+            "broker_calls": self.broker_calls,
+            "state": self.state,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        print(f"[SNAPSHOT] Saved {len(self.downloads)} downloads, {len(self.quotes)} quotes, "
+              f"{sum(len(v) for v in self.broker_calls.values())} broker calls to {self.path}")
+
+    # --- yfinance ---
+
+    def record_download(self, tickers: List[str], kwargs: Dict[str, Any], frame: Any):
+        with self._lock:
+            self.downloads[_download_key(tickers, kwargs)] = frame
+
+    def replay_download(self, tickers: List[str], kwargs: Dict[str, Any]) -> Any:
+        key = _download_key(tickers, kwargs)
+        if key not in self.downloads:
+            raise KeyError(f"Snapshot has no download for {len(tickers)} tickers with {dict(key[1])}")
+        return self.downloads[key]
+
+    def record_quote(self, symbol: str, price: Optional[float]):
+        with self._lock:
+            self.quotes[symbol] = price
+
+    def replay_quote(self, symbol: str) -> Optional[float]:
+        return self.quotes.get(symbol)
+
+    # --- broker ---
+
+    def record_call(self, method: str, result: Any):
+        with self._lock:
+            self.broker_calls.setdefault(method, []).append(result)
+
+    def replay_call(self, method: str) -> Any:
+        """Returns recorded results in call order; extra calls keep getting the last one."""
+        with self._lock:
+            results = self.broker_calls.get(method)
+            if not results:
+                raise KeyError(f"Snapshot has no recorded {method}() call")
+            pos = self._replay_pos.get(method, 0)
+            self._replay_pos[method] = pos + 1
+            return results[min(pos, len(results) - 1)]
@@ -0,0 +1,207 @@
+import atexit
+import json
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+from .config import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in this process are serialized
+    fcntl = None
+
+# Journals with possibly unsynced appends get an fsync when the process exits
+_open_journals: "weakref.WeakSet[StateJournal]" = weakref.WeakSet()
+
+
+@atexit.register
+def _sync_all():
+    for journal in list(_open_journals):
+        journal.sync()
+
+
+class StateJournal:
+    """
+    Append-only journal of state changes next to a JSON snapshot of the state.
+
+    Each change is one JSON line appended to <snapshot>.journal, so recording an action
+    costs the same however long the day's log has grown. Lines are flushed to the OS
+    straight away (a crashed process loses nothing) and fsynced in batches: the first
+    append after a sync schedules one fsync STATE_FSYNC_SECONDS later for everything
+    appended until then. Compaction writes the full state to the snapshot atomically
+    (temp file, fsync, rename) and starts an empty journal. Recovery is the snapshot
+    plus a replay of the journal; a torn last line from a crash mid-append is dropped.
+
+    Several journals may be open on the same files (e.g. the intraday monitor and the
+    daily run in one process, or two processes): appends and compaction take a lock
+    file, and read_new() picks up what the others appended.
+    """
+
+    def __init__(self, snapshot_path: str, fsync_seconds: Optional[float] = None):
+        self.snapshot_path = snapshot_path
+        self.path = f"{snapshot_path}.journal"
+        self.fsync_seconds = config.STATE_FSYNC_SECONDS if fsync_seconds is None else fsync_seconds
+        self.entries = 0  # Lines in the current journal file
+        self._file = None
+        self._ino: Optional[int] = None
+        self._offset = 0
+        self._thread_lock = threading.RLock()
+        self._sync_timer: Optional[threading.Timer] = None
+        self._lock_depth = 0
+        _open_journals.add(self)
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            # Re-entrant: a second flock on a new descriptor would wait on ourselves
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(f"{self.snapshot_path}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+
+    def _current_ino(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _open(self):
+        """The journal file for appending; reopened when a compaction has replaced it."""
+        ino = self._current_ino()
+        if self._file is None or ino is None or ino != self._ino:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.path, 'ab')
+            self._ino = os.fstat(self._file.fileno()).st_ino
+        return self._file
+
+    def _read_from(self, offset: int) -> Tuple[List[dict], int]:
+        """Complete lines from offset on; a partial last line is left for later (or dropped on load)."""
+        entries = []
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return entries, 0
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                print(f"[STATE] Skipping unreadable journal line in {self.path}")
+        return entries, offset + end
+
+    def load(self) -> Tuple[Optional[dict], List[dict]]:
+        """(snapshot, journal entries since it) for recovery. The snapshot is None if missing or unreadable."""
+        with self._locked():
+            snapshot = None
+            if os.path.exists(self.snapshot_path):
+                try:
+                    with open(self.snapshot_path, 'r') as f:
+                        snapshot = json.load(f)
+                except Exception as e:
+                    print(f"Error loading state snapshot: {e}. Replaying the journal only.")
+            entries, end = self._read_from(0)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > end:
+                # Torn write from a crash mid-append; cut it off so new lines start clean
+                print(f"[STATE] Dropping a partial journal line in {self.path}")
+                with open(self.path, 'r+b') as f:
+                    f.truncate(end)
+            self._ino = self._current_ino()
+            self._offset = end
+            self.entries = len(entries)
+            return snapshot, entries
+
+    def read_new(self) -> Optional[List[dict]]:
+        """Entries appended (by anyone) since the last load/read, or None if the journal was compacted meanwhile."""
+        with self._thread_lock:
+            if self._current_ino() != self._ino:
+                return None
+            entries, self._offset = self._read_from(self._offset)
+            self.entries += len(entries)
+            return entries
+
+    def append(self, entry: dict) -> Optional[List[dict]]:
+        """
+        Appends entry. Returns what other writers appended before it (as read_new()
+        would), so the caller can apply those too; our own entry is already applied.
+        """
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+        with self._locked():
+            others = self.read_new()
+            f = self._open()
+            f.write(line)
+            f.flush()
+            self._ino = os.fstat(f.fileno()).st_ino
+            self._offset = f.tell()
+            self.entries += 1
+            if self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.fsync_seconds, self.sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+            return others
+
+    def sync(self):
+        """fsyncs everything appended so far."""
+        with self._thread_lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def compact(self, snapshot: Callable[[List[dict]], dict]):
+        """
+        Replaces snapshot + journal with a new snapshot and an empty journal. snapshot()
+        receives what read_new() returns at that point (entries other writers appended,
+        or None if one of them compacted) and returns the full state to write, so nothing
+        journaled is lost. It runs under the journal lock and may call load().
+        """
+        with self._locked():
+            data = snapshot(self.read_new())
+
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            # Then a fresh journal; until this rename, replaying the old one is harmless
+            # because entries already in the snapshot are skipped by id
+            tmp_journal = f"{self.path}.tmp"
+            open(tmp_journal, 'wb').close()
+            os.replace(tmp_journal, self.path)
+            self._fsync_dir()
+
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._ino = self._current_ino()
+            self._offset = 0
+            self.entries = 0
+
+    def _fsync_dir(self):
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.snapshot_path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
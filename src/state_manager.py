@@ -1,12 +1,18 @@
-import json
-import os
+import threading
+import uuid
 from datetime import datetime
-from dataclasses import dataclass, asdict
-from typing import Dict, List
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
 from .config import config
+from .state_journal import StateJournal
+from .position_ledger import LEDGER_FILE, PositionLedger
+from .open_orders import OPEN_ORDERS_FILE, OpenOrder, OpenOrderBook
 
 STATE_FILE = "strategy_state.json"
 
+# Journal message for a settled order, by action
+FILLED = {"BUY": "Bought", "AVERAGE": "Averaged", "SELL": "Sold"}
+
 @dataclass
 class DailyState:
     date: str
@@ -14,33 +20,79 @@ class DailyState:
     used_avg_capital: float
     orders_placed_count: int
     actions_log: List[str]
+    # Highest journal sequence number counted in per writer, so a replay never applies an entry twice
+    applied: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DailyState":
+        """Reads a saved state, including ones that listed every applied entry's id."""
+        data = dict(data)
+        applied = dict(data.pop("applied", None) or {})
+        applied.update({entry_id: 1 for entry_id in data.pop("journal_ids", None) or ()})
+        return cls(**data, applied=applied)
 
 from .csv_logger import CSVLogger
 
 class StateManager:
-    def __init__(self, filepath: str = STATE_FILE):
+    """
+    Today's capital usage and action count. Changes are appended to a journal
+    (see src/state_journal.py) instead of rewriting the state file; the file is a
+    snapshot the journal is compacted into every STATE_COMPACT_EVERY entries.
+    """
+
+    def __init__(self, filepath: Optional[str] = STATE_FILE, logger=None):
+        # filepath=None keeps the state in memory only (used by simulations)
         self.filepath = filepath
+        self.journal = StateJournal(filepath) if filepath else None
+        # This manager's journal entries are numbered 1, 2, ... under its own writer id
+        self.writer = uuid.uuid4().hex
+        self._seq = 0
+        self._record_lock = threading.Lock()
         self.state = self._load_state()
-        self.logger = CSVLogger()
+        self.logger = logger or CSVLogger()
+        # The bot's own positions; built once from the trade history if missing
+        self.ledger = PositionLedger.open(LEDGER_FILE if filepath else None,
+                                          trades_file=getattr(self.logger, "trades_file", None))
+        # Placed orders not settled yet; they already count toward their day's limits
+        self.open_orders = OpenOrderBook(OPEN_ORDERS_FILE if filepath else None)
+
+    @classmethod
+    def in_memory(cls, exported: Optional[dict], logger) -> "StateManager":
+        """A StateManager that touches no files, seeded from export() (e.g. a replay snapshot's)."""
+        manager = cls(filepath=None, logger=logger)
+        if exported:
+            manager.state = DailyState.from_dict(exported["daily"])
+            manager.ledger.restore(exported["positions"])
+        return manager
+
+    def export(self) -> dict:
+        """Today's state and the bot's open positions, as plain data."""
+        self.refresh()
+        return {"daily": asdict(self.state), "positions": self.ledger.export()}
 
     def _load_state(self) -> DailyState:
         today_str = datetime.now().strftime("%Y-%m-%d")
-        
-        if os.path.exists(self.filepath):
+        if not self.journal:
+            return self._create_new_state(today_str)
+
+        snapshot, entries = self.journal.load()
+        state = self._create_new_state(today_str)
+        # Reset state if it's a new day
+        if snapshot and snapshot.get('date') == today_str:
             try:
-                with open(self.filepath, 'r') as f:
-                    data = json.load(f)
-                    
-                # Reset state if it's a new day
-                if data.get('date') != today_str:
-                    return self._create_new_state(today_str)
-                
-                return DailyState(**data)
+                state = DailyState.from_dict(snapshot)
             except Exception as e:
                 print(f"Error loading state: {e}. creating new state.")
-                return self._create_new_state(today_str)
-        else:
-            return self._create_new_state(today_str)
+
+        replayed = sum(self._apply(state, entry) for entry in entries)
+        if replayed:
+            print(f"[STATE] Replayed {replayed} journaled actions for {today_str}.")
+        if entries and (self.journal.entries >= config.STATE_COMPACT_EVERY
+                        or any(e.get("date") != today_str for e in entries)):
+            # Earlier days' entries are of no use any more
+            self.state = state
+            self.save_state()
+        return state
 
     def _create_new_state(self, date_str: str) -> DailyState:
         return DailyState(
@@ -51,15 +103,74 @@ class StateManager:
             actions_log=[]
         )
 
+    def _apply(self, state: DailyState, entry: dict) -> bool:
+        """Applies one journal entry to state. Entries for other days or already applied are skipped."""
+        # Entries journaled before sequence numbers carry a one-off id instead
+        writer, seq = entry.get("writer", entry.get("id")), entry.get("seq", 1)
+        if entry.get("date") != state.date or seq <= state.applied.get(writer, 0):
+            return False
+        state.used_new_capital += entry.get("new_capital", 0.0)
+        state.used_avg_capital += entry.get("avg_capital", 0.0)
+        state.orders_placed_count += entry.get("orders", 0)
+        state.actions_log.append(entry.get("message", ""))
+        state.applied[writer] = seq
+        return True
+
+    def _apply_all(self, entries: Optional[List[dict]]):
+        if entries is None:
+            # Another writer compacted the journal; its snapshot has everything
+            self.state = self._load_state()
+            return
+        for entry in entries:
+            self._apply(self.state, entry)
+
+    def refresh(self):
+        """Picks up actions recorded meanwhile by other StateManagers on the same file (e.g. the intraday monitor)."""
+        if self.journal:
+            self._apply_all(self.journal.read_new())
+
+    def start_day(self, date_str: str):
+        """Rolls the daily limits over to date_str. Lets a simulated clock drive the day boundary."""
+        if self.state.date != date_str:
+            self.state = self._create_new_state(date_str)
+
     def save_state(self):
-        with open(self.filepath, 'w') as f:
-            json.dump(asdict(self.state), f, indent=4)
+        """Compacts the journal: writes the whole state as the new snapshot and starts an empty journal."""
+        if not self.journal:
+            return
 
-    def _daily_limit_reached(self) -> bool:
+        def snapshot(pending: Optional[List[dict]]) -> dict:
+            self._apply_all(pending)
+            return asdict(self.state)
+        self.journal.compact(snapshot)
+
+    def _record(self, message: str, new_capital: float = 0.0, avg_capital: float = 0.0, orders: int = 1):
+        # Fills are recorded from the broker's tracking threads; entries must reach the journal in seq order
+        with self._record_lock:
+            self._seq += 1
+            entry = {
+                "writer": self.writer,
+                "seq": self._seq,
+                "date": self.state.date,
+                "new_capital": new_capital,
+                "avg_capital": avg_capital,
+                "orders": orders,
+                "message": message,
+            }
+            self._apply(self.state, entry)
+            if not self.journal:
+                return
+            self._apply_all(self.journal.append(entry))
+            if self.journal.entries >= config.STATE_COMPACT_EVERY:
+                self.save_state()
+
+    def daily_limit_reached(self) -> bool:
+        """True once today's action (buy, average or sell) has been recorded."""
+        self.refresh()
         return self.state.orders_placed_count >= config.MAX_NEW_ORDERS_PER_DAY
 
     def can_place_new_order(self, estimated_cost: float) -> bool:
-        if self._daily_limit_reached():
+        if self.daily_limit_reached():
              return False
         
         if (self.state.used_new_capital + estimated_cost) > config.NEW_ORDER_CAPITAL_LIMIT:
@@ -68,33 +179,70 @@ class StateManager:
         return True
 
     def can_average(self, estimated_cost: float) -> bool:
-        if self._daily_limit_reached():
+        if self.daily_limit_reached():
              return False
 
         if (self.state.used_avg_capital + estimated_cost) > config.AVERAGING_CAPITAL_LIMIT:
             return False
         return True
 
-    def record_new_order(self, symbol: str, quantity: int, price: float, cost: float, message: str):
-        self.state.used_new_capital += cost
-        self.state.orders_placed_count += 1
-        self.state.actions_log.append(message)
-        self.save_state()
-        self.logger.log_trade(symbol, "BUY", quantity, price)
+    @staticmethod
+    def _capital(action: str, amount: float) -> dict:
+        """_record() keyword for the capital limit action draws on (sells draw on none)."""
+        return {"BUY": {"new_capital": amount}, "AVERAGE": {"avg_capital": amount}}.get(action, {})
+
+    def record_order_placed(self, action: str, symbol: str, order_id: str, quantity: int, price: float):
+        """
+        Journals an action the moment its order is placed, at its estimated cost, so it
+        counts toward today's action and capital limits while the order is open.
+        record_order_filled() settles it once the broker reports the fill.
+        """
+        self._record(f"Placed {action} {symbol}: {quantity} @ {price} (order {order_id})",
+                     **self._capital(action, quantity * price))
+        self.open_orders.add(OpenOrder(order_id, symbol, action, quantity, price, self.state.date,
+                                       datetime.now().isoformat(timespec="seconds")))
+
+    def record_order_filled(self, order_id: str, quantity: int, price: float) -> bool:
+        """
+        Settles an order from record_order_placed() with the broker's final fill: the
+        reserved capital is corrected to the actual cost and the trade goes to the ledger
+        and the trade log. With nothing filled, the action and its capital are released.
+        False if the order wasn't open (already settled) or nothing was filled.
+        """
+        order = self.open_orders.pop(order_id)
+        if order is None:
+            return False
+        # Corrections only apply to the day the order counted toward
+        same_day = order.date == self.state.date
+        if quantity <= 0:
+            if same_day:
+                self._record(f"{order.action} {order.symbol} order {order_id} not filled; released",
+                             orders=-1, **self._capital(order.action, -order.reserved))
+            return False
+        if same_day:
+            self._record(f"{FILLED[order.action]} {order.symbol}: {quantity} @ {price} (order {order_id})",
+                         orders=0, **self._capital(order.action, quantity * price - order.reserved))
+        self.ledger.record(order.symbol, order.action, quantity, price)
+        self.logger.log_trade(order.symbol, order.action, quantity, price, order_id=order_id)
+        return True
+
+    def record_new_order(self, symbol: str, quantity: int, price: float, cost: float, message: str,
+                         order_id: Optional[str] = None):
+        self._record(message, new_capital=cost)
+        self.ledger.record(symbol, "BUY", quantity, price)
+        self.logger.log_trade(symbol, "BUY", quantity, price, order_id=order_id)
 
-    def record_averaging(self, symbol: str, quantity: int, price: float, cost: float, message: str):
-        self.state.used_avg_capital += cost
+    def record_averaging(self, symbol: str, quantity: int, price: float, cost: float, message: str,
+                         order_id: Optional[str] = None):
         # "only one action per day"
-        self.state.orders_placed_count += 1 
-        self.state.actions_log.append(message)
-        self.save_state()
-        self.logger.log_trade(symbol, "AVERAGE", quantity, price)
+        self._record(message, avg_capital=cost)
+        self.ledger.record(symbol, "AVERAGE", quantity, price)
+        self.logger.log_trade(symbol, "AVERAGE", quantity, price, order_id=order_id)
     
-    def record_sell(self, symbol: str, quantity: int, price: float, revenue: float, message: str):
+    def record_sell(self, symbol: str, quantity: int, price: float, revenue: float, message: str,
+                    order_id: Optional[str] = None):
         """Record a sell transaction"""
         # "only one action per day"
-        self.state.orders_placed_count += 1
-        self.state.actions_log.append(message)
-        self.save_state()
-        self.logger.log_trade(symbol, "SELL", quantity, price, total_cost=revenue)
-
+        self._record(message)
+        self.ledger.record(symbol, "SELL", quantity, price)
+        self.logger.log_trade(symbol, "SELL", quantity, price, total_cost=revenue, order_id=order_id)
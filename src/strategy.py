@@ -1,55 +1,207 @@
-from typing import List, Optional
-from .interfaces import IBroker, IDataProvider, StockData, Holding
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Callable, List, Optional, Set, Tuple
+from .interfaces import IBroker, IDataProvider, StockData, Holding, OrderResult
 from .config import config
-from .constants import NIFTY_50_TICKERS
 from .state_manager import StateManager
+from .universe import load_universe
+from .tracing import RunTrace, Traced, span
+from .account_snapshot import AccountSnapshot
+
+# Order ids whose fill some strategy in this process is already waiting for
+_tracked_orders: Set[str] = set()
+_tracked_lock = threading.Lock()
 
 class NiftyShopStrategy:
-    def __init__(self, broker: IBroker, data_provider: IDataProvider, state_manager: StateManager, dry_run: bool = False):
-        self.broker = broker
-        self.data_provider = data_provider
+    def __init__(self, broker: IBroker, data_provider: IDataProvider, state_manager: StateManager, dry_run: bool = False,
+                 universe: Optional[List[str]] = None, concurrent_prefetch: bool = True):
+        # Every broker/provider call is timed into the active run trace
+        self.broker = Traced(broker, "broker")
+        self.data_provider = Traced(data_provider, "provider")
         self.state_manager = state_manager
         self.dry_run = dry_run
+        self.universe = universe if universe is not None else load_universe()
+        self.trace = RunTrace(dry_run=dry_run)
+        self.pending_fills: List[Tuple[OrderResult, Future]] = []
+        self.account: Optional[AccountSnapshot] = None
+        self.concurrent_prefetch = concurrent_prefetch
+        self.prepared = False
+        self.triggered_at = time.perf_counter()
+
+    def prepare(self):
+        """
+        Warm-up phase, run ahead of the trigger: syncs history and DMA bases for the
+        universe, loads the broker's instrument lookups and fetches the account snapshot.
+        The next run() then only needs fresh prices before ordering.
+        """
+        t0 = time.perf_counter()
+        bot_managed_symbols = self._get_bot_managed_symbols()
+        self.data_provider.prepare(self.universe)
+        self.broker.prepare(sorted(set(self.universe) | bot_managed_symbols))
+        self.account = AccountSnapshot.fetch(self.broker, concurrent=self.concurrent_prefetch)
+        self.prepared = True
+        print(f"[WARM-UP] Ready in {time.perf_counter() - t0:.1f}s: {len(self.universe)} symbols, "
+              f"{len(self.account.holdings)} holdings, margin {self.account.margin:.2f}")
+
+    def run(self, trace: Optional[RunTrace] = None, triggered_at: Optional[float] = None) -> RunTrace:
+        """
+        Runs the strategy once. Stage timings and the decision taken are collected in the
+        returned trace. triggered_at (a time.perf_counter() value, default now) is where
+        the trigger-to-order-ack latency is measured from.
+        """
+        return self._traced(self._run, trace, triggered_at)
+
+    def on_trigger(self, kind: str, symbol: str, price: float, trace: Optional[RunTrace] = None,
+                   triggered_at: Optional[float] = None) -> RunTrace:
+        """
+        Acts on one intraday trigger (see src/intraday_monitor.py): kind is "sell" or
+        "average", price the update that crossed it. The holding is re-checked against
+        a fresh account snapshot, and the one-action-per-day limit applies as in run().
+        """
+        return self._traced(lambda: self._act_on_trigger(kind, symbol, price), trace, triggered_at)
+
+    def _traced(self, body: Callable[[], None], trace: Optional[RunTrace], triggered_at: Optional[float]) -> RunTrace:
+        self.triggered_at = triggered_at if triggered_at is not None else time.perf_counter()
+        self.trace = trace or RunTrace(dry_run=self.dry_run)
+        with self.trace.activate():
+            try:
+                body()
+            except Exception as e:
+                self.trace.error = str(e)
+                raise
+            finally:
+                self.trace.finish()
+        print(self.trace.summary())
+        return self.trace
+
+    def _decide(self, decision: str):
+        self.trace.decision = decision
+
+    def _order_acknowledged(self, order: OrderResult):
+        ack_ms = (time.perf_counter() - self.triggered_at) * 1000.0
+        self.trace.add("trigger_to_ack", ack_ms)
+        print(f"[TRIGGER] {order.symbol} order {order.order_id} acknowledged {ack_ms:.0f}ms after trigger.")
+
+    def _record_on_fill(self, order: OrderResult, action: str, symbol: str, quantity: int, estimated_price: float):
+        """
+        Records an order in two steps. Placing it journals the action at once, at its
+        estimated cost, so it counts toward the daily limits while open (and stays in the
+        open-order book across restarts). The broker's confirmed fill then settles
+        quantity and price and writes the trade, on the broker's tracking thread, so the
+        run never waits on the exchange. Rejected or cancelled orders with nothing filled
+        release the action again.
+        """
+        self.state_manager.record_order_placed(action, symbol, order.order_id, quantity, estimated_price)
+        self._settle_on_fill(order, estimated_price)
+
+    def _settle_on_fill(self, order: OrderResult, estimated_price: float):
+        with _tracked_lock:
+            if order.order_id in _tracked_orders:
+                return
+            _tracked_orders.add(order.order_id)
+        # Done once the fill is recorded, not just reported (wait_for_fills waits on it)
+        recorded: Future = Future()
+
+        def on_fill(future: Future):
+            try:
+                fill = future.result()
+                if fill.quantity <= 0:
+                    print(f"[FILLS] {fill.symbol} order {fill.order_id} {fill.status} with nothing filled. Released.")
+                self.state_manager.record_order_filled(order.order_id, fill.quantity,
+                                                       fill.average_price or estimated_price)
+            except Exception as e:
+                print(f"CRITICAL ERROR: Failed to record fill for {order.symbol} (order {order.order_id}): {e}")
+            finally:
+                with _tracked_lock:
+                    _tracked_orders.discard(order.order_id)
+                recorded.set_result(None)
+
+        self.pending_fills.append((order, recorded))
+        self.broker.confirm_fill(order).add_done_callback(on_fill)
+
+    def resume_open_orders(self) -> int:
+        """
+        Tracks orders an earlier run placed but never saw settle (see StateManager.open_orders)
+        until the broker reports them final, then records them as usual. Orders this
+        process is already tracking are left alone. Returns how many were resumed.
+        """
+        resumed = 0
+        for open_order in self.state_manager.open_orders.all():
+            if open_order.order_id in _tracked_orders:
+                continue
+            print(f"[FILLS] Reconciling {open_order.action} {open_order.symbol} order {open_order.order_id} "
+                  f"placed {open_order.placed_at} with the broker.")
+            order = OrderResult(order_id=open_order.order_id, status="OPEN", average_price=open_order.price,
+                                quantity=open_order.quantity, symbol=open_order.symbol)
+            self._settle_on_fill(order, open_order.price)
+            resumed += 1
+        return resumed
+
+    def wait_for_fills(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every order placed so far is confirmed and recorded. Call before exiting."""
+        _, not_done = wait([f for _, f in self.pending_fills], timeout=timeout)
+        return not not_done
+
+    def unconfirmed_orders(self) -> List[OrderResult]:
+        """Orders placed (or resumed) by this strategy that the broker hasn't reported final yet."""
+        return [order for order, future in self.pending_fills if not future.done()]
 
-    def run(self):
+    def _run(self):
         print(f"--- Strategy Run Started ---")
+
+        # An intraday trigger may already have used today's action
+        if self.state_manager.daily_limit_reached():
+            print("Today's action has already been taken (one action per day). Nothing to do.")
+            self._decide("NONE: daily action already taken")
+            return
         
+        # Holdings, margin, positions and quotes for the bot's symbols, fetched concurrently.
+        # Every decision below works from this one snapshot.
+        bot_managed_symbols = self._get_bot_managed_symbols()
+        with span("account_snapshot"):
+            if self.prepared:
+                # Warmed up: the account is already known, only its prices need refreshing
+                t0 = time.perf_counter()
+                held = [h.symbol for h in self.account.holdings if h.symbol in bot_managed_symbols]
+                quotes = self.broker.get_ltp(held) if held else {}
+                self.account = self.account.repriced(quotes, elapsed=time.perf_counter() - t0)
+                self.prepared = False
+            else:
+                self.account = AccountSnapshot.fetch(self.broker, concurrent=self.concurrent_prefetch)
+
         # 0. Check for sell opportunities FIRST
-        holdings = self.broker.get_holdings()
+        holdings = list(self.account.holdings)
         if holdings:
             print(f"Checking {len(holdings)} holdings for sell opportunities...")
-            sell_executed = self._check_and_execute_sells(holdings)
+            with span("sell_check"):
+                sell_executed = self._check_and_execute_sells(holdings, bot_managed_symbols)
             
             if sell_executed:
                 print("Sell order executed. Skipping buy/averaging for today (one action per day).")
                 return
         
         # 1. Screen Stocks
-        print("Fetching Nifty 50 Data...")
-        stock_data_map = self.data_provider.get_nifty50_data(NIFTY_50_TICKERS)
-        
-        # Filter stocks fallen below 25 DMA
-        candidates = []
-        for symbol, data in stock_data_map.items():
-            if data.percent_below_dma < 0: # Fallen below
-                 candidates.append(data)
+        print(f"Fetching data for {len(self.universe)} stocks ({config.UNIVERSE})...")
+        # Provider streams the universe in chunks and only keeps the running top 5
+        with span("screening"):
+            screen = self.data_provider.get_nifty50_data(self.universe, top_k=5)
         
-        # Sort by fell the hardest (most negative percent_below_dma)
-        candidates.sort(key=lambda x: x.percent_below_dma)
-        
-        # Take Top 5
-        top_5 = candidates[:5]
+            # Stocks fallen below 25 DMA, the ones that fell the hardest first.
+            # Partial selection: only the top 5 are ever ordered.
+            top_5 = screen.top_below_dma(5)
         print(f"Top 5 candidates: {[c.symbol for c in top_5]}")
 
         # Log screening results
-        self.state_manager.logger.log_screening_candidates(top_5)
+        with span("log_screening"):
+            self.state_manager.logger.log_screening_candidates(top_5)
         
         if not top_5:
             print("No stocks found below 25 DMA.")
+            self._decide("NONE: no stocks below DMA")
             return
 
         # 2. Check Holdings
-        holdings = self.broker.get_holdings()
         holdings_map = {h.symbol: h for h in holdings}
         
         holdings_symbols = set(holdings_map.keys())
@@ -96,6 +248,40 @@ class NiftyShopStrategy:
                 self._execute_buy(target, is_averaging=True)
             else:
                 print("No holdings suitable for averaging (none dropped > 10%).")
+                self._decide("NONE: no averaging candidates")
+
+    def _act_on_trigger(self, kind: str, symbol: str, price: float):
+        print(f"--- Intraday Trigger: {kind.upper()} {symbol} @ {price:.2f} ---")
+        if self.state_manager.daily_limit_reached():
+            print("Today's action has already been taken (one action per day). Ignoring trigger.")
+            self._decide("NONE: daily action already taken")
+            return
+
+        # The monitor's broker lives all session; its cached account may be hours old
+        invalidate = getattr(self.broker, "invalidate", None)
+        if invalidate:
+            invalidate()
+        with span("account_snapshot"):
+            self.account = AccountSnapshot.fetch(self.broker, concurrent=self.concurrent_prefetch)
+        holding = self.account.holding(symbol)
+        if holding is None or symbol not in self._get_bot_managed_symbols():
+            print(f"{symbol} is no longer a bot-managed holding. Ignoring trigger.")
+            self._decide(f"NONE: {symbol} not held")
+            return
+        holding = Holding(holding.symbol, holding.quantity, holding.average_price, price)
+
+        change = (price - holding.average_price) / holding.average_price
+        if kind == "sell" and change >= config.SELL_PROFIT_THRESHOLD:
+            print(f"Selected for SELL: {symbol} (Profit: {change*100:.2f}%)")
+            self._execute_sell(holding)
+        elif kind == "average" and change < -config.HOLDING_DROP_THRESHOLD:
+            print(f"Selected for AVERAGING: {symbol} (Change: {change*100:.2f}%)")
+            self._execute_buy(StockData(symbol=symbol, current_price=price, dma_25=float("nan"),
+                                        percent_below_dma=float("nan")), is_averaging=True)
+        else:
+            # The position changed since the trigger prices were computed
+            print(f"{symbol} no longer meets the {kind} rule at {price:.2f} (Change: {change*100:.2f}%).")
+            self._decide(f"NONE: {symbol} {kind} trigger stale")
 
     def _execute_buy(self, stock: StockData, is_averaging: bool):
         # Calculate quantity
@@ -107,6 +293,7 @@ class NiftyShopStrategy:
         
         if estimated_qty <= 0:
             print(f"Price {stock.current_price} too high for allocation {amount}.")
+            self._decide(f"SKIP {stock.symbol}: price above allocation")
             return
 
         cost = estimated_qty * stock.current_price
@@ -117,26 +304,26 @@ class NiftyShopStrategy:
                 
                 if self.dry_run:
                     print(f"[DRY RUN] Would place BUY order: {stock.symbol}, Qty: {estimated_qty} @ {stock.current_price}")
+                    self._decide(f"DRY RUN AVERAGE {stock.symbol} x{estimated_qty}")
                 else:
-                    # Margin Check
-                    available_margin = self.broker.get_available_margin()
+                    # Margin Check (from the run's account snapshot)
+                    available_margin = self.account.margin
                     if available_margin < cost:
                         print(f"CRITICAL: Insufficient funds. Required: {cost}, Available: {available_margin}. Skipping {stock.symbol}.")
+                        self._decide(f"SKIP {stock.symbol}: insufficient margin")
                         return
 
                     try:
-                        self.broker.place_buy_order(stock.symbol, estimated_qty, stock.current_price)
-                        self.state_manager.record_averaging(
-                            symbol=stock.symbol,
-                            quantity=estimated_qty,
-                            price=stock.current_price,
-                            cost=cost,
-                            message=f"Averaged {stock.symbol}: {estimated_qty} @ {stock.current_price}"
-                        )
+                        order = self.broker.place_buy_order(stock.symbol, estimated_qty, stock.current_price)
+                        self._order_acknowledged(order)
+                        self._record_on_fill(order, "AVERAGE", stock.symbol, estimated_qty, stock.current_price)
+                        self._decide(f"AVERAGE {stock.symbol} x{estimated_qty}")
                     except Exception as e:
                         print(f"CRITICAL ERROR: Failed to average {stock.symbol}: {e}")
+                        self._decide(f"FAILED AVERAGE {stock.symbol}")
             else:
                 print("Averaging capital limit reached. Skipping.")
+                self._decide("SKIP: averaging capital limit")
         else:
             # New Buy
             if self.state_manager.can_place_new_order(cost):
@@ -144,70 +331,40 @@ class NiftyShopStrategy:
                 
                 if self.dry_run:
                      print(f"[DRY RUN] Would place BUY order: {stock.symbol}, Qty: {estimated_qty} @ {stock.current_price}")
+                     self._decide(f"DRY RUN BUY {stock.symbol} x{estimated_qty}")
                 else:
-                    # Margin Check
-                    available_margin = self.broker.get_available_margin()
+                    # Margin Check (from the run's account snapshot)
+                    available_margin = self.account.margin
                     if available_margin < cost:
                         print(f"CRITICAL: Insufficient funds. Required: {cost}, Available: {available_margin}. Skipping {stock.symbol}.")
+                        self._decide(f"SKIP {stock.symbol}: insufficient margin")
                         return
 
                     try:
-                        self.broker.place_buy_order(stock.symbol, estimated_qty, stock.current_price)
-                        self.state_manager.record_new_order(
-                            symbol=stock.symbol,
-                            quantity=estimated_qty,
-                            price=stock.current_price,
-                            cost=cost,
-                            message=f"Bought {stock.symbol}: {estimated_qty} @ {stock.current_price}"
-                        )
+                        order = self.broker.place_buy_order(stock.symbol, estimated_qty, stock.current_price)
+                        self._order_acknowledged(order)
+                        self._record_on_fill(order, "BUY", stock.symbol, estimated_qty, stock.current_price)
+                        self._decide(f"BUY {stock.symbol} x{estimated_qty}")
                     except Exception as e:
                         print(f"CRITICAL ERROR: Failed to buy {stock.symbol}: {e}")
+                        self._decide(f"FAILED BUY {stock.symbol}")
             else:
                 print("New Order capital limit reached or Max Daily Orders reached. Skipping.")
+                self._decide("SKIP: new order capital limit")
     
     def _get_bot_managed_symbols(self) -> set:
         """
-        Get a set of symbols that have been bought by the bot.
+        Get a set of symbols the bot currently holds a position in.
         """
-        # We can get this from the state manager's logger (CSV) or directly from DB if available.
-        # Since CSVLogger reads from CSV, let's essentially read the trades.csv
-        # or we can query the database passed to the API.
-        
-        # Ideally, we should access the database. But Strategy takes StateManager.
-        # Let's rely on reading trades.csv for now as it's the source of truth for the bot's actions in this architecture,
-        # or we can query the database via a new provider if we want to be strict.
-        # Given the imports, let's use the DB session if possible or just parse the CSV/State.
-        
-        # Actually, simpler: The StateManager or its Logger should provide this.
-        # Let's check StateManager.logger... it is CSVLogger. 
-        # Let's read the trades.csv file directly here or add a method to CSVLogger.
-        
-        # Let's just read the file for simplicity and robustness
-        import pandas as pd
-        import os
-        
-        trades_file = "trades.csv"
-        if not os.path.exists(trades_file):
-            return set()
-            
-        try:
-            df = pd.read_csv(trades_file)
-            # Filter for BUY or AVERAGE actions
-            bot_trades = df[df['Action'].isin(['BUY', 'AVERAGE'])]
-            return set(bot_trades['Symbol'].unique())
-        except Exception as e:
-            print(f"Error reading trades history: {e}")
-            return set()
+        # The position ledger is kept up to date by every recorded trade
+        return self.state_manager.ledger.open_symbols()
 
-    def _check_and_execute_sells(self, holdings: List[Holding]) -> bool:
+    def _check_and_execute_sells(self, holdings: List[Holding], bot_managed_symbols: set) -> bool:
         """
         Check holdings for sell opportunities (5%+ profit).
         Only considers holdings that were bought by the bot.
         Returns True if a sell was executed.
         """
-        # Get list of symbols bought by the bot
-        bot_managed_symbols = self._get_bot_managed_symbols()
-        
         # Filter holdings
         bot_holdings = [h for h in holdings if h.symbol in bot_managed_symbols]
         
@@ -246,34 +403,30 @@ class NiftyShopStrategy:
         Execute a sell order for the given holding.
         Returns True if successful.
         """
-        revenue = holding.quantity * holding.current_price
-        
         print(f"Placing SELL order for {holding.symbol}...")
         
         if self.dry_run:
             print(f"[DRY RUN] Would place SELL order: {holding.symbol}, "
                   f"Qty: {holding.quantity} @ ₹{holding.current_price:.2f}")
+            self._decide(f"DRY RUN SELL {holding.symbol} x{holding.quantity}")
             return True
         else:
             try:
-                self.broker.place_sell_order(
+                order = self.broker.place_sell_order(
                     holding.symbol, 
                     holding.quantity, 
                     holding.current_price
                 )
+                self._order_acknowledged(order)
                 
-                self.state_manager.record_sell(
-                    symbol=holding.symbol,
-                    quantity=holding.quantity,
-                    price=holding.current_price,
-                    revenue=revenue,
-                    message=f"Sold {holding.symbol}: {holding.quantity} @ ₹{holding.current_price:.2f}"
-                )
+                self._record_on_fill(order, "SELL", holding.symbol, holding.quantity, holding.current_price)
                 
                 print(f"✓ Sell order placed successfully for {holding.symbol}")
+                self._decide(f"SELL {holding.symbol} x{holding.quantity}")
                 return True
                 
             except Exception as e:
                 print(f"CRITICAL ERROR: Failed to sell {holding.symbol}: {e}")
+                self._decide(f"FAILED SELL {holding.symbol}")
                 return False
 
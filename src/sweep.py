@@ -0,0 +1,130 @@
+import bisect
+import itertools
+import os
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+from multiprocessing import Pool, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+from .config import config
+from .simulation import PricePanel, Simulator, cumulative_sums, load_panel, rolling_dma
+
+# Parameters from src/config.py that a sweep may vary
+SWEEPABLE = ("DMA_PERIOD", "HOLDING_DROP_THRESHOLD", "SELL_PROFIT_THRESHOLD", "PER_STOCK_ALLOCATION")
+
+DEFAULT_GRID = {
+    "DMA_PERIOD": [10, 15, 20, 25, 30, 40, 50],
+    "HOLDING_DROP_THRESHOLD": [0.05, 0.08, 0.10, 0.15],
+    "SELL_PROFIT_THRESHOLD": [0.03, 0.05, 0.08, 0.10],
+    "PER_STOCK_ALLOCATION": [1000.0, 2000.0, 5000.0],
+}
+
+# Per-worker state, filled in by _init_worker. Arrays are views onto shared memory.
+_worker: Dict[str, Any] = {}
+
+
+def _share(arrays: Dict[str, np.ndarray]) -> Tuple[List[shared_memory.SharedMemory], Dict[str, Tuple]]:
+    """Copies each array into its own shared memory block once; workers map the blocks instead of unpickling copies."""
+    blocks = []
+    specs = {}
+    for name, arr in arrays.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        specs[name] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+
+def _init_worker(specs: Dict[str, Tuple], dates: np.ndarray, symbols: List[str], start: date, end: date):
+    # Pool workers share the parent's resource tracker, and the parent unlinks the blocks
+    arrays = {}
+    blocks = []
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+    _worker["blocks"] = blocks
+    _worker["panel"] = PricePanel(dates=dates, symbols=symbols, closes=arrays["closes"])
+    _worker["csum"] = arrays["csum"]
+    _worker["ccount"] = arrays["ccount"]
+    _worker["dma"] = {}
+    _worker["range"] = (start, end)
+
+
+def _run_one(params: Dict[str, Any]) -> Dict[str, Any]:
+    # config is per process, so overriding it here only affects this worker's next replay
+    for key, value in params.items():
+        setattr(config, key, value)
+
+    period = int(params.get("DMA_PERIOD", config.DMA_PERIOD))
+    dma = _worker["dma"].get(period)
+    if dma is None:
+        # Every window is derived from the same shared cumulative sums
+        dma = rolling_dma(_worker["panel"].closes, period, _worker["csum"], _worker["ccount"])
+        _worker["dma"][period] = dma
+
+    start, end = _worker["range"]
+    result = Simulator(_worker["panel"], dma=dma).run(start, end, params=params)
+    summary = result.summary()
+    summary["elapsed"] = result.elapsed
+    return summary
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    unknown = set(grid) - set(SWEEPABLE)
+    if unknown:
+        raise ValueError(f"Cannot sweep {sorted(unknown)}; sweepable parameters are {SWEEPABLE}")
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def run_sweep(start: date, end: date, tickers: List[str], grid: Optional[Dict[str, List[Any]]] = None,
+              workers: Optional[int] = None, rank_by: str = "total_return", top_n: int = 10,
+              output_file: str = "sweep_results.csv", panel: Optional[PricePanel] = None) -> pd.DataFrame:
+    """
+    Replays the strategy for every combination in grid across a process pool.
+
+    The price panel is loaded once and placed in shared memory together with its
+    cumulative sums; each worker maps it at start-up, so tasks carry only their
+    parameters. Results are ranked as they arrive and the full table is written to
+    output_file at the end.
+    """
+    grid = grid or DEFAULT_GRID
+    combos = expand_grid(grid)
+    workers = workers or os.cpu_count() or 1
+
+    if panel is None:
+        max_period = max(int(p) for p in grid.get("DMA_PERIOD", [config.DMA_PERIOD]))
+        panel = load_panel(tickers, start, end, warmup_bars=max_period)
+    print(f"--- Sweep: {len(combos)} combinations over {len(panel.dates)} days x {len(panel.symbols)} symbols, {workers} workers ---")
+
+    csum, ccount = cumulative_sums(panel.closes)
+    blocks, specs = _share({"closes": panel.closes, "csum": csum, "ccount": ccount})
+    del csum, ccount
+
+    ranked: List[Tuple[float, int, Dict[str, Any]]] = []
+    t0 = time.perf_counter()
+    try:
+        with Pool(processes=workers, initializer=_init_worker,
+                  initargs=(specs, panel.dates, panel.symbols, start, end)) as pool:
+            chunksize = max(1, len(combos) // (workers * 8))
+            for n, summary in enumerate(pool.imap_unordered(_run_one, combos, chunksize=chunksize), 1):
+                # Keep the table ordered as results stream in (best first)
+                bisect.insort(ranked, (-summary.get(rank_by, float("-inf")), n, summary))
+                if n % max(1, len(combos) // 10) == 0 or n == len(combos):
+                    best = ranked[0][2]
+                    best_params = ", ".join(f"{k}={best[k]}" for k in combos[0])
+                    print(f"[SWEEP] {n}/{len(combos)} done in {time.perf_counter() - t0:.1f}s. "
+                          f"Best {rank_by}: {best.get(rank_by, 0.0):.4f} ({best_params})")
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    table = pd.DataFrame([r[2] for r in ranked])
+    table.to_csv(output_file, index=False)
+    print(f"Sweep finished in {time.perf_counter() - t0:.1f}s. Full ranking -> {output_file}")
+    print(table.head(top_n).to_string(index=False))
+    return table
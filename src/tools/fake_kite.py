@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+class FakeKite:
+    """
+    A local stand-in for the Kite Connect REST API's /quote/ltp, for tests and offline
+    runs (point KITE_ROOT_URL at url). Prices are keyed by Kite instrument ("NSE:INFY");
+    instruments it doesn't know are left out of the response, as Kite does. A request
+    containing any instrument in `failing` is answered with an HTTP 503 error instead.
+    Every request's instrument list is kept in `requests`.
+    """
+
+    def __init__(self, prices: Dict[str, float], failing: Iterable[str] = (), port: int = 0):
+        self.prices = dict(prices)
+        self.failing = set(failing)
+        self.requests: List[List[str]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/quote/ltp":
+                    return self._reply(404, {"status": "error", "error_type": "GeneralException",
+                                             "message": f"Route not found: {url.path}"})
+                instruments = parse_qs(url.query).get("i", [])
+                with fake._lock:
+                    fake.requests.append(instruments)
+                if fake.failing.intersection(instruments):
+                    return self._reply(503, {"status": "error", "error_type": "NetworkException",
+                                             "message": "Service unavailable"})
+                data = {i: {"instrument_token": n, "last_price": fake.prices[i]}
+                        for n, i in enumerate(instruments) if i in fake.prices}
+                self._reply(200, {"status": "success", "data": data})
+
+            def _reply(self, code: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeKite":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-kite", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeKite":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake Kite /quote/ltp locally")
+    parser.add_argument("prices", help='JSON file: {"NSE:INFY": 1500.0, ...}')
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with open(args.prices, 'r') as f:
+        fake = FakeKite(json.load(f), port=args.port)
+    print(f"Fake Kite at {fake.url} (set KITE_ROOT_URL={fake.url})")
+    fake._server.serve_forever()
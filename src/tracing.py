@@ -0,0 +1,134 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# The trace of the strategy run in progress in this context, if any. Spans opened while
+# no run is active are no-ops, so instrumented code can be called from anywhere. Being a
+# ContextVar, runs on different threads (scheduler, intraday monitor) each see their own;
+# pool workers see the submitting run's trace when their task is wrapped in in_context().
+_active: "contextvars.ContextVar[Optional[RunTrace]]" = contextvars.ContextVar("active_trace", default=None)
+
+
+class RunTrace:
+    """
+    Timings for one strategy run: total wall time plus, per named span, the summed
+    duration and the number of times it was entered. Also carries the decision the
+    run ended with, so a run can be stored as a single record.
+    """
+
+    def __init__(self, mode: str = "", dry_run: bool = False):
+        self.mode = mode
+        self.dry_run = dry_run
+        self.started_at = datetime.utcnow()
+        self.stages_ms: Dict[str, float] = {}
+        self.call_counts: Dict[str, int] = {}
+        self.decision = "NONE"
+        self.error: Optional[str] = None
+        self.total_ms: Optional[float] = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, elapsed_ms: float):
+        with self._lock:
+            self.stages_ms[name] = self.stages_ms.get(name, 0.0) + elapsed_ms
+            self.call_counts[name] = self.call_counts.get(name, 0) + 1
+
+    @contextmanager
+    def activate(self):
+        """Makes this the trace that module-level span() records into, in the current context."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def finish(self) -> float:
+        self.total_ms = (time.perf_counter() - self._t0) * 1000.0
+        return self.total_ms
+
+    def summary(self) -> str:
+        parts = [f"{name}={ms:.0f}ms x{self.call_counts[name]}" for name, ms in
+                 sorted(self.stages_ms.items(), key=lambda kv: kv[1], reverse=True)]
+        return f"[TRACE] total={self.total_ms or 0.0:.0f}ms decision={self.decision} | " + ", ".join(parts)
+
+
+def current() -> Optional[RunTrace]:
+    return _active.get()
+
+
+def in_context(fn: Callable) -> Callable:
+    """
+    fn bound to the caller's context, for handing to a thread pool: spans it opens on
+    the worker go to the caller's trace. Each call runs in its own copy of the context,
+    so the result can be called from several workers at once.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+@contextmanager
+def span(name: str):
+    trace = _active.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, (time.perf_counter() - t0) * 1000.0)
+
+
+class Traced:
+    """
+    Proxy that times every public method call on the wrapped object as a span
+    named "<prefix>.<method>". Attribute reads pass straight through.
+    """
+
+    def __init__(self, target: Any, prefix: str):
+        self._target = target
+        self._prefix = prefix
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        span_name = f"{self._prefix}.{name}"
+
+        def traced(*args, **kwargs):
+            with span(span_name):
+                return attr(*args, **kwargs)
+        return traced
+
+
+def save_run(trace: RunTrace):
+    """Persists one run as a row of strategy_runs. Failures are reported, never raised."""
+    from .database import SessionLocal
+    from . import models
+
+    db = SessionLocal()
+    try:
+        db.add(models.StrategyRun(
+            started_at=trace.started_at,
+            mode=trace.mode,
+            dry_run=int(trace.dry_run),
+            total_ms=trace.total_ms,
+            stages=json.dumps(trace.stages_ms),
+            call_counts=json.dumps(trace.call_counts),
+            decision=trace.decision,
+            error=trace.error
+        ))
+        db.commit()
+    except Exception as e:
+        print(f"Error saving strategy run trace: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,85 @@
+import csv
+import os
+import time
+from typing import List, Optional
+from .config import config
+from .constants import NIFTY_50_TICKERS
+from .data.quote_fetcher import to_yf_symbol
+from .http_pool import get_session
+
+# NSE publishes index constituents as CSV files with a "Symbol" column
+INDEX_CONSTITUENT_URLS = {
+    "nifty100": "https://archives.nseindia.com/content/indices/ind_nifty100list.csv",
+    "nifty200": "https://archives.nseindia.com/content/indices/ind_nifty200list.csv",
+    "nifty500": "https://archives.nseindia.com/content/indices/ind_nifty500list.csv",
+    "niftytotalmarket": "https://archives.nseindia.com/content/indices/ind_niftytotalmarket_list.csv",
+    # Every listed equity
+    "nse_all": "https://archives.nseindia.com/content/equities/EQUITY_L.csv",
+}
+
+UNIVERSE_DIR = "data/universe"
+# Constituents only change at index rebalances, so a weekly refresh is plenty
+UNIVERSE_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+def _read_symbols(path: str) -> List[str]:
+    """
+    Reads a universe file. Either an NSE-style CSV with a Symbol column (optionally
+    with a Series column, in which case only EQ rows are kept), or one symbol per line.
+    """
+    with open(path, 'r', newline='') as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    if not rows:
+        return []
+
+    header = [h.strip().lower() for h in rows[0]]
+    if "symbol" in header:
+        sym_col = header.index("symbol")
+        series_col = header.index("series") if "series" in header else None
+        symbols = [
+            row[sym_col] for row in rows[1:]
+            if series_col is None or row[series_col].strip().upper() == "EQ"
+        ]
+    else:
+        symbols = [row[0] for row in rows if not row[0].startswith("#")]
+
+    # De-duplicate, keeping file order
+    return list(dict.fromkeys(to_yf_symbol(s.strip().upper()) for s in symbols if s.strip()))
+
+
+def _cached_index_file(name: str) -> str:
+    os.makedirs(UNIVERSE_DIR, exist_ok=True)
+    path = os.path.join(UNIVERSE_DIR, f"{name}.csv")
+
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) < UNIVERSE_MAX_AGE_SECONDS:
+        return path
+
+    try:
+        # NSE rejects requests without a browser-like User-Agent
+        resp = get_session().get(INDEX_CONSTITUENT_URLS[name], headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
+        resp.raise_for_status()
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(resp.content)
+        os.replace(f"{path}.tmp", path)
+    except Exception as e:
+        if not os.path.exists(path):
+            raise RuntimeError(f"Could not download {name} constituents: {e}")
+        print(f"Error refreshing {name} constituents ({e}). Using cached copy.")
+    return path
+
+
+def load_universe(source: Optional[str] = None) -> List[str]:
+    """
+    Resolves the screening universe to a list of yfinance tickers.
+    source is "nifty50" (built in), a known index name (see INDEX_CONSTITUENT_URLS)
+    or the path to a universe file. Defaults to config.UNIVERSE.
+    """
+    source = source or config.UNIVERSE
+    key = source.lower()
+    if key == "nifty50":
+        return list(NIFTY_50_TICKERS)
+    if key in INDEX_CONSTITUENT_URLS:
+        return _read_symbols(_cached_index_file(key))
+    if os.path.exists(source):
+        return _read_symbols(source)
+    raise ValueError(f"Unknown universe '{source}'. Use nifty50, one of {sorted(INDEX_CONSTITUENT_URLS)}, or a file path.")
@@ -0,0 +1,20 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Tests import the bot as the scripts do: `from src...`, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Never reach a real database from tests
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def memory_logger():
+    """A trade logger that keeps trades in memory, as simulations use, stamped at a fixed time."""
+    from src.simulation import MemoryTradeLogger, SimulatedClock
+
+    clock = SimulatedClock()
+    clock.current = datetime(2026, 1, 19, 15, 20)
+    return MemoryTradeLogger(clock)
@@ -0,0 +1,29 @@
+from src.account_snapshot import AccountSnapshot
+from src.broker.mock_broker import MockBroker
+
+
+class CountingBroker(MockBroker):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get_holdings(self):
+        self.calls.append("get_holdings")
+        return super().get_holdings()
+
+    def get_ltp(self, symbols):
+        self.calls.append("get_ltp")
+        return super().get_ltp(symbols)
+
+
+def test_snapshot_quotes_the_holdings_once():
+    broker = CountingBroker()
+    broker.place_buy_order("ITC.NS", 10, 300.0)
+    broker.update_prices({"ITC.NS": 312.5})
+
+    for concurrent in (True, False):
+        broker.calls.clear()
+        account = AccountSnapshot.fetch(broker, concurrent=concurrent)
+        assert broker.calls == ["get_holdings"]
+        assert account.holding("ITC.NS").current_price == 312.5
+        assert dict(account.quotes) == {"ITC.NS": 312.5}
@@ -0,0 +1,125 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.broker.cached_broker import CachingBroker
+from src.broker.mock_broker import MockBroker
+
+
+class CountingBroker(MockBroker):
+    """Counts reads; holdings reads can be held open to overlap concurrent callers."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_holdings(self):
+        self.calls.append("get_holdings")
+        self.release.wait(5)
+        return super().get_holdings()
+
+    def get_available_margin(self):
+        self.calls.append("get_available_margin")
+        return super().get_available_margin()
+
+    def get_ltp(self, symbols):
+        self.calls.append(("get_ltp", tuple(symbols)))
+        return super().get_ltp(symbols)
+
+
+@pytest.fixture
+def broker():
+    b = CountingBroker()
+    b.place_buy_order("ITC.NS", 10, 300.0)
+    b.place_buy_order("INFY.NS", 5, 1500.0)
+    return b
+
+
+def test_concurrent_reads_share_one_call(broker):
+    cached = CachingBroker(broker)
+    broker.release.clear()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cached.get_holdings) for _ in range(8)]
+        # Let every caller reach the cache before the one broker call returns
+        while cached.hits + cached.misses < 8:
+            time.sleep(0.01)
+        broker.release.set()
+        results = [f.result() for f in futures]
+
+    assert broker.calls == ["get_holdings"]
+    assert all(len(r) == 2 for r in results)
+    assert (cached.misses, cached.hits) == (1, 7)
+
+
+def test_a_failed_read_is_not_cached(broker):
+    cached = CachingBroker(broker)
+    def down():
+        raise ConnectionError("down")
+    broker.get_available_margin = down
+    with pytest.raises(ConnectionError):
+        cached.get_available_margin()
+
+    del broker.get_available_margin
+    assert cached.get_available_margin() == 1000000.0
+    assert cached.misses == 2
+
+
+def test_reads_are_memoized_for_the_run(broker):
+    cached = CachingBroker(broker)
+    for _ in range(3):
+        cached.get_holdings()
+        cached.get_available_margin()
+    assert broker.calls == ["get_holdings", "get_available_margin"]
+
+
+def test_quotes_are_fetched_only_for_symbols_not_priced_yet(broker):
+    cached = CachingBroker(broker)
+    assert cached.get_ltp(["ITC.NS"]) == {"ITC.NS": 300.0}
+    assert cached.get_ltp(["INFY.NS", "ITC.NS"]) == {"INFY.NS": 1500.0, "ITC.NS": 300.0}
+    assert broker.calls == [("get_ltp", ("ITC.NS",)), ("get_ltp", ("INFY.NS",))]
+
+
+def test_placing_an_order_drops_account_reads_but_not_quotes(broker):
+    cached = CachingBroker(broker)
+    cached.get_holdings()
+    cached.get_available_margin()
+    cached.get_ltp(["ITC.NS"])
+
+    cached.place_sell_order("ITC.NS", 10, 310.0)
+    broker.calls.clear()
+
+    assert [h.symbol for h in cached.get_holdings()] == ["INFY.NS"]
+    cached.get_available_margin()
+    cached.get_ltp(["ITC.NS"])
+    assert broker.calls == ["get_holdings", "get_available_margin"]
+
+
+def test_a_read_in_flight_during_an_order_is_not_kept(broker):
+    cached = CachingBroker(broker)
+    broker.release.clear()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        stale = pool.submit(cached.get_holdings)
+        while not broker.calls:
+            time.sleep(0.01)
+        cached.place_buy_order("TCS.NS", 1, 3900.0)
+        broker.release.set()
+        stale.result()
+
+    assert "TCS.NS" in [h.symbol for h in cached.get_holdings()]
+    assert broker.calls.count("get_holdings") == 2
+
+
+def test_invalidate_without_keys_drops_everything(broker):
+    cached = CachingBroker(broker)
+    cached.get_holdings()
+    cached.get_ltp(["ITC.NS"])
+    cached.invalidate()
+    broker.calls.clear()
+
+    cached.get_holdings()
+    cached.get_ltp(["ITC.NS"])
+    assert broker.calls == ["get_holdings", ("get_ltp", ("ITC.NS",))]
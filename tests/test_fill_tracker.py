@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+from src.broker.fill_tracker import FillTracker
+from src.config import config
+from src.interfaces import OrderResult
+from src.state_manager import StateManager
+from src.strategy import NiftyShopStrategy
+
+
+class ScriptedKite:
+    """order_history() answers from a per-order script; the last entry repeats. Poll times are kept."""
+
+    def __init__(self, scripts):
+        self.scripts = {order_id: list(states) for order_id, states in scripts.items()}
+        self.polls = {order_id: [] for order_id in scripts}
+        self._lock = threading.Lock()
+
+    def order_history(self, order_id):
+        with self._lock:
+            self.polls[order_id].append(time.monotonic())
+            script = self.scripts[order_id]
+            state = script.pop(0) if len(script) > 1 else script[0]
+        if isinstance(state, Exception):
+            raise state
+        return [dict(state, order_id=order_id)]
+
+
+OPEN = {"status": "OPEN", "filled_quantity": 0}
+
+
+def _placed(order_id, symbol="ITC.NS", quantity=10, price=330.0):
+    return OrderResult(order_id=order_id, status="OPEN", average_price=price, quantity=quantity, symbol=symbol)
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(config, "FILL_POLL_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(config, "FILL_POLL_MAX_SECONDS", 0.04)
+    monkeypatch.setattr(config, "FILL_TIMEOUT_SECONDS", 0.2)
+
+
+def test_complete_fill_comes_from_the_broker():
+    kite = ScriptedKite({"1": [OPEN, {"status": "COMPLETE", "filled_quantity": 10, "average_price": 331.25}]})
+    fill = FillTracker(kite).track(_placed("1")).result(timeout=2)
+    assert (fill.status, fill.quantity, fill.average_price) == ("COMPLETE", 10, 331.25)
+
+
+def test_partial_fill_reports_the_filled_quantity():
+    kite = ScriptedKite({"2": [{"status": "CANCELLED", "filled_quantity": 4, "average_price": 330.5}]})
+    fill = FillTracker(kite).track(_placed("2")).result(timeout=2)
+    assert (fill.status, fill.quantity, fill.average_price) == ("CANCELLED", 4, 330.5)
+
+
+def test_rejected_order_has_nothing_filled():
+    kite = ScriptedKite({"3": [{"status": "REJECTED", "filled_quantity": 0, "average_price": 0}]})
+    fill = FillTracker(kite).track(_placed("3")).result(timeout=2)
+    assert (fill.status, fill.quantity) == ("REJECTED", 0)
+
+
+def test_push_update_resolves_without_polling():
+    kite = ScriptedKite({"4": [OPEN]})
+    tracker = FillTracker(kite)
+    future = tracker.track(_placed("4"))
+    tracker.on_order_update({"order_id": "4", "status": "COMPLETE", "filled_quantity": 10, "average_price": 329.9})
+    assert future.result(timeout=1).average_price == 329.9
+    assert tracker.pending() == 0
+
+
+def test_timeout_flags_the_order_and_keeps_polling_until_final():
+    kite = ScriptedKite({"5": [OPEN] * 12 + [{"status": "COMPLETE", "filled_quantity": 10, "average_price": 332.0}]})
+    tracker = FillTracker(kite)
+    future = tracker.track(_placed("5"))
+
+    time.sleep(config.FILL_TIMEOUT_SECONDS + 0.1)
+    assert not future.done()
+    assert [o.order_id for o in tracker.unconfirmed()] == ["5"]
+
+    fill = future.result(timeout=2)
+    assert (fill.status, fill.quantity, fill.average_price) == ("COMPLETE", 10, 332.0)
+    assert tracker.unconfirmed() == []
+
+
+def test_polling_backs_off_exponentially_up_to_the_cap():
+    kite = ScriptedKite({"6": [OPEN] * 7 + [RuntimeError("network down"),
+                                            {"status": "COMPLETE", "filled_quantity": 10, "average_price": 330.0}]})
+    FillTracker(kite).track(_placed("6")).result(timeout=3)
+    gaps = [b - a for a, b in zip(kite.polls["6"], kite.polls["6"][1:])]
+    # 0.02, 0.04 then capped at 0.04; a failed poll backs off like an open order
+    assert len(gaps) == 8
+    assert gaps[0] >= 0.02 and gaps[1] >= 0.04
+    assert all(0.04 <= g < 0.2 for g in gaps[2:])
+
+
+class FakeBroker:
+    """Just enough of IBroker for the strategy to place orders, with fills from a ScriptedKite."""
+
+    def __init__(self, kite, order_id):
+        self.tracker = FillTracker(kite)
+        self.order_id = order_id
+
+    def place_buy_order(self, symbol, quantity, price=None):
+        return _placed(self.order_id, symbol, quantity, price)
+
+    place_sell_order = place_buy_order
+
+    def confirm_fill(self, order):
+        return self.tracker.track(order)
+
+
+def _strategy(kite, order_id, logger):
+    state = StateManager.in_memory(None, logger=logger)
+    return NiftyShopStrategy(FakeBroker(kite, order_id), None, state, universe=[]), state
+
+
+@pytest.mark.parametrize("script, recorded", [
+    ([{"status": "COMPLETE", "filled_quantity": 10, "average_price": 331.0}], (10, 331.0)),
+    ([{"status": "CANCELLED", "filled_quantity": 4, "average_price": 330.5}], (4, 330.5)),
+    ([{"status": "REJECTED", "filled_quantity": 0}], None),
+])
+def test_strategy_records_only_what_was_filled(script, recorded, memory_logger):
+    strategy, state = _strategy(ScriptedKite({"7": script}), "7", memory_logger)
+    order = strategy.broker.place_buy_order("ITC.NS", 10, 330.0)
+    strategy._record_on_fill(order, "BUY", "ITC.NS", 10, 330.0)
+    assert strategy.wait_for_fills(timeout=2)
+    trades = state.logger.trades
+    if recorded is None:
+        # A rejected order gives the day's action and its capital back
+        assert trades == [] and not state.daily_limit_reached()
+        assert state.state.used_new_capital == 0.0
+    else:
+        assert [(t["Quantity"], t["Price"], t["Order ID"]) for t in trades] == [recorded + ("7",)]
+        assert state.ledger.get("ITC.NS").quantity == recorded[0]
+        assert state.state.used_new_capital == pytest.approx(recorded[0] * recorded[1])
+
+
+def test_open_order_counts_toward_the_limits_before_it_fills(memory_logger):
+    strategy, state = _strategy(ScriptedKite({"8": [OPEN]}), "8", memory_logger)
+    order = strategy.broker.place_buy_order("ITC.NS", 10, 330.0)
+    strategy._record_on_fill(order, "BUY", "ITC.NS", 10, 330.0)
+    assert not strategy.wait_for_fills(timeout=config.FILL_TIMEOUT_SECONDS + 0.1)
+    assert [o.order_id for o in strategy.unconfirmed_orders()] == ["8"]
+    assert state.daily_limit_reached()
+    assert state.state.used_new_capital == 3300.0
+    # Not a trade until the broker says so
+    assert state.logger.trades == []
+    assert "ITC.NS" not in state.ledger.open_symbols()
+    assert [o.order_id for o in state.open_orders.all()] == ["8"]
+
+
+def test_next_run_reconciles_orders_left_open(tmp_path, monkeypatch, memory_logger):
+    monkeypatch.chdir(tmp_path)
+    first = StateManager(str(tmp_path / "state.json"), logger=memory_logger)
+    first.record_order_placed("BUY", "ITC.NS", "9", 10, 330.0)
+    # The process exits here; the next one finds the order filled at the broker
+    kite = ScriptedKite({"9": [{"status": "COMPLETE", "filled_quantity": 10, "average_price": 329.0}]})
+    state = StateManager(str(tmp_path / "state.json"), logger=memory_logger)
+    strategy = NiftyShopStrategy(FakeBroker(kite, "unused"), None, state, universe=[])
+
+    assert strategy.resume_open_orders() == 1
+    assert strategy.wait_for_fills(timeout=2)
+
+    assert [(t["Quantity"], t["Price"], t["Order ID"]) for t in memory_logger.trades] == [(10, 329.0, "9")]
+    assert state.ledger.get("ITC.NS").quantity == 10
+    assert state.state.orders_placed_count == 1
+    assert state.state.used_new_capital == pytest.approx(3290.0)
+    assert StateManager(str(tmp_path / "state.json"), logger=memory_logger).open_orders.all() == []
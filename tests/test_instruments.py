@@ -0,0 +1,41 @@
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from src.broker import instruments
+from src.broker.instruments import INSTRUMENT_DTYPE, InstrumentMaster
+
+RECORDS = np.array([
+    ("INFY", "NSE", 408065, 0.05, 1),
+    ("INFY", "BSE", 500209, 0.05, 1),
+    ("SMALLCO", "BSE", 531234, 0.01, 1),
+], dtype=INSTRUMENT_DTYPE)
+
+
+def _master(tmp_path) -> InstrumentMaster:
+    master = InstrumentMaster(directory=str(tmp_path))
+    master._save(RECORDS, instruments._today())
+    return master.load()
+
+
+def test_symbols_carry_the_exchange_they_are_listed_on(tmp_path):
+    master = _master(tmp_path)
+
+    assert master.to_symbol("INFY") == "INFY.NS"
+    assert master.to_symbol("INFY", "BSE") == "INFY.BO"
+    assert master.to_symbol("SMALLCO") == "SMALLCO.BO"
+    assert master.to_symbol("UNLISTED") == "UNLISTED.NS"
+
+
+def test_dump_is_dated_by_the_ist_day(tmp_path, monkeypatch):
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            # 20:00 UTC on the 18th, already 01:30 on the 19th in India
+            return datetime(2026, 10, 18, 20, 0, tzinfo=timezone.utc).astimezone(tz)
+    monkeypatch.setattr(instruments, "datetime", Clock)
+
+    assert instruments._today() == date(2026, 10, 19)
+    master = _master(tmp_path)
+    assert (tmp_path / "instruments_2026-10-19.npy").exists()
+    assert master._loaded_for == date(2026, 10, 19)
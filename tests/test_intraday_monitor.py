@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import intraday_monitor
+from src.broker.cached_broker import CachingBroker
+from src.broker.mock_broker import MockBroker
+from src.config import config
+from src.data.bar_store import IST
+from src.intraday_monitor import IntradayMonitor
+from src.state_manager import StateManager
+from src.strategy import NiftyShopStrategy
+
+
+@pytest.fixture
+def monitor(memory_logger, monkeypatch):
+    monkeypatch.setattr(config, "MONITOR_REARM_SECONDS", 0.0)
+    monkeypatch.setattr(intraday_monitor, "save_run", lambda trace: None)
+    broker = MockBroker()
+    cached = CachingBroker(broker)
+    state_manager = StateManager(filepath=None, logger=memory_logger)
+    for symbol in ("AAA.NS", "BBB.NS"):
+        broker.place_buy_order(symbol, 10, 100.0)
+        state_manager.ledger.record(symbol, "BUY", 10, 100.0)
+    # As main.py builds it: one caching broker for the monitor's whole session
+    strategy = NiftyShopStrategy(cached, None, state_manager, universe=[])
+    m = IntradayMonitor(strategy, poll_seconds=0.05)
+    m.rebuild()
+    return m, broker
+
+
+def _run_briefly(m: IntradayMonitor):
+    m._run(until=datetime.now(IST) + timedelta(seconds=0.3))
+
+
+def test_stale_trigger_is_rearmed_from_the_current_average(monitor):
+    m, broker = monitor
+    # Averaged elsewhere since the triggers were built: 106 no longer is a 5% profit
+    broker.holdings["AAA.NS"].average_price = 110.0
+    m.on_prices({"AAA.NS": 106.0})
+    assert "AAA.NS" not in m.index.symbols()
+
+    _run_briefly(m)
+
+    assert m.index.get("AAA.NS") == pytest.approx((110.0 * 1.05, 110.0 * 0.90))
+    assert broker.holdings["AAA.NS"].quantity == 10
+    assert not m.strategy.state_manager.daily_limit_reached()
+
+
+def test_declined_trigger_for_a_sold_holding_is_not_rearmed(monitor):
+    m, broker = monitor
+    del broker.holdings["AAA.NS"]
+    m.on_prices({"AAA.NS": 106.0})
+
+    _run_briefly(m)
+
+    assert m.index.symbols() == ["BBB.NS"]
+
+
+def test_trigger_decides_from_the_account_as_it_is_now(monitor):
+    m, broker = monitor
+    # Sold by hand after the monitor cached the account at start
+    del broker.holdings["AAA.NS"]
+    m.strategy.on_trigger("sell", "AAA.NS", 106.0)
+
+    assert m.strategy.trace.decision == "NONE: AAA.NS not held"
+    assert m.strategy.state_manager.logger.trades == []
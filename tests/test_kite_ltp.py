@@ -0,0 +1,65 @@
+import pytest
+import requests
+
+from src.broker.zerodha_broker import ZerodhaBroker
+from src.config import config
+from src.tools.fake_kite import FakeKite
+
+PRICES = {"NSE:INFY": 1500.0, "NSE:ITC": 330.5, "NSE:TCS": 3900.0, "NSE:WIPRO": 250.25, "NSE:HDFCBANK": 1650.0}
+
+
+class RecordingFetcher:
+    """Stands in for the Yahoo Finance fallback."""
+
+    def __init__(self):
+        self.asked = []
+
+    def fetch(self, symbols, fallback=None):
+        self.asked.extend(symbols)
+        return {s: 1.0 for s in symbols}
+
+
+@pytest.fixture
+def broker_for(monkeypatch):
+    def make(fake: FakeKite, fetcher=None) -> ZerodhaBroker:
+        monkeypatch.setattr(config, "KITE_ROOT_URL", fake.url)
+        monkeypatch.setattr(config, "KITE_LTP_BATCH_SIZE", 2)
+        broker = ZerodhaBroker("key", "token", quote_fetcher=fetcher or RecordingFetcher(), market_data_source="kite")
+        # The shared pool's 1 req/s /quote limit would only slow the test down
+        broker.kite.reqsession = requests.Session()
+        return broker
+    return make
+
+
+def test_ltp_is_fetched_in_chunks(broker_for):
+    symbols = ["INFY.NS", "ITC.NS", "TCS", "WIPRO.NS", "HDFCBANK.NS"]
+    with FakeKite(PRICES) as fake:
+        prices = broker_for(fake)._kite_ltp(symbols)
+
+    assert sorted(len(r) for r in fake.requests) == [1, 2, 2]
+    assert sorted(i for r in fake.requests for i in r) == sorted(PRICES)
+    # Keyed by the symbols as passed
+    assert prices == {"INFY.NS": 1500.0, "ITC.NS": 330.5, "TCS": 3900.0, "WIPRO.NS": 250.25, "HDFCBANK.NS": 1650.0}
+
+
+def test_failed_chunk_falls_back_without_losing_the_others(broker_for):
+    fetcher = RecordingFetcher()
+    symbols = ["INFY.NS", "ITC.NS", "TCS.NS", "WIPRO.NS", "HDFCBANK.NS"]
+    with FakeKite(PRICES, failing=["NSE:TCS"]) as fake:
+        prices = broker_for(fake, fetcher).get_ltp(symbols)
+
+    failed = next(r for r in fake.requests if "NSE:TCS" in r)
+    failed_symbols = sorted(f"{i.split(':')[1]}.NS" for i in failed)
+    assert len(fake.requests) == 3
+    assert sorted(fetcher.asked) == failed_symbols
+    for symbol in symbols:
+        expected = 1.0 if symbol in failed_symbols else PRICES[f"NSE:{symbol[:-3]}"]
+        assert prices[symbol] == expected
+
+
+def test_unknown_instruments_are_left_for_the_fallback(broker_for):
+    fetcher = RecordingFetcher()
+    with FakeKite(PRICES) as fake:
+        prices = broker_for(fake, fetcher).get_ltp(["INFY.NS", "NOSUCH.NS"])
+    assert prices == {"INFY.NS": 1500.0, "NOSUCH.NS": 1.0}
+    assert fetcher.asked == ["NOSUCH.NS"]
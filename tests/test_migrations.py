@@ -0,0 +1,87 @@
+from sqlalchemy import create_engine, inspect, text
+
+import import_csv_to_db
+from src.migrations import check_schema, migrate, pending
+
+OLD_SCHEMA = [
+    "CREATE TABLE trades (id INTEGER PRIMARY KEY, date VARCHAR, time VARCHAR, symbol VARCHAR, action VARCHAR, "
+    "quantity INTEGER, price FLOAT, total_cost FLOAT, timestamp DATETIME)",
+    "CREATE TABLE screening_logs (id INTEGER PRIMARY KEY, date VARCHAR, time VARCHAR, rank INTEGER, symbol VARCHAR, "
+    "current_price FLOAT, dma_25 FLOAT, percent_below_dma VARCHAR, timestamp DATETIME)",
+    # Two fills of the same second, symbol and action
+    "INSERT INTO trades (date, time, symbol, action, quantity, price, total_cost) VALUES "
+    "('2026-01-19', '09:20:01', 'ITC', 'BUY', 10, 300.0, 3000.0), "
+    "('2026-01-19', '09:20:01', 'ITC', 'BUY', 5, 300.5, 1502.5)",
+    # The same screening row logged twice
+    "INSERT INTO screening_logs (date, time, rank, symbol, current_price, dma_25, percent_below_dma) VALUES "
+    "('2026-01-19', '15:20:00', 1, 'ITC', 300.0, 330.0, '-9.09%'), "
+    "('2026-01-19', '15:20:00', 1, 'ITC', 300.0, 330.0, '-9.09%')",
+]
+
+
+def _old_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            conn.execute(text(statement))
+    return engine
+
+
+def _count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+
+def test_migration_keeps_every_row_and_refuses_a_duplicated_key(tmp_path):
+    engine = _old_database(tmp_path)
+    assert not check_schema(engine)
+
+    migrate(engine)
+
+    assert _count(engine, "trades") == 2
+    assert _count(engine, "screening_logs") == 2
+    with engine.connect() as conn:
+        order_ids = conn.execute(text("SELECT order_id FROM trades ORDER BY id")).scalars().all()
+    assert order_ids == ["legacy:2026-01-19T09:20:01:ITC:BUY:0", "legacy:2026-01-19T09:20:01:ITC:BUY:1"]
+    indexes = {i["name"] for i in inspect(engine).get_indexes("screening_logs")}
+    assert "uq_screening_logs_date_time_symbol" not in indexes
+    assert pending(engine) == ["screening_logs: missing index uq_screening_logs_date_time_symbol"]
+
+
+def test_dedupe_is_opt_in(tmp_path):
+    engine = _old_database(tmp_path)
+    migrate(engine)
+    migrate(engine, dedupe=True)
+
+    assert _count(engine, "screening_logs") == 1
+    assert _count(engine, "trades") == 2
+    assert pending(engine) == []
+
+
+def test_reimporting_trades_csv_matches_migrated_rows(tmp_path, monkeypatch):
+    engine = _old_database(tmp_path)
+    migrate(engine, dedupe=True)
+    trades_csv = tmp_path / "trades.csv"
+    trades_csv.write_text(
+        "Date,Time,Symbol,Action,Quantity,Price,Total Cost\n"
+        "2026-01-19,09:20:01,ITC,BUY,10,300.00,3000.00\n"
+        "2026-01-19,09:20:01,ITC,BUY,5,300.50,1502.50\n"
+        "2026-01-20,09:20:03,ITC,SELL,15,330.00,4950.00,240120000012345\n"
+    )
+    monkeypatch.setattr(import_csv_to_db, "engine", engine)
+
+    trades, = import_csv_to_db.import_data(str(trades_csv), str(tmp_path / "missing.csv"))
+
+    assert (trades.read, trades.inserted, trades.skipped) == (3, 1, 2)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT order_id FROM trades WHERE action = 'SELL'")).scalar() == "240120000012345"
+
+
+def test_importer_refuses_an_unmigrated_database(tmp_path, monkeypatch):
+    engine = _old_database(tmp_path)
+    monkeypatch.setattr(import_csv_to_db, "engine", engine)
+    trades_csv = tmp_path / "trades.csv"
+    trades_csv.write_text("2026-01-20,09:20:03,ITC,SELL,15,330.00,4950.00,240120000012345\n")
+
+    assert import_csv_to_db.import_data(str(trades_csv), str(tmp_path / "missing.csv")) == []
+    assert _count(engine, "trades") == 2
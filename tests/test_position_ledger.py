@@ -0,0 +1,95 @@
+import csv
+
+import pytest
+
+from src.position_ledger import PositionLedger
+
+
+def realized(ledger: PositionLedger, symbol: str, quantity: int, price: float) -> float:
+    """Sells through the ledger and returns the P&L realized against the average cost."""
+    before = ledger.get(symbol)
+    sold = min(quantity, before.quantity)
+    pnl = (price - before.average_price) * sold
+    ledger.apply(symbol, "SELL", quantity, price)
+    return pnl
+
+
+def test_averaging_down_lowers_the_average_price():
+    ledger = PositionLedger(None)
+    ledger.apply("ITC.NS", "BUY", 10, 300.0)
+    ledger.apply("ITC.NS", "AVERAGE", 10, 270.0)
+    ledger.apply("ITC.NS", "AVERAGE", 20, 240.0)
+
+    position = ledger.get("ITC.NS")
+    assert position.quantity == 40
+    assert position.cost_basis == pytest.approx(10 * 300 + 10 * 270 + 20 * 240)
+    assert position.average_price == pytest.approx(262.5)
+    assert ledger.open_symbols() == {"ITC.NS"}
+
+
+def test_partial_sells_keep_the_average_and_realize_against_it():
+    ledger = PositionLedger(None)
+    ledger.apply("INFY.NS", "BUY", 10, 1500.0)
+    ledger.apply("INFY.NS", "AVERAGE", 10, 1300.0)
+
+    assert realized(ledger, "INFY.NS", 5, 1500.0) == pytest.approx(500.0)
+    position = ledger.get("INFY.NS")
+    assert position.quantity == 15
+    assert position.average_price == pytest.approx(1400.0)
+    assert position.cost_basis == pytest.approx(21000.0)
+
+    assert realized(ledger, "INFY.NS", 10, 1350.0) == pytest.approx(-500.0)
+    assert ledger.get("INFY.NS").average_price == pytest.approx(1400.0)
+
+    # Selling more than is held closes the position without going short
+    assert realized(ledger, "INFY.NS", 50, 1470.0) == pytest.approx(350.0)
+    assert ledger.get("INFY.NS").quantity == 0
+    assert ledger.get("INFY.NS").cost_basis == 0.0
+    assert ledger.open_symbols() == set()
+
+
+def test_a_closed_position_reopens_at_its_new_cost():
+    ledger = PositionLedger(None)
+    ledger.apply("TCS.NS", "BUY", 2, 4000.0, when="2026-01-02T15:20:00")
+    ledger.apply("TCS.NS", "SELL", 2, 4200.0, when="2026-01-09T15:20:00")
+    ledger.apply("TCS.NS", "BUY", 3, 3800.0, when="2026-01-12T15:20:00")
+
+    position = ledger.get("TCS.NS")
+    assert (position.quantity, position.average_price) == (3, pytest.approx(3800.0))
+    assert position.first_trade == "2026-01-12T15:20:00"
+
+
+def test_selling_an_unknown_symbol_is_ignored():
+    ledger = PositionLedger(None)
+    ledger.apply("WIPRO.NS", "SELL", 5, 250.0)
+    assert ledger.get("WIPRO.NS") is None
+    assert ledger.open_symbols() == set()
+
+
+def test_rebuild_from_trades_matches_applying_them(tmp_path):
+    trades = [
+        ("2026-01-02", "15:20:00", "ITC.NS", "BUY", 10, 300.0),
+        ("2026-01-05", "15:20:00", "ITC.NS", "AVERAGE", 10, 280.0),
+        ("2026-01-06", "15:20:00", "ITC.NS", "SELL", 5, 310.0),
+        ("2026-01-06", "15:20:00", "TCS.NS", "BUY", 1, 4000.0),
+        ("2026-01-07", "15:20:00", "TCS.NS", "SELL", 1, 4100.0),
+    ]
+    trades_file = tmp_path / "trades.csv"
+    with open(trades_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Time", "Symbol", "Action", "Quantity", "Price", "Total Cost"])
+        for t in trades:
+            writer.writerow([*t, t[4] * t[5]])
+
+    ledger = PositionLedger.open(str(tmp_path / "position_ledger.json"), trades_file=str(trades_file))
+    expected = PositionLedger(None)
+    for date, time, symbol, action, quantity, price in trades:
+        expected.apply(symbol, action, quantity, price, when=f"{date}T{time}")
+
+    assert ledger.export() == expected.export()
+    assert ledger.get("ITC.NS").quantity == 15
+    assert ledger.get("ITC.NS").average_price == pytest.approx(290.0)
+
+    # And it survives a reload from disk
+    reloaded = PositionLedger.open(str(tmp_path / "position_ledger.json"))
+    assert reloaded.export() == ledger.export()
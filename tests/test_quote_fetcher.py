@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import time
+
+from src.data.quote_fetcher import QuoteFetcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HANGING_LOOKUP = """
+import time
+from src.data.quote_fetcher import QuoteFetcher
+
+class Hanging(QuoteFetcher):
+    def _fetch_one(self, symbol):
+        time.sleep(60)
+
+print(Hanging(deadline=0.1).fetch(["INFY.NS"], fallback={"INFY.NS": 1500.0}))
+"""
+
+
+class Scripted(QuoteFetcher):
+    def __init__(self, prices, **kwargs):
+        super().__init__(**kwargs)
+        self.prices = prices
+
+    def _fetch_one(self, symbol):
+        if symbol == "SLOW.NS":
+            time.sleep(1.0)
+        return self.prices.get(symbol)
+
+
+def test_fetch_falls_back_for_failures_and_stragglers():
+    fetcher = Scripted({"INFY.NS": 1500.0, "SLOW.NS": 1.0}, deadline=0.2)
+    result = fetcher.fetch(["INFY.NS", "ITC.NS", "SLOW.NS"], fallback={"ITC.NS": 330.0, "SLOW.NS": 99.0})
+    assert result == {"INFY.NS": 1500.0, "ITC.NS": 330.0, "SLOW.NS": 99.0}
+
+
+def test_a_hanging_lookup_does_not_hold_up_exit():
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL="sqlite://")
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", HANGING_LOOKUP], env=env, cwd=ROOT,
+                         capture_output=True, text=True, timeout=30)
+    assert out.returncode == 0, out.stderr
+    assert "1500.0" in out.stdout
+    assert time.perf_counter() - start < 20
@@ -0,0 +1,35 @@
+import os
+
+from src.data.replay_provider import ReplayDataProvider
+from src.snapshot import Snapshot
+from src.state_manager import StateManager
+
+
+def test_snapshot_carries_the_bot_state(tmp_path, memory_logger):
+    live = StateManager.in_memory(None, logger=memory_logger)
+    live.record_new_order("ITC", 10, 300.0, 3000.0, "Bought ITC")
+    live.record_averaging("INFY", 5, 1500.0, 7500.0, "Averaged INFY")
+
+    snapshot = Snapshot(str(tmp_path / "run.pkl.gz"))
+    snapshot.state = live.export()
+    snapshot.save()
+
+    replayed = StateManager.in_memory(Snapshot.load(snapshot.path).state, logger=memory_logger)
+    assert replayed.ledger.open_symbols() == {"ITC", "INFY"}
+    assert replayed.ledger.get("INFY").average_price == 1500.0
+    assert replayed.state.orders_placed_count == 2
+    assert replayed.daily_limit_reached() == live.daily_limit_reached()
+
+
+def test_in_memory_state_touches_no_files(tmp_path, monkeypatch, memory_logger):
+    monkeypatch.chdir(tmp_path)
+    manager = StateManager.in_memory(None, logger=memory_logger)
+    manager.record_sell("ITC", 10, 310.0, 3100.0, "Sold ITC")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_replay_provider_removes_its_scratch_directory(tmp_path):
+    with ReplayDataProvider(Snapshot(str(tmp_path / "run.pkl.gz"))) as provider:
+        workdir = provider._workdir.name
+        assert os.path.isdir(workdir)
+    assert not os.path.exists(workdir)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.data.bar_store import BAR_DTYPE
+from src.data.rolling_state import RollingMeanState
+from src.simulation import rolling_dma
+
+PERIOD = 5
+TODAY = np.datetime64("2026-01-30")
+LTP = 999.0
+
+
+def _bars(n: int, has_today: bool) -> np.ndarray:
+    bars = np.zeros(n, dtype=BAR_DTYPE)
+    last = TODAY if has_today else TODAY - 1
+    bars["date"] = last - np.arange(n)[::-1]
+    bars["close"] = bars["adj_close"] = 10.0 * np.arange(1, n + 1)
+    return bars
+
+
+def _state(tmp_path, bars: np.ndarray, pushed: bool) -> RollingMeanState:
+    state = RollingMeanState(str(tmp_path / "rolling_state.npz"), period=PERIOD)
+    if pushed:
+        for bar in bars:
+            state.push("A.NS", bar["date"], float(bar["adj_close"]))
+    else:
+        state.update("A.NS", bars)
+    return state
+
+
+@pytest.mark.parametrize("pushed", [False, True])
+@pytest.mark.parametrize("has_today", [False, True])
+@pytest.mark.parametrize("n", range(1, 2 * PERIOD + 2))
+def test_dma_from_base_sums_matches_rolling_dma(tmp_path, n, has_today, pushed):
+    bars = _bars(n, has_today)
+    state = _state(tmp_path, bars, pushed)
+
+    # The reference: every completed close before today, then today's LTP as the newest bar
+    before_today = bars["adj_close"][bars["date"] < TODAY].astype(np.float64)
+    expected = rolling_dma(np.append(before_today, LTP)[:, None], PERIOD)[-1, 0]
+    actual = (state.base_sums(["A.NS"], TODAY)[0] + LTP) / PERIOD
+
+    if np.isnan(expected):
+        assert np.isnan(actual)
+    else:
+        assert actual == pytest.approx(expected)
+
+
+def test_window_holding_today_uses_the_period_minus_one_closes_before_it(tmp_path):
+    state = _state(tmp_path, _bars(PERIOD, has_today=True), pushed=False)
+    # 10..40 before today; today's final 50 is replaced by the LTP
+    assert state.base_sums(["A.NS"], TODAY)[0] == pytest.approx(100.0)
+
+
+def test_unknown_symbols_have_no_base(tmp_path):
+    state = _state(tmp_path, _bars(PERIOD, has_today=False), pushed=False)
+    assert np.isnan(state.base_sums(["B.NS"], TODAY)).all()
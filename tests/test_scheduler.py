@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.data.bar_store import IST
+from src.market_calendar import MarketCalendar, NSE_HOLIDAYS, _read_holidays_file
+from src.scheduler import Scheduler
+
+
+def ist(*args) -> datetime:
+    return IST.localize(datetime(*args))
+
+
+class FakeClock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+@pytest.fixture
+def calendar():
+    return MarketCalendar(NSE_HOLIDAYS)
+
+
+def test_calendar_skips_weekends_and_holidays(calendar):
+    # 2026-01-15 (Thu) and 2026-01-26 (Mon) are NSE holidays
+    assert not calendar.is_trading_day("2026-01-15")
+    assert not calendar.is_trading_day("2026-01-17")
+    assert calendar.is_trading_day("2026-01-16")
+    assert calendar.next_or_same("2026-01-15") == np.datetime64("2026-01-16")
+    assert calendar.next_or_same("2026-01-24") == np.datetime64("2026-01-27")
+    assert calendar.previous("2026-01-16") == np.datetime64("2026-01-14")
+    assert calendar.previous_or_same("2026-01-18") == np.datetime64("2026-01-16")
+
+
+def test_holidays_file_ignores_comments_and_blank_lines(tmp_path):
+    path = tmp_path / "holidays.txt"
+    path.write_text("# unscheduled closures\n2026-01-16  # outage\n\n")
+    calendar = MarketCalendar(NSE_HOLIDAYS + _read_holidays_file(str(path)))
+    assert not calendar.is_trading_day("2026-01-16")
+    assert _read_holidays_file(str(tmp_path / "missing.txt")) == []
+
+
+def test_next_run_skips_holidays_and_weekends(calendar):
+    scheduler = Scheduler(calendar, clock=FakeClock(ist(2026, 1, 14, 16, 0)))
+    job = scheduler.add("strategy", "15:20", lambda: None)
+    assert job.next_run == ist(2026, 1, 16, 15, 20)
+    assert scheduler.next_run_after(job, ist(2026, 1, 16, 15, 20)) == ist(2026, 1, 19, 15, 20)
+
+    daily = scheduler.add("token", "08:00", lambda: None, trading_days_only=False)
+    assert daily.next_run == ist(2026, 1, 15, 8, 0)
+
+
+def test_deadlines_are_ist_whatever_the_clock_zone(calendar):
+    scheduler = Scheduler(calendar)
+    job = scheduler.add("strategy", "15:20", lambda: None)
+    # 09:00 UTC is 14:30 IST: today's 15:20 IST run (09:50 UTC) is still ahead
+    after = datetime(2026, 1, 16, 9, 0, tzinfo=timezone.utc)
+    assert scheduler.next_run_after(job, after) == datetime(2026, 1, 16, 9, 50, tzinfo=timezone.utc)
+    # 20:00 UTC on the 16th is already Saturday in India
+    after = datetime(2026, 1, 16, 20, 0, tzinfo=timezone.utc)
+    assert scheduler.next_run_after(job, after) == ist(2026, 1, 19, 15, 20)
+
+
+def test_missed_job_is_caught_up_within_the_window(calendar):
+    clock = FakeClock(ist(2026, 1, 16, 15, 40))
+    scheduler = Scheduler(calendar, clock=clock)
+    job = scheduler.add("strategy", "15:20", lambda: None, catch_up_until="15:55")
+    assert job.next_run == clock.now
+
+    clock.now = ist(2026, 1, 16, 16, 0)
+    late = scheduler.add("strategy", "15:20", lambda: None, catch_up_until="15:55")
+    assert late.next_run == ist(2026, 1, 19, 15, 20)
+
+
+def test_no_catch_up_on_a_holiday(calendar):
+    scheduler = Scheduler(calendar, clock=FakeClock(ist(2026, 1, 15, 15, 40)))
+    job = scheduler.add("strategy", "15:20", lambda: None, catch_up_until="15:55")
+    assert job.next_run == ist(2026, 1, 16, 15, 20)
+
+
+def test_run_fires_due_jobs_in_order_and_reschedules(calendar):
+    clock = FakeClock(ist(2026, 1, 16, 15, 0))
+    scheduler = Scheduler(calendar, clock=clock)
+    fired = []
+    daily = scheduler.add("strategy", "15:20", lambda: fired.append("strategy"))
+    scheduler.add("warmup", "15:20", lambda: fired.append("warmup"), once=True)
+    scheduler.add("stop", "15:21", scheduler.stop, once=True)
+
+    clock.now = ist(2026, 1, 16, 15, 22)
+    scheduler.run()
+
+    assert fired == ["strategy", "warmup"]
+    assert daily.runs == 1 and daily.jitter_ms == [pytest.approx(120000.0)]
+    assert daily.next_run == ist(2026, 1, 19, 15, 20)
+    assert [j.name for j in scheduler.pending()] == ["strategy"]
+
+
+def test_a_failing_job_is_still_rescheduled(calendar):
+    clock = FakeClock(ist(2026, 1, 16, 15, 20))
+    scheduler = Scheduler(calendar, clock=clock)
+
+    def boom():
+        scheduler.stop()
+        raise RuntimeError("boom")
+    job = scheduler.add("strategy", "15:20", boom, catch_up_until="15:55")
+    scheduler.run()
+
+    assert job.runs == 1
+    assert job.next_run == ist(2026, 1, 19, 15, 20)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.screening import screen_universe
+
+PERIOD = 25
+
+
+def pandas_screen(history, ltp, period=PERIOD, k=5):
+    """The per-ticker screen the vectorized one replaced: a window of the last period - 1
+    closes plus today's price, then candidates below their DMA sorted most negative first."""
+    candidates = []
+    for symbol, series in history.items():
+        if len(series) < period - 1:
+            continue
+        price = ltp[symbol]
+        dma = np.append(series[-(period - 1):], price).mean()
+        if pd.isna(dma):
+            continue
+        with np.errstate(invalid="ignore", divide="ignore"):
+            candidates.append((symbol, float(price), float(dma), float((price - dma) / dma)))
+    candidates = [c for c in candidates if c[3] < 0]
+    candidates.sort(key=lambda c: c[3])
+    return candidates[:k]
+
+
+def vectorized_screen(history, ltp, period=PERIOD, k=5):
+    symbols = list(history)
+    base = np.array([np.sum(s[-(period - 1):]) if len(s) >= period - 1 else np.nan for s in history.values()])
+    result = screen_universe(symbols, base, np.array([ltp[s] for s in symbols]), period)
+    return [(s.symbol, s.current_price, s.dma_25, s.percent_below_dma) for s in result.top_below_dma(k)]
+
+
+def assert_same(expected, actual):
+    assert [c[0] for c in actual] == [c[0] for c in expected]
+    for e, a in zip(expected, actual):
+        assert a[1:] == pytest.approx(e[1:], rel=1e-12)
+
+
+def test_matches_the_pandas_screen_on_random_prices():
+    rng = np.random.default_rng(7)
+    history = {f"S{i}.NS": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 40))) for i in range(200)}
+    ltp = {s: series[-1] * rng.uniform(0.85, 1.1) for s, series in history.items()}
+
+    for k in (1, 5, 50, 500):
+        assert_same(pandas_screen(history, ltp, k=k), vectorized_screen(history, ltp, k=k))
+
+
+def test_ties_keep_universe_order():
+    # Eight identical falls: the first five in universe order make the cut, as with a stable sort
+    history = {f"T{i}.NS": np.full(30, 100.0) for i in range(8)}
+    history["DEEP.NS"] = np.full(30, 100.0)
+    ltp = {s: 90.0 for s in history}
+    ltp["DEEP.NS"] = 80.0
+
+    expected = pandas_screen(history, ltp)
+    assert [c[0] for c in expected] == ["DEEP.NS", "T0.NS", "T1.NS", "T2.NS", "T3.NS"]
+    assert_same(expected, vectorized_screen(history, ltp))
+
+
+def test_short_history_nan_and_zero_dma_are_dropped():
+    history = {
+        "OK.NS": np.full(30, 100.0),
+        "SHORT.NS": np.full(10, 100.0),
+        "GAP.NS": np.append(np.full(29, 100.0), np.nan),
+        "ZERO.NS": np.zeros(30),
+        "ABOVE.NS": np.full(30, 100.0),
+    }
+    ltp = {"OK.NS": 95.0, "SHORT.NS": 50.0, "GAP.NS": 50.0, "ZERO.NS": 0.0, "ABOVE.NS": 105.0}
+
+    expected = pandas_screen(history, ltp)
+    assert [c[0] for c in expected] == ["OK.NS"]
+    assert_same(expected, vectorized_screen(history, ltp))
+
+
+def test_unpriced_symbols_are_dropped():
+    history = {"A.NS": np.full(30, 100.0), "B.NS": np.full(30, 100.0)}
+    result = screen_universe(list(history), np.array([2400.0, 2400.0]), np.array([90.0, np.nan]), PERIOD)
+    assert list(result.symbols) == ["A.NS"]
+
+
+def test_running_top_k_over_chunks_matches_one_pass():
+    rng = np.random.default_rng(3)
+    symbols = [f"S{i}.NS" for i in range(300)]
+    base = rng.uniform(2300, 2500, len(symbols))
+    # Repeated prices make ties across chunk boundaries
+    ltp = rng.choice([90.0, 95.0, 100.0, 105.0], len(symbols))
+    whole = screen_universe(symbols, base, ltp, PERIOD)
+
+    running = None
+    for start in range(0, len(symbols), 64):
+        chunk = screen_universe(symbols[start:start + 64], base[start:start + 64], ltp[start:start + 64], PERIOD)
+        running = chunk if running is None else type(chunk).concat([running, chunk])
+        running = running.keep_top_below_dma(5)
+
+    assert [s.symbol for s in running.top_below_dma(5)] == [s.symbol for s in whole.top_below_dma(5)]
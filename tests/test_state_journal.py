@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from src.config import config
+from src.state_manager import StateManager
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    # The position ledger is kept next to the working directory's state
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "state.json")
+
+
+def test_writers_see_each_others_entries_exactly_once(state_file, memory_logger, monkeypatch):
+    monkeypatch.setattr(config, "MAX_NEW_ORDERS_PER_DAY", 10)
+    daily = StateManager(state_file, logger=memory_logger)
+    monitor = StateManager(state_file, logger=memory_logger)
+    daily.record_new_order("ITC", 10, 300.0, 3000.0, "Bought ITC")
+    monitor.record_sell("INFY", 5, 1600.0, 8000.0, "Sold INFY")
+    daily.record_averaging("TCS", 2, 3000.0, 6000.0, "Averaged TCS")
+
+    for manager in (daily, monitor):
+        manager.refresh()
+        manager.refresh()
+        assert manager.state.orders_placed_count == 3
+        assert manager.state.used_new_capital == 3000.0
+        # One counter per writer, however many entries each wrote
+        assert manager.state.applied == {daily.writer: 2, monitor.writer: 1}
+
+    daily.save_state()
+    reloaded = StateManager(state_file, logger=memory_logger)
+    assert reloaded.state.orders_placed_count == 3
+    assert sorted(reloaded.state.actions_log) == ["Averaged TCS", "Bought ITC", "Sold INFY"]
+
+
+def test_state_written_with_journal_ids_still_loads(state_file, memory_logger):
+    today = datetime.now().strftime("%Y-%m-%d")
+    with open(state_file, "w") as f:
+        json.dump({"date": today, "used_new_capital": 3000.0, "used_avg_capital": 0.0,
+                   "orders_placed_count": 1, "actions_log": ["Bought ITC"], "journal_ids": ["a1"]}, f)
+    with open(f"{state_file}.journal", "w") as f:
+        for entry_id, message in (("a1", "Bought ITC"), ("b2", "Sold INFY")):
+            f.write(json.dumps({"id": entry_id, "date": today, "new_capital": 0.0, "avg_capital": 0.0,
+                                "orders": 1, "message": message}) + "\n")
+
+    manager = StateManager(state_file, logger=memory_logger)
+    assert manager.state.orders_placed_count == 2
+    assert manager.state.actions_log == ["Bought ITC", "Sold INFY"]
@@ -0,0 +1,100 @@
+import numpy as np
+
+from src.broker.instruments import Instrument
+from src.data.tick_stream import TickRingBuffer, TickStream
+
+TOKENS = {"INFY.NS": 408065, "ITC.NS": 424961, "TCS.NS": 2953217}
+
+
+class FakeInstruments:
+    def resolve(self, symbol, exchange=None):
+        token = TOKENS.get(symbol)
+        return Instrument(symbol[:-3], "NSE", token, 0.05, 1) if token else None
+
+
+class FakeTicker:
+    """Plays the websocket: the test calls connect/drop/tick, the stream sees KiteTicker callbacks."""
+    MODE_LTP = "ltp"
+
+    def __init__(self):
+        self.subscribed = []
+        self.modes = []
+        self.on_ticks = self.on_connect = self.on_close = self.on_order_update = None
+
+    def connect(self, threaded=False):
+        self.on_connect(self, {})
+
+    def close(self):
+        self.on_close(self, 1000, "closed")
+
+    def subscribe(self, tokens):
+        self.subscribed.append(sorted(tokens))
+
+    def set_mode(self, mode, tokens):
+        self.modes.append((mode, sorted(tokens)))
+
+    def drop(self):
+        self.on_close(self, 1006, "connection lost")
+
+    def tick(self, prices):
+        self.on_ticks(self, [{"instrument_token": TOKENS[s], "last_price": p} for s, p in prices.items()])
+
+
+def _stream(buffer_size=4):
+    ticker = FakeTicker()
+    stream = TickStream("key", "token", FakeInstruments(), buffer_size=buffer_size, ticker=ticker)
+    return stream, ticker
+
+
+def test_ticks_fill_the_buffers_and_reach_handlers():
+    stream, ticker = _stream()
+    assert stream.subscribe(["INFY.NS", "ITC.NS", "NOSUCH.NS"]) == 2
+    batches = []
+    stream.tick_handlers.append(batches.append)
+    assert stream.start(timeout=1)
+    assert ticker.subscribed == [sorted([TOKENS["INFY.NS"], TOKENS["ITC.NS"]])]
+
+    ticker.tick({"INFY.NS": 1500.0, "ITC.NS": 330.0})
+    ticker.tick({"INFY.NS": 1501.5})
+    assert stream.latest(["INFY.NS", "ITC.NS", "NOSUCH.NS"]) == {"INFY.NS": 1501.5, "ITC.NS": 330.0}
+    assert batches == [{"INFY.NS": 1500.0, "ITC.NS": 330.0}, {"INFY.NS": 1501.5}]
+    assert stream.ticks_received == 3
+
+
+def test_subscribing_while_connected_sends_the_new_tokens():
+    stream, ticker = _stream()
+    stream.subscribe(["INFY.NS"])
+    stream.start()
+    stream.subscribe(["TCS.NS"])
+    assert ticker.subscribed[-1] == [TOKENS["TCS.NS"]]
+    assert ticker.modes[-1] == ("ltp", [TOKENS["TCS.NS"]])
+
+
+def test_reconnect_resubscribes_and_stale_prices_are_hidden_meanwhile():
+    stream, ticker = _stream()
+    stream.subscribe(["INFY.NS", "ITC.NS"])
+    stream.start()
+    ticker.tick({"INFY.NS": 1500.0})
+
+    ticker.drop()
+    assert not stream.connected.is_set()
+    assert stream.latest(["INFY.NS"]) == {}
+
+    # KiteTicker reconnects on its own and calls on_connect again
+    stream.subscribe(["TCS.NS"])
+    ticker.on_connect(ticker, {})
+    assert ticker.subscribed[-1] == sorted(TOKENS.values())
+    ticker.tick({"TCS.NS": 3900.0})
+    assert stream.latest(["INFY.NS", "TCS.NS"]) == {"INFY.NS": 1500.0, "TCS.NS": 3900.0}
+
+
+def test_ring_buffer_keeps_the_last_ticks_in_order():
+    buffers = TickRingBuffer(size=3)
+    buffers.reserve(["A", "B"])
+    for i in range(5):
+        buffers.push("A", 100.0 + i, float(i))
+    buffers.push("C", 1.0, 0.0)  # Not reserved: ignored
+    history = buffers.history("A")
+    np.testing.assert_array_equal(history, [[2.0, 102.0], [3.0, 103.0], [4.0, 104.0]])
+    assert buffers.latest(["A", "B", "C"]) == {"A": 104.0}
+    assert buffers.history("B").shape == (0, 2)
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.tracing import RunTrace, current, in_context, span
+
+
+def test_pool_workers_record_into_the_submitting_run():
+    trace = RunTrace()
+
+    def work():
+        with span("work"):
+            pass
+
+    with trace.activate(), ThreadPoolExecutor(max_workers=4) as pool:
+        bound = in_context(work)
+        list(pool.map(lambda _: bound(), range(8)))
+    assert trace.call_counts == {"work": 8}
+
+
+def test_overlapping_runs_on_threads_keep_their_own_spans():
+    traces = {name: RunTrace() for name in ("scheduler", "monitor")}
+    both_active = threading.Barrier(2)
+
+    def run(name):
+        with traces[name].activate():
+            both_active.wait()
+            with span(name):
+                assert current() is traces[name]
+            both_active.wait()
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in traces]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert {name: list(t.call_counts) for name, t in traces.items()} == {"scheduler": ["scheduler"], "monitor": ["monitor"]}
+    assert current() is None
+
+
+def test_unwrapped_pool_work_is_not_attributed():
+    trace = RunTrace()
+    with trace.activate(), ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(current).result() is None
+    assert trace.call_counts == {}
@@ -0,0 +1,68 @@
+import csv
+from datetime import date, datetime, time
+
+import pytest
+
+from src import csv_logger, models
+from src.csv_logger import CSVLogger, TRADES_HEADER, WriteBehindQueue
+from src.database import Base, engine
+
+
+@pytest.fixture
+def queue():
+    # sqlite:// keeps one in-memory database per thread, so rows are written from this one
+    Base.metadata.create_all(bind=engine)
+    yield WriteBehindQueue()
+    Base.metadata.drop_all(bind=engine)
+
+
+def _screening(rank: int, symbol: str) -> dict:
+    return {"date": date(2026, 1, 19), "time": time(15, 20), "rank": rank, "symbol": symbol,
+            "current_price": 100.0, "dma_25": 110.0, "percent_below_dma": -9.09,
+            "timestamp": datetime(2026, 1, 19, 9, 50)}
+
+
+def _rows(model):
+    with engine.connect() as conn:
+        return conn.execute(model.__table__.select()).fetchall()
+
+
+def test_rows_already_logged_are_skipped_not_the_batch(queue, tmp_path):
+    path = str(tmp_path / "screening.csv")
+    queue._write([(0.0, path, [], models.ScreeningLog, [_screening(1, "ITC")])])
+    queue._write([(0.0, path, [], models.ScreeningLog, [_screening(1, "ITC"), _screening(2, "INFY")])])
+
+    assert sorted(r.symbol for r in _rows(models.ScreeningLog)) == ["INFY", "ITC"]
+    assert queue.errors == 0
+
+
+def test_one_failing_table_does_not_roll_back_another(queue, tmp_path, monkeypatch):
+    real_insert = csv_logger._insert
+
+    def insert(model, dialect):
+        if model is models.Trade:
+            raise RuntimeError("trades unavailable")
+        return real_insert(model, dialect)
+    monkeypatch.setattr(csv_logger, "_insert", insert)
+
+    trade = {"date": date(2026, 1, 19), "time": time(15, 20), "symbol": "ITC", "action": "BUY",
+             "quantity": 10, "price": 300.0, "total_cost": 3000.0, "timestamp": datetime(2026, 1, 19, 9, 50)}
+    queue._write([(0.0, str(tmp_path / "trades.csv"), [], models.Trade, [trade]),
+                  (0.0, str(tmp_path / "screening.csv"), [], models.ScreeningLog, [_screening(1, "ITC")])])
+
+    assert [r.symbol for r in _rows(models.ScreeningLog)] == ["ITC"]
+    assert queue.errors == 1
+
+
+def test_trades_file_from_before_order_ids_gets_the_column(tmp_path):
+    trades = tmp_path / "trades.csv"
+    trades.write_text("Date,Time,Symbol,Action,Quantity,Price,Total Cost\n"
+                      "2026-01-19,15:20:01,ITC,BUY,10,300.00,3000.00\n")
+    logger = CSVLogger(str(trades), str(tmp_path / "screening.csv"), writer=WriteBehindQueue())
+    logger.log_trade("ITC", "SELL", 10, 330.0, order_id="240120000012345")
+    logger.writer.flush()
+
+    with open(trades, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == TRADES_HEADER
+    assert [(r["Action"], r["Order ID"]) for r in rows] == [("BUY", ""), ("SELL", "240120000012345")]